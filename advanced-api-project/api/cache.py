@@ -0,0 +1,145 @@
+"""
+Response cache for the read-only list endpoints.
+
+List views using CachedListMixin store the serialized page (``response.data``)
+under a key built from the request's normalized query string (filter, search,
+ordering and page parameters, in sorted order) and the current version of
+every model the list depends on. Saving or deleting a Book or Author bumps its
+model's version (see signals.py), so stale pages are never read again and
+simply expire.
+
+Hot keys are protected against stampedes: only the request that takes the
+key's lock recomputes a missing or expired page. While it does, other requests
+serve the expired copy if there is one, or wait up to API_LIST_CACHE_WAIT
+seconds for the new page before computing it themselves.
+"""
+
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+# Seconds a cached page is served before it is recomputed.
+API_LIST_CACHE_TIMEOUT = getattr(settings, 'API_LIST_CACHE_TIMEOUT', 60)
+
+# Seconds an expired page is kept to serve while it is being recomputed.
+API_LIST_CACHE_STALE_TIMEOUT = getattr(settings, 'API_LIST_CACHE_STALE_TIMEOUT', 30)
+
+# Seconds a recomputation may hold a key's lock, and seconds other requests
+# wait for it when there is no expired page to serve.
+API_LIST_CACHE_LOCK_TIMEOUT = getattr(settings, 'API_LIST_CACHE_LOCK_TIMEOUT', 10)
+API_LIST_CACHE_WAIT = getattr(settings, 'API_LIST_CACHE_WAIT', 2.0)
+API_LIST_CACHE_POLL_INTERVAL = 0.05
+
+
+def version_key(model):
+    return f'api:version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    """Return the current cache version of each model, in order."""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        # Start from the clock so a version lost from the cache never
+        # repeats one that old entries were stored under.
+        cache.add(key, time.time_ns() // 1000, None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_version(model):
+    """Invalidate every cached list that depends on ``model``."""
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns() // 1000, None)
+
+
+def get_or_compute(key, compute):
+    """
+    Return the cached value for ``key``, computing it with single-flight
+    protection. ``compute`` returns ``(value, cacheable)``.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry[0] > time.time():
+        return entry[1]
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, API_LIST_CACHE_LOCK_TIMEOUT):
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                cache.set(
+                    key, (time.time() + API_LIST_CACHE_TIMEOUT, value),
+                    API_LIST_CACHE_TIMEOUT + API_LIST_CACHE_STALE_TIMEOUT
+                )
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        # Another request is recomputing the page.
+        return entry[1]
+    deadline = time.time() + API_LIST_CACHE_WAIT
+    while time.time() < deadline:
+        time.sleep(API_LIST_CACHE_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    return compute()[0]
+
+
+class CachedListMixin:
+    """
+    Caches the data of GET list responses.
+
+    ``cache_dependencies`` lists the models whose changes invalidate the
+    list, and ``cache_query_params`` any query parameters besides the filter,
+    search, ordering and page ones that change its data. The cached data does not depend on the user, so it is shared by
+    anonymous and authenticated requests.
+    """
+    cache_dependencies = []
+    cache_query_params = []
+
+    def get_cache_params(self):
+        """Query parameters that change the list's data."""
+        params = set(getattr(self, 'filterset_fields', None) or []) | set(self.cache_query_params)
+        for backend in self.filter_backends:
+            for attr in ('search_param', 'ordering_param'):
+                if hasattr(backend, attr):
+                    params.add(getattr(backend, attr))
+        if self.paginator is not None:
+            for attr in ('page_query_param', 'page_size_query_param'):
+                if getattr(self.paginator, attr, None):
+                    params.add(getattr(self.paginator, attr))
+        return params
+
+    def get_cache_key(self, request):
+        params = self.get_cache_params()
+        query = sorted(
+            (name, value)
+            for name, values in request.query_params.lists() if name in params
+            for value in values if value != ''
+        )
+        # Pagination links are absolute, so the host is part of the key.
+        parts = (request.build_absolute_uri(request.path), query, get_versions(self.cache_dependencies))
+        return f'api:list:{hashlib.sha1(repr(parts).encode()).hexdigest()}'
+
+    def list(self, request, *args, **kwargs):
+        def compute():
+            # Only the data of successful responses is cached; errors are
+            # returned as they are.
+            response = super(CachedListMixin, self).list(request, *args, **kwargs)
+            if response.status_code == 200:
+                return response.data, True
+            return response, False
+
+        result = get_or_compute(self.get_cache_key(request), compute)
+        if isinstance(result, Response):
+            return result
+        return Response(result)
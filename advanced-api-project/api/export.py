@@ -0,0 +1,109 @@
+"""
+Streaming catalog exports.
+
+ExportMixin streams a filtered queryset as NDJSON (one JSON object per line)
+or CSV. Rows are read with ``values()`` through ``iterator(chunk_size=...)``
+and encoded one at a time as the response is sent, so memory use does not
+depend on the number of rows: no model instances, serializer output or
+response body are built up front.
+
+The format is negotiated like any DRF response: ``?format=ndjson|csv`` or the
+Accept header (NDJSON by default).
+"""
+
+import csv
+import io
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import renderers
+
+# Rows fetched from the database per round trip.
+API_EXPORT_CHUNK_SIZE = getattr(settings, 'API_EXPORT_CHUNK_SIZE', 2000)
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    Newline-delimited JSON. Exports are streamed; only error responses go
+    through ``render``.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ''.join(ndjson_lines([data])).encode(self.charset)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """
+    CSV with a header row. Exports are streamed; only error responses go
+    through ``render``, one ``key,value`` row per error.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data.items() if isinstance(data, dict) else [('detail', data)]
+        return ''.join(csv_lines(
+            [{'field': key, 'error': _error_text(value)} for key, value in rows], ['field', 'error']
+        )).encode(self.charset)
+
+
+def _error_text(value):
+    if isinstance(value, list):
+        return ' '.join(str(item) for item in value)
+    return str(value)
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(fields)
+    for row in rows:
+        yield line([row[field] for field in fields])
+
+
+class ExportMixin:
+    """
+    Streams ``get_queryset()``, filtered by the view's filter backends, as
+    NDJSON or CSV.
+
+    ``export_fields`` names the exported columns (any ``values()`` lookups)
+    and ``export_filename`` the attachment's name without extension.
+    """
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    export_fields = []
+    export_filename = 'export'
+
+    def get(self, request, *args, **kwargs):
+        rows = self.filter_queryset(self.get_queryset()).values(*self.export_fields).iterator(
+            chunk_size=API_EXPORT_CHUNK_SIZE
+        )
+        renderer = request.accepted_renderer
+        if renderer.format == 'csv':
+            lines = csv_lines(rows, self.export_fields)
+        else:
+            lines = ndjson_lines(rows)
+        response = StreamingHttpResponse(
+            lines, content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.export_filename}.{renderer.format}"'
+        )
+        return response
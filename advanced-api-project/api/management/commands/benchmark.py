@@ -0,0 +1,48 @@
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
+from django.urls import reverse
+from api.benchmark import BenchmarkCommand, Scenario
+from api.models import Author, Book
+
+
+def clear_cache(client):
+    cache.clear()
+
+
+class Command(BenchmarkCommand):
+    help = 'Benchmark the book list endpoints against a seeded catalog and compare the results with stored baselines'
+    sizes = {
+        'small': {'authors': 100, 'books': 2000},
+        'medium': {'authors': 1000, 'books': 20000},
+        'large': {'authors': 10000, 'books': 200000},
+    }
+
+    def seed(self, **options):
+        call_command('seed_catalog', seed=0, stdout=StringIO(), **options)
+
+    def get_scenarios(self):
+        url = reverse('api:book-list')
+        # The most prolific author, and a title word and year that match
+        # many books.
+        author = Author.objects.annotate(count=Count('books')).order_by('-count', 'id')[0].pk
+        book = Book.objects.order_by('id').first()
+        word = book.title.split()[0].lower()
+
+        # Uncached scenarios clear the cache after every request, so each one
+        # runs the query and serializes the page.
+        return [
+            Scenario('book-list-cached', url),
+            Scenario('book-list', url, reset=clear_cache),
+            Scenario('book-filter-author', url, data={'author': author}, reset=clear_cache),
+            Scenario(
+                'book-filter-year', url,
+                data={'publication_year': book.publication_year, 'ordering': '-title'}, reset=clear_cache,
+            ),
+            Scenario('book-search', url, data={'search': word}, reset=clear_cache),
+            Scenario('book-page', url, data={'page': 20, 'ordering': 'author__name'}, reset=clear_cache),
+            Scenario(
+                'author-detail', reverse('api:author-detail', args=[author]), data={'books': 10},
+            ),
+        ]
@@ -0,0 +1,96 @@
+"""
+Generate a deterministic synthetic catalog of authors and books.
+
+Books are assigned to authors with probability proportional to
+``1 / rank ** exponent``, so a few prolific authors write most of the books,
+like a real catalog. All random choices come from one ``random.Random(seed)``
+stream, so the same options always produce the same rows. Rows are written
+with ``bulk_create`` in batches, one transaction per batch.
+"""
+
+import bisect
+import itertools
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.models import Author, Book
+from api.signals import invalidate_cached_lists
+
+WORDS = (
+    'shadow river house night garden storm silent winter summer city stone '
+    'glass secret last first lost empire light dark song letter island road '
+    'fire iron golden broken hidden wild long short little great old new '
+    'history guide art science journey dream memory war peace love time'
+).split()
+
+FIRST_NAMES = 'Ada Ben Chloe David Elena Farid Grace Hiro Ines Jonas Kemi Liam Maya Noor Omar Priya'.split()
+LAST_NAMES = 'Adams Baker Chen Diaz Evans Fischer Garcia Haddad Ito Jones Khan Lopez Mensah Novak Okafor Petrov'.split()
+
+FIRST_YEAR = 1850
+LAST_YEAR = 2020
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic catalog of authors and books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000, help='Authors to create')
+        parser.add_argument('--books', type=int, default=10000, help='Books to create')
+        parser.add_argument(
+            '--exponent', type=float, default=1.0,
+            help='Power-law exponent of books per author (higher is more skewed)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if options['authors'] < 1 or options['books'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--authors and --batch-size must be positive and --books not negative')
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
+        author_ids = []
+        for start in range(0, options['authors'], batch_size):
+            count = min(batch_size, options['authors'] - start)
+            with transaction.atomic():
+                authors = Author.objects.bulk_create([
+                    Author(name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {start + i}')
+                    for i in range(count)
+                ])
+            author_ids.extend(author.pk for author in authors)
+
+        rng.shuffle(author_ids)
+        cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** options['exponent'] for rank in range(len(author_ids))
+        ))
+        total = cum_weights[-1]
+
+        created = 0
+        for start in range(0, options['books'], batch_size):
+            count = min(batch_size, options['books'] - start)
+            with transaction.atomic():
+                Book.objects.bulk_create([
+                    Book(
+                        title=' '.join(rng.choices(WORDS, k=rng.randint(1, 5))).title(),
+                        publication_year=rng.randint(FIRST_YEAR, LAST_YEAR),
+                        author_id=author_ids[bisect.bisect_left(cum_weights, rng.random() * total)],
+                    )
+                    for _ in range(count)
+                ])
+            created += count
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'{created} books ({time.monotonic() - started:.1f}s)')
+
+        # bulk_create sends no signals.
+        invalidate_cached_lists(Author)
+        invalidate_cached_lists(Book)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(author_ids)} authors and {created} books in {elapsed:.1f}s'
+        ))
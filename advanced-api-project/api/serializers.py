@@ -1,15 +1,91 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
+from .bulk import BulkListSerializer
 from .models import Author, Book
 
+# Most books nested in an author; ``?books=<n>`` asks for fewer.
+API_AUTHOR_BOOKS_LIMIT = getattr(settings, 'API_AUTHOR_BOOKS_LIMIT', 100)
+
+
+def get_nested_books_option(request):
+    """
+    Parse the ``books`` query parameter.
+    
+    Returns:
+        'none' to omit nested books, 'count' for ``books_count`` only, or the
+        maximum number of books to nest.
+        
+    Raises:
+        serializers.ValidationError: If the parameter is not 'none', 'count',
+        'all' or a non-negative number
+    """
+    value = request.query_params.get('books', 'all') if request is not None else 'all'
+    if value in ('none', 'count'):
+        return value
+    if value == 'all':
+        return API_AUTHOR_BOOKS_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise serializers.ValidationError(
+            {'books': "Expected 'all', 'none', 'count' or a number of books."}
+        )
+    return min(limit, API_AUTHOR_BOOKS_LIMIT)
+
+
+class AuthorField(serializers.PrimaryKeyRelatedField):
+    """
+    Author primary key field that looks authors up in ``context['authors']``
+    when a bulk payload preloaded them.
+    """
+    
+    def to_internal_value(self, data):
+        authors = self.context.get('authors')
+        if authors is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return authors[int(data)]
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class BookListSerializer(BulkListSerializer):
+    """
+    Bulk serializer for books.
+    
+    Reads the current year and every referenced author once per payload
+    instead of once per item.
+    """
+    
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            author_ids = set()
+            for item in data:
+                try:
+                    author_ids.add(int(item['author']))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            self.context['current_year'] = timezone.now().year
+            self.context['authors'] = Author.objects.in_bulk(author_ids)
+        return super().to_internal_value(data)
+
 
 class BookSerializer(serializers.ModelSerializer):
     """
     BookSerializer handles serialization and deserialization of Book model instances.
     
     This serializer includes all fields of the Book model and provides custom validation
-    to ensure publication_year is not in the future.
+    to ensure publication_year is not in the future. Lists use BookListSerializer
+    for bulk writes; upserts match books on title and author.
     """
+    author = AuthorField(queryset=Author.objects.all(), help_text="The author of the book")
     
     def validate_publication_year(self, value):
         """
@@ -24,7 +100,7 @@ class BookSerializer(serializers.ModelSerializer):
         Raises:
             serializers.ValidationError: If the publication year is in the future
         """
-        current_year = timezone.now().year
+        current_year = self.context.get('current_year') or timezone.now().year
         if value > current_year:
             raise serializers.ValidationError(
                 f"Publication year cannot be in the future. Current year is {current_year}."
@@ -34,6 +110,8 @@ class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = ['id', 'title', 'publication_year', 'author']
+        list_serializer_class = BookListSerializer
+        natural_key = ('title', 'author')
 
 
 class AuthorSerializer(serializers.ModelSerializer):
@@ -43,9 +121,42 @@ class AuthorSerializer(serializers.ModelSerializer):
     This serializer includes the author's name field and a nested BookSerializer
     to serialize related books dynamically. The books field is read-only to prevent
     complex nested creation through the author endpoint.
+    
+    The ``books`` query parameter controls the nesting: at most
+    API_AUTHOR_BOOKS_LIMIT books are nested by default, ``?books=<n>`` nests the
+    first n, ``?books=count`` returns only ``books_count`` and ``?books=none``
+    omits both. Views prefetch the books into ``prefetched_books`` and annotate
+    ``books_count``; without them the serializer queries per author.
     """
-    books = BookSerializer(many=True, read_only=True)
+    books = serializers.SerializerMethodField()
+    books_count = serializers.SerializerMethodField()
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        option = get_nested_books_option(self.context.get('request'))
+        if option in ('none', 'count'):
+            self.fields.pop('books')
+        if option == 'none':
+            self.fields.pop('books_count')
+        self.books_limit = option if isinstance(option, int) else 0
+    
+    def get_books(self, obj):
+        """
+        Serialize the author's first books by title, up to the requested limit.
+        """
+        if not self.books_limit:
+            return []
+        books = getattr(obj, 'prefetched_books', None)
+        if books is None:
+            books = obj.books.all()[:self.books_limit]
+        return BookSerializer(books, many=True, context=self.context).data
+    
+    def get_books_count(self, obj):
+        books_count = getattr(obj, 'books_count', None)
+        if books_count is None:
+            books_count = obj.books.count()
+        return books_count
     
     class Meta:
         model = Author
-        fields = ['id', 'name', 'books']
\ No newline at end of file
+        fields = ['id', 'name', 'books', 'books_count']
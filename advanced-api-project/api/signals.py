@@ -0,0 +1,19 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_version
+from .models import Author, Book
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_cached_lists(sender, **kwargs):
+    """
+    Bump the model's cache version now and again on commit, so a list
+    computed before the transaction commits is not cached as current.
+    """
+    bump_version(sender)
+    transaction.on_commit(partial(bump_version, sender))
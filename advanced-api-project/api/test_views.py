@@ -1,8 +1,17 @@
+import csv
+import io
+import json
+import time
+from unittest import mock
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from . import benchmark, cache as list_cache
 from .models import Author, Book
 
 
@@ -466,4 +475,447 @@ class SerializerTestCase(TestCase):
         
         self.assertIn('books', data)
         self.assertEqual(len(data['books']), 1)
-        self.assertEqual(data['books'][0]['title'], 'Test Book')
\ No newline at end of file
+        self.assertEqual(data['books'][0]['title'], 'Test Book')
+
+
+class ListCacheTestCase(APITestCase):
+    """
+    Test case for the Book and Author list response cache.
+    
+    Tests cache hits for equivalent query strings, invalidation when books and
+    authors change, and single-flight recomputation of expired pages.
+    """
+    
+    def setUp(self):
+        """
+        Set up test data with an empty cache.
+        """
+        cache.clear()
+        self.author = Author.objects.create(name="J.K. Rowling")
+        self.book = Book.objects.create(
+            title="Harry Potter and the Philosopher's Stone",
+            publication_year=1997,
+            author=self.author
+        )
+        self.client = APIClient()
+    
+    def test_equivalent_query_strings_share_a_cache_entry(self):
+        """
+        Test that parameter order and unrelated parameters do not change the key.
+        """
+        url = reverse('api:book-list')
+        response = self.client.get(url + '?search=Harry&ordering=-title')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        with self.assertNumQueries(0):
+            cached = self.client.get(url + '?ordering=-title&utm_source=feed&search=Harry')
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, response.data)
+        
+        # A different filter is a different page.
+        response = self.client.get(url, {'publication_year': 2000})
+        self.assertEqual(response.data['count'], 0)
+    
+    def test_changes_invalidate_cached_lists(self):
+        """
+        Test that saving or deleting books and authors bumps the cached lists.
+        """
+        books_url = reverse('api:book-list')
+        authors_url = reverse('api:author-list')
+        self.assertEqual(self.client.get(books_url).data['count'], 1)
+        self.assertEqual(len(self.client.get(authors_url).data['results'][0]['books']), 1)
+        
+        Book.objects.create(title="Chamber of Secrets", publication_year=1998, author=self.author)
+        self.assertEqual(self.client.get(books_url).data['count'], 2)
+        self.assertEqual(len(self.client.get(authors_url).data['results'][0]['books']), 2)
+        
+        self.author.name = "Robert Galbraith"
+        self.author.save()
+        self.assertEqual(self.client.get(authors_url).data['results'][0]['name'], "Robert Galbraith")
+        
+        self.author.delete()
+        self.assertEqual(self.client.get(books_url).data['count'], 0)
+    
+    def test_errors_are_not_cached(self):
+        """
+        Test that error responses are returned but not stored.
+        """
+        url = reverse('api:book-list') + '?page=5'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_expired_page_is_served_while_another_request_recomputes(self):
+        """
+        Test that only the lock holder recomputes a hot key.
+        """
+        url = reverse('api:book-list')
+        self.client.get(url)
+        
+        with mock.patch.object(time, 'time', return_value=time.time() + list_cache.API_LIST_CACHE_TIMEOUT + 1):
+            # Another request holds the lock: the expired page is served.
+            with mock.patch.object(cache, 'add', return_value=False), self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.data['count'], 1)
+            
+            # Otherwise the page is recomputed.
+            with self.assertNumQueries(2):
+                self.client.get(url)
+    
+    def test_missing_page_waits_for_the_lock_holder(self):
+        """
+        Test that a request without a page to serve computes it after waiting.
+        """
+        url = reverse('api:book-list')
+        with mock.patch.object(cache, 'add', return_value=False), \
+                mock.patch.object(list_cache, 'API_LIST_CACHE_WAIT', 0.1), self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+
+
+class NestedBooksTestCase(APITestCase):
+    """
+    Test case for the books nested in author responses.
+    
+    Tests prefetching, the ``books`` query parameter and its validation.
+    """
+    
+    def setUp(self):
+        """
+        Set up authors with different numbers of books.
+        """
+        cache.clear()
+        self.authors = []
+        for i in range(5):
+            author = Author.objects.create(name=f"Author {i}")
+            for j in range(i + 1):
+                Book.objects.create(title=f"Book {i}-{j}", publication_year=2000 + j, author=author)
+            self.authors.append(author)
+        self.client = APIClient()
+    
+    def get_authors(self, **params):
+        response = self.client.get(reverse('api:author-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+    
+    def test_list_query_count_does_not_grow_with_authors(self):
+        """
+        Test that books are prefetched: count, page and books in three queries.
+        """
+        with self.assertNumQueries(3):
+            authors = self.get_authors()
+        self.assertEqual([len(a['books']) for a in authors], [1, 2, 3, 4, 5])
+        self.assertEqual(authors[4]['books_count'], 5)
+    
+    def test_limit_nested_books(self):
+        """
+        Test that ``?books=<n>`` nests the first n books by title.
+        """
+        authors = self.get_authors(books=2)
+        self.assertEqual([len(a['books']) for a in authors], [1, 2, 2, 2, 2])
+        self.assertEqual([b['title'] for b in authors[4]['books']], ['Book 4-0', 'Book 4-1'])
+        self.assertEqual(authors[4]['books_count'], 5)
+        
+        with mock.patch('api.serializers.API_AUTHOR_BOOKS_LIMIT', 3):
+            self.assertEqual(len(self.get_authors(books='all')[4]['books']), 3)
+    
+    def test_counts_only_and_omitted_books(self):
+        """
+        Test that ``?books=count`` and ``?books=none`` skip the prefetch.
+        """
+        with self.assertNumQueries(2):
+            authors = self.get_authors(books='count')
+        self.assertNotIn('books', authors[0])
+        self.assertEqual([a['books_count'] for a in authors], [1, 2, 3, 4, 5])
+        
+        authors = self.get_authors(books='none')
+        self.assertEqual(set(authors[0]), {'id', 'name'})
+    
+    def test_invalid_books_parameter(self):
+        """
+        Test that unsupported ``books`` values are rejected.
+        """
+        response = self.client.get(reverse('api:author-list'), {'books': '-1'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('books', response.data)
+    
+    def test_author_detail(self):
+        """
+        Test that the detail endpoint honours the same parameter.
+        """
+        url = reverse('api:author-detail', args=[self.authors[4].id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'books': 1})
+        self.assertEqual(len(response.data['books']), 1)
+        self.assertEqual(response.data['books_count'], 5)
+
+
+class BookBulkAPITestCase(APITestCase):
+    """
+    Test case for the bulk Book endpoint.
+    
+    Tests bulk creation, per-item validation errors, upserts on the natural
+    key, bulk updates and bulk deletion.
+    """
+    
+    def setUp(self):
+        """
+        Set up an authenticated client and two authors.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.author = Author.objects.create(name="J.K. Rowling")
+        self.author2 = Author.objects.create(name="George R.R. Martin")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api:book-bulk')
+    
+    def test_bulk_create_validates_in_one_pass(self):
+        """
+        Test that a list payload is validated and inserted in batches.
+        """
+        data = [
+            {'title': f'Book {i}', 'publication_year': 2000 + i, 'author': self.author.id}
+            for i in range(10)
+        ]
+        # One author lookup, then three batched INSERTs inside a savepoint.
+        with mock.patch('api.bulk.API_BULK_BATCH_SIZE', 4), self.assertNumQueries(6):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 10)
+        self.assertEqual(Book.objects.count(), 10)
+    
+    def test_bulk_create_reports_errors_per_item(self):
+        """
+        Test that invalid items are reported by index and nothing is written.
+        """
+        data = [
+            {'title': 'Valid', 'publication_year': 2000, 'author': self.author.id},
+            {'title': 'Future', 'publication_year': 3000, 'author': self.author.id},
+            {'title': 'Orphan', 'publication_year': 2000, 'author': 9999},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2])
+        self.assertIn('publication_year', response.data['errors'][0]['errors'])
+        self.assertIn('author', response.data['errors'][1]['errors'])
+        self.assertFalse(Book.objects.exists())
+        
+        response = self.client.post(self.url, {'title': 'Not a list'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_upsert_on_title_and_author(self):
+        """
+        Test that upserts update books with the same title and author.
+        """
+        existing = Book.objects.create(title="A Game of Thrones", publication_year=1990, author=self.author2)
+        data = [
+            {'title': "A Game of Thrones", 'publication_year': 1996, 'author': self.author2.id},
+            {'title': "A Game of Thrones", 'publication_year': 2001, 'author': self.author.id},
+        ]
+        response = self.client.post(self.url + '?upsert=true', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        existing.refresh_from_db()
+        self.assertEqual(existing.publication_year, 1996)
+        self.assertEqual(Book.objects.count(), 2)
+    
+    def test_bulk_update_and_delete(self):
+        """
+        Test updating books by id and deleting them by id.
+        """
+        books = [
+            Book.objects.create(title=f'Book {i}', publication_year=2000, author=self.author)
+            for i in range(3)
+        ]
+        data = [{'id': book.id, 'publication_year': 2010} for book in books[:2]]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(
+            list(Book.objects.order_by('title').values_list('publication_year', flat=True)),
+            [2010, 2010, 2000]
+        )
+        
+        response = self.client.patch(self.url, [{'id': 9999, 'title': 'Missing'}], format='json')
+        self.assertEqual(response.data['errors'][0]['errors']['id'], ['Expected the id of an existing object.'])
+        
+        response = self.client.delete(self.url, {'ids': [books[0].id, books[1].id, 9999]}, format='json')
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(list(Book.objects.all()), [books[2]])
+    
+    def test_bulk_writes_invalidate_cached_lists(self):
+        """
+        Test that bulk writes are visible in the cached list.
+        """
+        list_url = reverse('api:book-list')
+        self.assertEqual(self.client.get(list_url).data['count'], 0)
+        self.client.post(self.url, [
+            {'title': 'New', 'publication_year': 2000, 'author': self.author.id}
+        ], format='json')
+        self.assertEqual(self.client.get(list_url).data['count'], 1)
+    
+    def test_requires_authentication(self):
+        """
+        Test that unauthenticated users cannot write in bulk.
+        """
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.url, [], format='json')
+        self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+
+class ExportAPITestCase(APITestCase):
+    """
+    Test case for the streaming Book and Author exports.
+    
+    Tests NDJSON and CSV output, format negotiation and filtering.
+    """
+    
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        self.author = Author.objects.create(name="J.K. Rowling")
+        self.author2 = Author.objects.create(name="George R.R. Martin")
+        for i in range(5):
+            Book.objects.create(title=f"Book {i}", publication_year=2000 + i, author=self.author)
+        Book.objects.create(title="A Game of Thrones", publication_year=1996, author=self.author2)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def export(self, name, **params):
+        response = self.client.get(reverse(f'api:{name}-export'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response
+    
+    def test_ndjson_export_streams_all_rows_in_one_query(self):
+        """
+        Test that every book is exported, one JSON object per line.
+        """
+        response = self.export('book')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('books.ndjson', response['Content-Disposition'])
+        with self.assertNumQueries(1):
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0], {
+            'id': rows[0]['id'], 'title': "A Game of Thrones",
+            'publication_year': 1996, 'author': self.author2.id,
+        })
+    
+    def test_csv_export(self):
+        """
+        Test CSV output through the format parameter and the Accept header.
+        """
+        content = b''.join(self.export('author', format='csv').streaming_content).decode()
+        self.assertEqual(list(csv.reader(io.StringIO(content))), [
+            ['id', 'name'],
+            [str(self.author2.id), "George R.R. Martin"],
+            [str(self.author.id), "J.K. Rowling"],
+        ])
+        
+        response = self.client.get(reverse('api:book-export'), HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+    
+    def test_export_applies_list_filters(self):
+        """
+        Test that the export honours the list endpoint's filters and ordering.
+        """
+        response = self.export('book', author=self.author.id, ordering='-publication_year')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['publication_year'] for row in rows], [2004, 2003, 2002, 2001, 2000])
+        
+        response = self.export('book', search='thrones')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+    
+    def test_export_requires_authentication(self):
+        """
+        Test that unauthenticated users cannot export.
+        """
+        self.client.force_authenticate(user=None)
+        for name in ('book', 'author'):
+            response = self.client.get(reverse(f'api:{name}-export'))
+            self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+
+class SeedCatalogTestCase(APITestCase):
+    """
+    Test case for the seed_catalog management command.
+    """
+    
+    def seed(self, **options):
+        call_command('seed_catalog', stdout=io.StringIO(), **options)
+    
+    def test_creates_requested_volumes(self):
+        """
+        Test that the requested numbers of authors and books are created.
+        """
+        self.seed(authors=20, books=300, batch_size=50)
+        self.assertEqual(Author.objects.count(), 20)
+        self.assertEqual(Book.objects.count(), 300)
+        self.assertFalse(Book.objects.filter(publication_year__gt=2020).exists())
+    
+    def test_books_per_author_are_skewed(self):
+        """
+        Test that the most prolific author has far more books than average.
+        """
+        self.seed(authors=50, books=1000)
+        most = Author.objects.annotate(count=Count('books')).order_by('-count')[0].count
+        self.assertGreater(most, 5 * 1000 / 50)
+    
+    def test_same_seed_same_catalog(self):
+        """
+        Test that a seed always generates the same catalog.
+        """
+        def catalog():
+            return list(Book.objects.order_by('id').values_list('title', 'publication_year', 'author__name'))
+        
+        self.seed(authors=10, books=100, seed=3)
+        first = catalog()
+        Author.objects.all().delete()
+        self.seed(authors=10, books=100, seed=3, batch_size=7)
+        self.assertEqual(catalog(), first)
+    
+    def test_invalidates_cached_lists(self):
+        """
+        Test that seeding bumps the list cache versions, which bulk_create
+        does not do through signals.
+        """
+        before = list_cache.get_versions([Author, Book])
+        self.seed(authors=1, books=1)
+        after = list_cache.get_versions([Author, Book])
+        self.assertTrue(all(new > old for old, new in zip(before, after)))
+
+
+class BenchmarkTestCase(APITestCase):
+    """
+    Test case for the measurements behind the benchmark command.
+    """
+    
+    def setUp(self):
+        """
+        Set up test data.
+        """
+        cache.clear()
+        author = Author.objects.create(name="J.K. Rowling")
+        Book.objects.create(title="Book", publication_year=2000, author=author)
+    
+    def test_cached_and_uncached_book_list(self):
+        """
+        Test that the query count reflects whether the list was cached.
+        """
+        url = reverse('api:book-list')
+        cached = benchmark.measure(benchmark.Scenario('cached', url), self.client, iterations=2, warmup=1)
+        uncached = benchmark.measure(
+            benchmark.Scenario('uncached', url, reset=lambda client: cache.clear()),
+            self.client, iterations=2, warmup=1
+        )
+        self.assertEqual(cached['queries'], 0)
+        self.assertGreater(uncached['queries'], 0)
+        self.assertEqual(
+            benchmark.compare({'small': {'list': uncached}}, {'small': {'list': {**uncached, 'queries': 0}}}),
+            [f"small/list: {uncached['queries']} queries (baseline 0)"]
+        )
@@ -6,9 +6,12 @@ app_name = 'api'
 urlpatterns = [
     # Book endpoints
     path('books/', views.BookListView.as_view(), name='book-list'),
+    path('books/bulk/', views.BookBulkView.as_view(), name='book-bulk'),
+    path('books/export/', views.BookExportView.as_view(), name='book-export'),
     path('books/<int:pk>/', views.BookDetailView.as_view(), name='book-detail'),
     
     # Author endpoints
     path('authors/', views.AuthorListView.as_view(), name='author-list'),
+    path('authors/export/', views.AuthorExportView.as_view(), name='author-export'),
     path('authors/<int:pk>/', views.AuthorDetailView.as_view(), name='author-detail'),
 ]
\ No newline at end of file
@@ -1,16 +1,41 @@
+from django.db.models import Count, Prefetch
 from rest_framework import generics, permissions
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from .bulk import BulkWriteMixin
+from .cache import CachedListMixin
+from .export import ExportMixin
 from .models import Book, Author
-from .serializers import BookSerializer, AuthorSerializer
+from .serializers import BookSerializer, AuthorSerializer, get_nested_books_option
+from .signals import invalidate_cached_lists
 
 
-class BookListView(generics.ListCreateAPIView):
+def with_nested_books(queryset, request):
+    """
+    Prepare an Author queryset for AuthorSerializer.
+    
+    Annotates ``books_count`` and prefetches the books to nest in one query,
+    limited per author according to the ``books`` query parameter, instead of
+    one query per author.
+    """
+    option = get_nested_books_option(request)
+    if option == 'none':
+        return queryset
+    queryset = queryset.annotate(books_count=Count('books'))
+    if isinstance(option, int) and option > 0:
+        queryset = queryset.prefetch_related(Prefetch(
+            'books', queryset=Book.objects.order_by('title', 'id')[:option], to_attr='prefetched_books'
+        ))
+    return queryset
+
+
+class BookListView(CachedListMixin, generics.ListCreateAPIView):
     """
     ListCreateAPIView for Book model.
     
     Provides GET (list all books) and POST (create new book) operations.
-    Includes filtering, searching, and ordering capabilities.
+    Includes filtering, searching, and ordering capabilities. List pages are
+    cached until a Book or Author changes.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
@@ -19,6 +44,7 @@ class BookListView(generics.ListCreateAPIView):
     search_fields = ['title', 'author__name']
     ordering_fields = ['title', 'publication_year', 'author__name']
     ordering = ['title']
+    cache_dependencies = [Book, Author]
     
     def get_permissions(self):
         """
@@ -33,6 +59,54 @@ class BookListView(generics.ListCreateAPIView):
         return [permission() for permission in permission_classes]
 
 
+class BookBulkView(BulkWriteMixin, generics.GenericAPIView):
+    """
+    Bulk endpoint for Book model.
+    
+    Provides POST (create a list of books, or upsert them on title and author
+    with ``?upsert=true``), PATCH (update a list of books by id) and DELETE
+    (delete ``{"ids": [...]}``) operations. Payloads are validated in one pass
+    and written in one transaction; invalid items are reported by index.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, *args, **kwargs):
+        return self.bulk_create(request, *args, **kwargs)
+    
+    def patch(self, request, *args, **kwargs):
+        return self.bulk_update(request, *args, **kwargs)
+    
+    def delete(self, request, *args, **kwargs):
+        return self.bulk_destroy(request, *args, **kwargs)
+    
+    def bulk_written(self, model):
+        """
+        Invalidate cached book and author lists.
+        """
+        invalidate_cached_lists(model)
+
+
+class BookExportView(ExportMixin, generics.GenericAPIView):
+    """
+    Streaming export of Book model.
+    
+    Provides GET (stream every book as NDJSON or CSV) with the same filtering,
+    searching and ordering as BookListView, without pagination. Like the bulk
+    endpoints it requires authentication, since one request reads every row.
+    """
+    queryset = Book.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = BookListView.filterset_fields
+    search_fields = BookListView.search_fields
+    ordering_fields = BookListView.ordering_fields
+    ordering = BookListView.ordering
+    export_fields = ['id', 'title', 'publication_year', 'author']
+    export_filename = 'books'
+
+
 class BookDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     RetrieveUpdateDestroyAPIView for Book model.
@@ -56,11 +130,13 @@ class BookDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permission() for permission in permission_classes]
 
 
-class AuthorListView(generics.ListCreateAPIView):
+class AuthorListView(CachedListMixin, generics.ListCreateAPIView):
     """
     ListCreateAPIView for Author model.
     
     Provides GET (list all authors) and POST (create new author) operations.
+    List pages, which nest each author's books, are cached until a Book or
+    Author changes.
     """
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
@@ -68,6 +144,11 @@ class AuthorListView(generics.ListCreateAPIView):
     search_fields = ['name']
     ordering_fields = ['name']
     ordering = ['name']
+    cache_dependencies = [Author, Book]
+    cache_query_params = ['books']
+    
+    def get_queryset(self):
+        return with_nested_books(super().get_queryset(), self.request)
     
     def get_permissions(self):
         """
@@ -82,6 +163,24 @@ class AuthorListView(generics.ListCreateAPIView):
         return [permission() for permission in permission_classes]
 
 
+class AuthorExportView(ExportMixin, generics.GenericAPIView):
+    """
+    Streaming export of Author model.
+    
+    Provides GET (stream every author as NDJSON or CSV) with the same searching
+    and ordering as AuthorListView. Books are exported separately. Requires
+    authentication.
+    """
+    queryset = Author.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [SearchFilter, OrderingFilter]
+    search_fields = AuthorListView.search_fields
+    ordering_fields = AuthorListView.ordering_fields
+    ordering = AuthorListView.ordering
+    export_fields = ['id', 'name']
+    export_filename = 'authors'
+
+
 class AuthorDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     RetrieveUpdateDestroyAPIView for Author model.
@@ -92,6 +191,9 @@ class AuthorDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     
+    def get_queryset(self):
+        return with_nested_books(super().get_queryset(), self.request)
+    
     def get_permissions(self):
         """
         Customize permissions based on the HTTP method.
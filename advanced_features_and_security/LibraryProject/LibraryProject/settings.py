@@ -460,5 +460,5 @@ SECURITY_MIDDLEWARE_ORDER = [
     # ... other middleware
 ]
 
-print(" HTTPS and Security Headers configured successfully!")
-print(" Please review the settings and adjust for your deployment environment.")
+print("🔒 HTTPS and Security Headers configured successfully!")
+print("📝 Please review the settings and adjust for your deployment environment.")
@@ -0,0 +1,228 @@
+"""
+Import books from a CSV or NDJSON catalog file.
+
+Each record has a ``title``, an ``author`` name and optionally the
+``libraries`` holding the book (a list in NDJSON, names separated by ``|`` in
+CSV). Records are streamed from the file and written in batches: missing
+authors and libraries are created with ``bulk_create`` and resolved through
+in-memory name -> id maps, books are inserted with ``bulk_create`` and their
+library links are inserted directly into the ``Library.books`` through table.
+
+Each batch saves the byte offset reached to the file's CatalogImport row in
+the same transaction, so the checkpoint never disagrees with what was
+committed: an interrupted import of a huge file continues with ``--resume``
+instead of starting over, and without importing books twice.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from relationship_app.models import Author, Book, CatalogImport, Library
+
+LibraryBook = Library.books.through
+
+TITLE_MAX_LENGTH = Book._meta.get_field('title').max_length
+NAME_MAX_LENGTH = min(
+    Author._meta.get_field('name').max_length, Library._meta.get_field('name').max_length
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk import books, authors and library holdings from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Catalog file, or '-' for standard input")
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help='Input format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Records written per transaction',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue from the checkpoint of an interrupted import',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if path == '-':
+            if options['resume']:
+                raise CommandError('Standard input cannot be resumed')
+            source = None
+            stream = sys.stdin.buffer
+        else:
+            source = os.path.abspath(path)
+            try:
+                stream = open(path, 'rb')
+            except OSError as exc:
+                raise CommandError(f'Cannot open {path}: {exc}')
+
+        state = {'offset': 0, 'records': 0, 'books': 0, 'authors': 0, 'libraries': 0, 'links': 0, 'skipped': 0}
+        if options['resume']:
+            state = self.read_checkpoint(source)
+
+        self.authors = self.name_map(Author)
+        self.libraries = self.name_map(Library)
+        started = time.monotonic()
+        imported_before = state['records']
+
+        with stream:
+            reader = CatalogReader(stream, fmt, state['offset'])
+            reader.skipped = state['skipped']
+            batch = []
+            for record in reader:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    self.write_batch(batch, reader, state, source)
+                    self.report(state, started, imported_before)
+                    batch = []
+            if batch:
+                self.write_batch(batch, reader, state, source)
+            state['skipped'] = reader.skipped
+
+        if source is not None:
+            CatalogImport.objects.filter(source=source).delete()
+
+        elapsed = time.monotonic() - started
+        rate = (state['records'] - imported_before) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {state['books']} books ({state['authors']} new authors, "
+            f"{state['libraries']} new libraries, {state['links']} library links) "
+            f"in {elapsed:.1f}s, {rate:.0f} records/s"
+        ))
+        if state['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {state['skipped']} invalid records (unparsable, missing or overlong title or author)"
+            ))
+
+    def name_map(self, model):
+        """Map every existing name to its lowest id."""
+        names = {}
+        for pk, name in model.objects.order_by('-id').values_list('id', 'name').iterator(chunk_size=10000):
+            names[name] = pk
+        return names
+
+    def create_missing(self, model, names, known):
+        """Bulk create the names not in ``known`` and add their ids to it."""
+        missing = [name for name in dict.fromkeys(names) if name not in known]
+        for obj in model.objects.bulk_create([model(name=name) for name in missing]):
+            known[obj.name] = obj.pk
+        return len(missing)
+
+    def write_batch(self, batch, reader, state, source):
+        """Write a batch and, in the same transaction, the checkpoint after it."""
+        progress = dict(state)
+        with transaction.atomic():
+            progress['authors'] += self.create_missing(Author, (r['author'] for r in batch), self.authors)
+            progress['libraries'] += self.create_missing(
+                Library, (name for r in batch for name in r['libraries']), self.libraries
+            )
+            books = Book.objects.bulk_create([
+                Book(title=r['title'], author_id=self.authors[r['author']]) for r in batch
+            ])
+            links = LibraryBook.objects.bulk_create([
+                LibraryBook(library_id=self.libraries[name], book_id=book.pk)
+                for record, book in zip(batch, books)
+                for name in dict.fromkeys(record['libraries'])
+            ], ignore_conflicts=True)
+            progress['records'] += len(batch)
+            progress['books'] += len(books)
+            progress['links'] += len(links)
+            progress['offset'] = reader.offset
+            progress['skipped'] = reader.skipped
+            if source is not None:
+                CatalogImport.objects.update_or_create(source=source, defaults={'state': progress})
+        state.update(progress)
+
+    def read_checkpoint(self, source):
+        try:
+            state = CatalogImport.objects.get(source=source).state
+        except CatalogImport.DoesNotExist:
+            raise CommandError(f'No interrupted import of {source} to resume')
+        self.stdout.write(f"Resuming after {state['records']} records")
+        return state
+
+    def report(self, state, started, imported_before):
+        if self.verbosity < 2:
+            return
+        elapsed = time.monotonic() - started
+        rate = (state['records'] - imported_before) / elapsed if elapsed else 0
+        self.stdout.write(f"{state['records']} records, {rate:.0f} records/s")
+
+
+class CatalogReader:
+    """
+    Iterates over the records of a binary stream starting at ``offset``.
+    ``offset`` is updated to the end of the last record read, so it can be
+    checkpointed between records.
+    """
+
+    def __init__(self, stream, fmt, offset=0):
+        self.stream = stream
+        self.format = fmt
+        self.offset = 0
+        self.skipped = 0
+        self.fieldnames = None
+        if fmt == 'csv':
+            # The header is always read from the start of the file.
+            self.fieldnames = next(csv.reader([self.readline()]), None)
+            if self.fieldnames is None:
+                raise CommandError('The CSV file has no header row')
+        if offset > self.offset:
+            stream.seek(offset)
+            self.offset = offset
+
+    def readline(self):
+        line = self.stream.readline()
+        self.offset += len(line)
+        return line.decode('utf-8-sig' if self.offset == len(line) else 'utf-8')
+
+    def lines(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def __iter__(self):
+        if self.format == 'csv':
+            rows = (dict(zip(self.fieldnames, row)) for row in csv.reader(self.lines()))
+        else:
+            rows = (self.parse_json(line) for line in self.lines() if line.strip())
+        for row in rows:
+            record = self.clean(row) if isinstance(row, dict) else None
+            if record is None:
+                self.skipped += 1
+            else:
+                yield record
+
+    def parse_json(self, line):
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    def clean(self, row):
+        title = str(row.get('title') or '').strip()
+        author = str(row.get('author') or '').strip()
+        libraries = row.get('libraries') or []
+        if isinstance(libraries, str):
+            libraries = libraries.split('|')
+        libraries = [str(name).strip() for name in libraries if str(name).strip()]
+        if not title or not author or len(title) > TITLE_MAX_LENGTH:
+            return None
+        if any(len(name) > NAME_MAX_LENGTH for name in [author, *libraries]):
+            return None
+        return {'title': title, 'author': author, 'libraries': libraries}
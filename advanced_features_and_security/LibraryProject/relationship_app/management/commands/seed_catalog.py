@@ -0,0 +1,147 @@
+"""
+Generate a deterministic synthetic catalog of authors, books, libraries and
+librarians, with library holdings.
+
+Books are assigned to authors, and held by libraries, with probability
+proportional to ``1 / rank ** exponent``: a few prolific authors write most
+of the books and a few large libraries hold most of the copies, like a real
+catalog. All random choices come from one ``random.Random(seed)`` stream, so
+the same options always produce the same rows. Rows, including the
+``Library.books`` links, are written with ``bulk_create`` in batches, one
+transaction per batch.
+
+django-models and advanced_features_and_security carry identical copies of
+this command and of import_catalog: the two LibraryProjects are separate
+projects that share no package, so a change to one copy is made to both.
+"""
+
+import bisect
+import itertools
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from relationship_app.models import Author, Book, Library, Librarian
+
+LibraryBook = Library.books.through
+
+WORDS = (
+    'shadow river house night garden storm silent winter summer city stone '
+    'glass secret last first lost empire light dark song letter island road '
+    'fire iron golden broken hidden wild long short little great old new '
+    'history guide art science journey dream memory war peace love time'
+).split()
+
+FIRST_NAMES = 'Ada Ben Chloe David Elena Farid Grace Hiro Ines Jonas Kemi Liam Maya Noor Omar Priya'.split()
+LAST_NAMES = 'Adams Baker Chen Diaz Evans Fischer Garcia Haddad Ito Jones Khan Lopez Mensah Novak Okafor Petrov'.split()
+TOWNS = 'Northfield Riverside Oakdale Lakeview Hillcrest Fairview Greenwood Springfield'.split()
+
+
+class ZipfChooser:
+    """Picks ids with probability proportional to ``1 / rank ** exponent``."""
+
+    def __init__(self, rng, ids, exponent):
+        self.rng = rng
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** exponent for rank in range(len(self.ids))
+        ))
+
+    def choose(self):
+        return self.ids[bisect.bisect_left(self.cum_weights, self.rng.random() * self.cum_weights[-1])]
+
+    def sample(self, count):
+        """Up to ``count`` distinct ids; popular ids may be drawn repeatedly."""
+        chosen = {}
+        for _ in range(count * 3):
+            if len(chosen) >= min(count, len(self.ids)):
+                break
+            chosen[self.choose()] = None
+        return list(chosen)
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic catalog of authors, books and libraries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000, help='Authors to create')
+        parser.add_argument('--books', type=int, default=10000, help='Books to create')
+        parser.add_argument('--libraries', type=int, default=50, help='Libraries to create, each with a librarian')
+        parser.add_argument(
+            '--holdings', type=float, default=3,
+            help='Mean number of libraries holding each book',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.0,
+            help='Power-law exponent of books per author and per library',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['authors'], options['libraries'], options['batch_size']) < 1 or options['books'] < 0:
+            raise CommandError('--authors, --libraries and --batch-size must be positive and --books not negative')
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+
+        author_ids = self.create(Author, [
+            Author(name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}')
+            for i in range(options['authors'])
+        ])
+        library_ids = self.create(Library, [
+            Library(name=f'{rng.choice(TOWNS)} Library {i}') for i in range(options['libraries'])
+        ])
+        self.create(Librarian, [
+            Librarian(name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', library_id=pk)
+            for pk in library_ids
+        ])
+        authors = ZipfChooser(rng, author_ids, options['exponent'])
+        libraries = ZipfChooser(rng, library_ids, options['exponent'])
+
+        books = links = 0
+        for start in range(0, options['books'], self.batch_size):
+            count = min(self.batch_size, options['books'] - start)
+            # Each book draws its title, author and holdings in turn, so the
+            # rows do not depend on the batch size.
+            batch = []
+            for _ in range(count):
+                book = Book(
+                    title=' '.join(rng.choices(WORDS, k=rng.randint(1, 5))).title(),
+                    author_id=authors.choose(),
+                )
+                held = libraries.sample(
+                    int(rng.expovariate(1 / options['holdings']))
+                ) if options['holdings'] > 0 else []
+                batch.append((book, held))
+            with transaction.atomic():
+                created = Book.objects.bulk_create([book for book, _ in batch])
+                holdings = [
+                    LibraryBook(library_id=library_id, book_id=book.pk)
+                    for book, held in batch
+                    for library_id in held
+                ]
+                LibraryBook.objects.bulk_create(holdings, batch_size=self.batch_size)
+            books += len(created)
+            links += len(holdings)
+            if self.verbosity >= 2:
+                self.stdout.write(f'{books} books ({time.monotonic() - started:.1f}s)')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(author_ids)} authors, {books} books, {len(library_ids)} libraries '
+            f'and {links} library links in {elapsed:.1f}s'
+        ))
+
+    def create(self, model, objs):
+        """Bulk create ``objs`` in batches and return their ids."""
+        ids = []
+        for start in range(0, len(objs), self.batch_size):
+            with transaction.atomic():
+                ids.extend(obj.pk for obj in model.objects.bulk_create(objs[start:start + self.batch_size]))
+        return ids
@@ -37,6 +37,15 @@ class Librarian(models.Model):
     def __str__(self):
         return f"{self.name} - {self.library.name}"
 
+class CatalogImport(models.Model):
+    """Checkpoint of an import_catalog run, saved with each batch it writes."""
+    source = models.CharField(max_length=500, unique=True)
+    state = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.source
+
 class UserProfile(models.Model):
     ROLE_CHOICES = [
         ('Admin', 'Admin'),
@@ -1,3 +1,139 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
 from django.test import TestCase
+from .models import Author, Book, CatalogImport, Librarian, Library
 
-# Create your tests here.
+
+class ImportCatalogTestCase(TestCase):
+    """
+    Test the import_catalog command.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def import_catalog(self, path, *args):
+        out = StringIO()
+        call_command('import_catalog', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        Author.objects.create(name='Frank Herbert')
+        path = self.write('catalog.csv', (
+            'title,author,libraries\n'
+            'Dune,Frank Herbert,Central|East\n'
+            'Emma,Jane Austen,Central\n'
+            '"Pride, Prejudice",Jane Austen,\n'
+        ))
+        output = self.import_catalog(path, '--batch-size', '2')
+        self.assertIn('Imported 3 books (1 new authors, 2 new libraries, 3 library links)', output)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(
+            sorted(Library.objects.get(name='Central').books.values_list('title', flat=True)),
+            ['Dune', 'Emma']
+        )
+        self.assertEqual(Book.objects.get(title='Pride, Prejudice').author.name, 'Jane Austen')
+        self.assertFalse(CatalogImport.objects.exists())
+
+    def test_rejected_rows_are_skipped(self):
+        path = self.write('catalog.ndjson', '\n'.join([
+            json.dumps({'title': 'Dune', 'author': 'Frank Herbert', 'libraries': ['Central']}),
+            '{not json',
+            json.dumps({'title': 'No author'}),
+            json.dumps({'title': 'x' * 201, 'author': 'Frank Herbert'}),
+            json.dumps(['not', 'a', 'record']),
+            json.dumps({'title': 'Emma', 'author': 'Jane Austen'}),
+        ]))
+        output = self.import_catalog(path)
+        self.assertIn('Skipped 4 invalid records', output)
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), ['Dune', 'Emma'])
+
+    def test_resume_after_interruption(self):
+        path = self.write('catalog.csv', 'title,author\n' + ''.join(
+            f'Book {i},Author {i % 2}\n' for i in range(5)
+        ))
+        update_or_create = CatalogImport.objects.update_or_create
+        saved = []
+
+        def save_checkpoint(**kwargs):
+            # The second batch fails while saving its checkpoint.
+            saved.append(kwargs)
+            if len(saved) == 2:
+                raise RuntimeError('interrupted')
+            return update_or_create(**kwargs)
+
+        with mock.patch.object(CatalogImport.objects, 'update_or_create', side_effect=save_checkpoint):
+            with self.assertRaises(RuntimeError):
+                self.import_catalog(path, '--batch-size', '2')
+        # The failed batch was rolled back with its checkpoint.
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(CatalogImport.objects.get().state['records'], 2)
+
+        output = self.import_catalog(path, '--batch-size', '2', '--resume')
+        self.assertIn('Resuming after 2 records', output)
+        self.assertEqual(
+            sorted(Book.objects.values_list('title', flat=True)), [f'Book {i}' for i in range(5)]
+        )
+        self.assertFalse(CatalogImport.objects.exists())
+
+        with self.assertRaises(CommandError):
+            self.import_catalog(path, '--resume')
+
+
+class SeedCatalogTestCase(TestCase):
+    """
+    Test the seed_catalog command.
+    """
+
+    def seed(self, **options):
+        call_command('seed_catalog', stdout=StringIO(), **options)
+
+    def test_creates_requested_volumes(self):
+        self.seed(authors=20, books=300, libraries=5, batch_size=50)
+        self.assertEqual(Author.objects.count(), 20)
+        self.assertEqual(Book.objects.count(), 300)
+        self.assertEqual(Library.objects.count(), 5)
+        self.assertEqual(Librarian.objects.count(), 5)
+        self.assertTrue(Library.books.through.objects.exists())
+
+        self.seed(authors=1, books=10, libraries=1, holdings=0)
+        self.assertEqual(Book.objects.count(), 310)
+        with self.assertRaises(CommandError):
+            self.seed(authors=0)
+
+    def test_books_per_author_are_skewed(self):
+        self.seed(authors=50, books=1000, libraries=10)
+        most = Author.objects.annotate(count=Count('book')).order_by('-count')[0].count
+        self.assertGreater(most, 5 * 1000 / 50)
+
+    def test_same_seed_same_catalog(self):
+        def catalog():
+            return (
+                list(Book.objects.order_by('id').values_list('title', 'author__name')),
+                list(Library.books.through.objects.order_by('book_id', 'library_id').values_list(
+                    'book__title', 'library__name'
+                )),
+            )
+
+        self.seed(authors=10, books=100, libraries=4, seed=3)
+        first = catalog()
+        for model in (Library, Author):
+            model.objects.all().delete()
+        self.seed(authors=10, books=100, libraries=4, seed=3, batch_size=7)
+        self.assertEqual(catalog(), first)
+        self.seed(authors=10, books=100, libraries=4, seed=4)
+        self.assertNotEqual(catalog()[0][100:], first[0])
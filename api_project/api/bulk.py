@@ -0,0 +1,208 @@
+"""
+Bulk writes for list payloads.
+
+BulkListSerializer validates a list of items in one pass, reporting errors
+per item, and writes them with ``bulk_create``/``bulk_update`` in batches of
+API_BULK_BATCH_SIZE. BulkWriteMixin adds the matching view handlers; each
+request is written in a single transaction, so a payload with any invalid
+item writes nothing.
+
+Upserts match existing rows on the natural key named by the child
+serializer's ``Meta.natural_key``: matching rows are updated and the rest
+created. String key fields are matched regardless of case and spacing.
+"""
+
+import re
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+# Rows per INSERT/UPDATE statement.
+API_BULK_BATCH_SIZE = getattr(settings, 'API_BULK_BATCH_SIZE', 500)
+
+# Most items accepted in one request.
+API_BULK_MAX_ITEMS = getattr(settings, 'API_BULK_MAX_ITEMS', 10000)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer with bulk create, update and upsert.
+
+    For updates, pass the instances (any iterable) and items carrying their
+    ``id``; each item is validated against its own instance.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', API_BULK_MAX_ITEMS)
+        super().__init__(*args, **kwargs)
+        self._instances_by_pk = None
+        self._matched_instances = []
+
+    @property
+    def model(self):
+        return self.child.Meta.model
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        if self._instances_by_pk is None:
+            self._instances_by_pk = {obj.pk: obj for obj in self.instance}
+        try:
+            instance = self._instances_by_pk[_item_id(data)]
+        except KeyError:
+            raise serializers.ValidationError({'id': ['Expected the id of an existing object.']})
+        self.child.instance = instance
+        validated = super().run_child_validation(data)
+        self._matched_instances.append(instance)
+        return validated
+
+    def create(self, validated_data):
+        objs = [self.model(**attrs) for attrs in validated_data]
+        return self.model.objects.bulk_create(objs, batch_size=API_BULK_BATCH_SIZE)
+
+    def update(self, instances, validated_data):
+        fields = set()
+        for instance, attrs in zip(self._matched_instances, validated_data):
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+            fields.update(attrs)
+        if fields:
+            self.model.objects.bulk_update(
+                self._matched_instances, sorted(fields), batch_size=API_BULK_BATCH_SIZE
+            )
+        return self._matched_instances
+
+    def upsert(self):
+        """
+        Update the rows matching each item's natural key and create the rest.
+
+        Returns:
+            tuple: The created and the updated instances
+        """
+        key_fields = self.child.Meta.natural_key
+        items = {}
+        for attrs in self.validated_data:
+            # Later items win over earlier ones with the same key.
+            items[tuple(_key_value(attrs[name]) for name in key_fields)] = attrs
+
+        existing = {}
+        batch = list(items.values())
+        for start in range(0, len(batch), API_BULK_BATCH_SIZE):
+            condition = Q()
+            for attrs in batch[start:start + API_BULK_BATCH_SIZE]:
+                condition |= Q(**dict(_key_lookup(name, attrs[name]) for name in key_fields))
+            for obj in self.model.objects.filter(condition).order_by('pk'):
+                existing.setdefault(tuple(_key_value(getattr(obj, name)) for name in key_fields), obj)
+
+        to_update = []
+        fields = set()
+        for key, obj in existing.items():
+            for name, value in items.pop(key).items():
+                setattr(obj, name, value)
+                fields.add(name)
+            to_update.append(obj)
+        if to_update:
+            self.model.objects.bulk_update(to_update, sorted(fields), batch_size=API_BULK_BATCH_SIZE)
+        return self.create(list(items.values())), to_update
+
+
+def _item_id(item):
+    try:
+        return int(item['id'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _key_value(value):
+    # Related objects are matched by primary key, strings regardless of case
+    # and spacing.
+    if isinstance(value, str):
+        return ' '.join(value.split()).lower()
+    return getattr(value, 'pk', value)
+
+
+def _key_lookup(name, value):
+    if isinstance(value, str):
+        # The same words separated by any whitespace.
+        pattern = r'\s+'.join(re.escape(word) for word in value.split())
+        return f'{name}__iregex', rf'^\s*{pattern}\s*$'
+    return f'{name}__exact', getattr(value, 'pk', value)
+
+
+class BulkWriteMixin:
+    """
+    View handlers for list payloads; the serializer must use
+    BulkListSerializer as its ``list_serializer_class``.
+
+    - ``bulk_create``: a list of new objects; ``?upsert=true`` updates
+      objects whose natural key already exists instead
+    - ``bulk_update``: a list of partial objects, each with its ``id``
+    - ``bulk_destroy``: ``{"ids": [...]}``
+    """
+
+    def bulk_written(self, model):
+        """
+        Hook called after every bulk write; ``bulk_create`` and
+        ``bulk_update`` do not send model signals.
+        """
+
+    def bulk_create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return self.bulk_errors(serializer)
+        upsert = request.query_params.get('upsert') in ('1', 'true')
+        with transaction.atomic():
+            if upsert:
+                created, updated = serializer.upsert()
+            else:
+                created, updated = serializer.save(), []
+        self.bulk_written(serializer.child.Meta.model)
+        return Response({
+            'created': len(created),
+            'updated': len(updated),
+            'ids': [obj.pk for obj in created] + [obj.pk for obj in updated],
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def bulk_update(self, request, *args, **kwargs):
+        items = request.data if isinstance(request.data, list) else []
+        ids = {_item_id(item) for item in items} - {None}
+        instances = self.get_queryset().filter(pk__in=ids)
+        serializer = self.get_serializer(instances, data=request.data, many=True, partial=True)
+        if not serializer.is_valid():
+            return self.bulk_errors(serializer)
+        with transaction.atomic():
+            updated = serializer.save()
+        self.bulk_written(serializer.child.Meta.model)
+        return Response({'updated': len(updated), 'ids': [obj.pk for obj in updated]})
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return Response({'ids': ['Expected a list of ids.']}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > API_BULK_MAX_ITEMS:
+            return Response(
+                {'ids': [f'Ensure this field has no more than {API_BULK_MAX_ITEMS} elements.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        deleted = 0
+        queryset = self.get_queryset()
+        with transaction.atomic():
+            for start in range(0, len(ids), API_BULK_BATCH_SIZE):
+                batch = ids[start:start + API_BULK_BATCH_SIZE]
+                # Count the objects themselves, not cascaded rows.
+                deleted += queryset.filter(pk__in=batch).delete()[1].get(queryset.model._meta.label, 0)
+        self.bulk_written(queryset.model)
+        return Response({'deleted': deleted})
+
+    def bulk_errors(self, serializer):
+        """Report the invalid items by their index in the payload."""
+        errors = serializer.errors
+        if isinstance(errors, dict):
+            # The payload itself was rejected (not a list, too long).
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'errors': [
+            {'index': index, 'errors': item_errors}
+            for index, item_errors in enumerate(errors) if item_errors
+        ]}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from .bulk import BulkListSerializer
 from .models import Book
 
 class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        list_serializer_class = BulkListSerializer
+        natural_key = ('title', 'author')
@@ -1,3 +1,90 @@
-from django.test import TestCase
+from unittest import mock
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .models import Book
 
-# Create your tests here.
+
+class BookBulkAPITestCase(APITestCase):
+    """
+    Test the bulk create, upsert, update and delete endpoint for books.
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('book_all-bulk')
+    
+    def test_bulk_create_in_batches(self):
+        data = [{'title': f'Book {i}', 'author': 'Author'} for i in range(10)]
+        # Three batched INSERTs inside a savepoint.
+        with mock.patch('api.bulk.API_BULK_BATCH_SIZE', 4), self.assertNumQueries(5):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 10)
+        self.assertEqual(Book.objects.count(), 10)
+    
+    def test_invalid_items_write_nothing(self):
+        data = [
+            {'title': 'Valid', 'author': 'Author'},
+            {'title': 'No author'},
+            {'title': 'x' * 201, 'author': 'Author'},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2])
+        self.assertFalse(Book.objects.exists())
+        
+        response = self.client.post(self.url, {'title': 'Not a list'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_upsert_ignores_case_and_spacing(self):
+        existing = Book.objects.create(title='Dune', author='Frank Herbert')
+        data = [
+            {'title': 'DUNE', 'author': '  frank   herbert '},
+            {'title': 'Dune Messiah', 'author': 'Frank  Herbert'},
+        ]
+        response = self.client.post(self.url + '?upsert=true', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        existing.refresh_from_db()
+        # Spacing only matters for matching; values are stored as sent.
+        self.assertEqual((existing.title, existing.author), ('DUNE', 'frank   herbert'))
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('author', flat=True)),
+            ['frank   herbert', 'Frank  Herbert']
+        )
+        
+        response = self.client.post(self.url + '?upsert=true', data, format='json')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 2))
+        self.assertEqual(Book.objects.count(), 2)
+    
+    def test_bulk_update_and_delete(self):
+        books = [Book.objects.create(title=f'Book {i}', author='Author') for i in range(3)]
+        data = [{'id': book.id, 'author': 'Editor'} for book in books[:2]]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('author', flat=True)),
+            ['Editor', 'Editor', 'Author']
+        )
+        
+        # Ids are parsed like the serializer parses them.
+        response = self.client.patch(self.url, [{'id': str(books[2].id), 'title': 'Renamed'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Book.objects.get(pk=books[2].id).title, 'Renamed')
+        
+        response = self.client.patch(self.url, [{'id': 9999, 'title': 'Missing'}], format='json')
+        self.assertEqual(response.data['errors'][0]['errors']['id'], ['Expected the id of an existing object.'])
+        
+        response = self.client.delete(self.url, {'ids': [books[0].id, books[1].id, 9999]}, format='json')
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(list(Book.objects.all()), [books[2]])
+    
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.url, [{'title': 'Dune', 'author': 'Frank Herbert'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(Book.objects.exists())
@@ -1,4 +1,6 @@
 from rest_framework import generics, viewsets, permissions
+from rest_framework.decorators import action
+from .bulk import BulkWriteMixin
 from .models import Book
 from .serializers import BookSerializer
 
@@ -7,7 +9,18 @@ class BookList(generics.ListAPIView):
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(BulkWriteMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated]
+    
+    # POST a list of books (?upsert=true matches title and author, ignoring
+    # case and spacing), PATCH a list of books with ids, or DELETE
+    # {"ids": [...]}.
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
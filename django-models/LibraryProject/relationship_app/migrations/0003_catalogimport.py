@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0002_alter_author_options_alter_book_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500, unique=True)),
+                ('state', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -6,7 +6,17 @@ from django.contrib.auth.decorators import user_passes_test
 from django.http import HttpResponseForbidden
 from django.contrib.auth.decorators import permission_required
 from django.shortcuts import get_object_or_404
-from .models import Book, Author
+from django.views.generic.detail import DetailView
+from .models import Book, Author, Library
+
+def list_books(request):
+    books = Book.objects.select_related('author')
+    return render(request, 'relationship_app/list_books.html', {'books': books})
+
+class LibraryDetailView(DetailView):
+    model = Library
+    template_name = 'relationship_app/library_detail.html'
+    context_object_name = 'library'
 
 def register(request):
     if request.method == 'POST':
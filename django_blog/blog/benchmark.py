@@ -0,0 +1,273 @@
+"""
+In-process benchmarks for request hot paths.
+
+A Scenario is one request sent through the Django test client, so the whole
+stack (middleware, authentication, views, serializers, templates) runs without
+a server or network in the way. ``measure`` times a scenario over a number of
+iterations and reports its p50 and p99 latency, the queries one request runs
+and the peak memory allocated while serving it (traced with tracemalloc on a
+separate run, since tracing slows everything down).
+
+``compare`` checks results against stored baselines. Query counts are
+deterministic, so any increase is a regression; latency and allocations
+regress when they exceed the baseline by more than a relative tolerance.
+
+BenchmarkCommand runs a project's scenarios against seeded data of one or more
+sizes, each in a fresh test database, and fails when any result regresses.
+"""
+
+import abc
+import json
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+# Latency differences below this many milliseconds are never regressions;
+# sub-millisecond timings are too noisy to compare relatively.
+LATENCY_SLACK_MS = 1.0
+
+
+class Scenario:
+    """
+    A request to benchmark.
+
+    ``reset`` is called with the client after every request, outside the
+    measurements, to undo its writes (e.g. unlike after a like) so every
+    iteration does the same work.
+    """
+
+    def __init__(self, name, path, method='get', data=None, headers=None, status=200, reset=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.headers = headers or {}
+        self.status = status
+        self.reset = reset
+
+    def request(self, client):
+        return getattr(client, self.method)(self.path, self.data or {}, **self.headers)
+
+    def check(self, response):
+        if response.status_code != self.status:
+            raise AssertionError(
+                f'{self.name}: {self.method.upper()} {self.path} returned {response.status_code}, '
+                f'expected {self.status}'
+            )
+
+    def finish(self, client, response):
+        self.check(response)
+        if self.reset:
+            self.reset(client)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(scenario, client, iterations=50, warmup=5):
+    """
+    Benchmark ``scenario`` and return ``{'p50_ms', 'p99_ms', 'queries',
+    'peak_kib'}``.
+    """
+    for _ in range(warmup):
+        scenario.finish(client, scenario.request(client))
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = scenario.request(client)
+        timings.append((time.perf_counter() - started) * 1000)
+        scenario.finish(client, response)
+
+    # The query log is bounded; start from an empty one.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response = scenario.request(client)
+    # Read the count now: the next request clears the log it is sliced from.
+    query_count = len(queries)
+    scenario.finish(client, response)
+
+    tracemalloc.start()
+    try:
+        response = scenario.request(client)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    scenario.finish(client, response)
+
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'queries': query_count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, latency_tolerance=0.5, memory_tolerance=0.25):
+    """
+    Return a message for every result that regressed past ``baseline``.
+
+    Both are ``{size: {scenario: metrics}}``; scenarios missing from the
+    baseline are skipped.
+    """
+    regressions = []
+    for size, scenarios in results.items():
+        for name, metrics in scenarios.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            label = f'{size}/{name}'
+            if metrics['queries'] > base['queries']:
+                regressions.append(f"{label}: {metrics['queries']} queries (baseline {base['queries']})")
+            for key in ('p50_ms', 'p99_ms'):
+                limit = max(base[key] * (1 + latency_tolerance), base[key] + LATENCY_SLACK_MS)
+                if metrics[key] > limit:
+                    regressions.append(f'{label}: {key} {metrics[key]:.2f} (baseline {base[key]:.2f})')
+            if metrics['peak_kib'] > base['peak_kib'] * (1 + memory_tolerance):
+                regressions.append(
+                    f"{label}: peak {metrics['peak_kib']:.1f} KiB (baseline {base['peak_kib']:.1f} KiB)"
+                )
+    return regressions
+
+
+def format_result(size, name, metrics):
+    return (
+        f"{size:<8} {name:<24} p50 {metrics['p50_ms']:8.2f} ms  p99 {metrics['p99_ms']:8.2f} ms  "
+        f"{metrics['queries']:3d} queries  peak {metrics['peak_kib']:9.1f} KiB"
+    )
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    """Store ``results`` as the baseline, keeping the sizes that were not run."""
+    baseline = load_baseline(path)
+    baseline.update(results)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run the enclosed code against a fresh test database, with DEBUG off as
+    in tests.
+    """
+    test_settings = connection.settings_dict['TEST']
+    test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite' and not test_name:
+        # An in-memory SQLite test database outlives destroy_test_db, so the
+        # next data set would be added to this one; use a file instead.
+        test_settings['NAME'] = os.path.join(tempfile.gettempdir(), f'benchmark_{os.getpid()}.sqlite3')
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        test_settings['NAME'] = test_name
+
+
+class BenchmarkCommand(BaseCommand, metaclass=abc.ABCMeta):
+    """
+    Base for ``manage.py benchmark``. Subclasses set ``sizes`` (size name ->
+    options passed to ``seed``) and implement ``seed`` and ``get_scenarios``.
+    """
+    help = 'Benchmark request hot paths against seeded data and compare them with stored baselines'
+    sizes = {}
+    default_size = 'small'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', action='append', dest='sizes', choices=list(self.sizes),
+            help=f'Data set size to benchmark (may be repeated; default: {self.default_size})',
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Only run this scenario (may be repeated)',
+        )
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario')
+        parser.add_argument(
+            '--baseline', default=os.path.join(settings.BASE_DIR, 'benchmark_baseline.json'),
+            help='Baseline file (default: benchmark_baseline.json next to manage.py)',
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Store the results as the new baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=0.5,
+            help='Allowed relative latency increase over the baseline',
+        )
+        parser.add_argument(
+            '--memory-tolerance', type=float, default=0.25,
+            help='Allowed relative increase in peak allocations over the baseline',
+        )
+
+    @abc.abstractmethod
+    def seed(self, **options):
+        """Fill the empty benchmark database."""
+
+    @abc.abstractmethod
+    def get_scenarios(self):
+        """Return the Scenarios to run against the seeded data."""
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        results = {}
+        for size in options['sizes'] or [self.default_size]:
+            results[size] = {}
+            with benchmark_database():
+                for cache in caches.all():
+                    cache.clear()
+                started = time.monotonic()
+                self.seed(**self.sizes[size])
+                self.stdout.write(f'Seeded {size} data set in {time.monotonic() - started:.1f}s')
+                client = Client()
+                for scenario in self.get_scenarios():
+                    if options['scenarios'] and scenario.name not in options['scenarios']:
+                        continue
+                    metrics = measure(scenario, client, options['iterations'], options['warmup'])
+                    results[size][scenario.name] = metrics
+                    self.stdout.write(format_result(size, scenario.name, metrics))
+
+        if options['update_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {options['baseline']}"))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if not baseline:
+            self.stdout.write(self.style.WARNING(
+                f"No baseline at {options['baseline']}; run with --update-baseline to store one"
+            ))
+            return
+        regressions = compare(
+            results, baseline, options['latency_tolerance'], options['memory_tolerance']
+        )
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} benchmark regressions:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,68 @@
+import random
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.urls import reverse
+from blog import search
+from blog.benchmark import BenchmarkCommand, Scenario
+from blog.models import Comment, Post, Tag
+
+WORDS = (
+    'django python template view model form query cache index search blog '
+    'post comment tag author travel music coffee garden recipe weekend '
+    'project release design review test deploy cloud mobile web community'
+).split()
+
+BATCH_SIZE = 2000
+
+
+class Command(BenchmarkCommand):
+    help = 'Benchmark the blog home, search and detail pages against seeded posts and compare the results with stored baselines'
+    sizes = {
+        'small': {'posts': 500},
+        'medium': {'posts': 5000},
+        'large': {'posts': 50000},
+    }
+
+    def seed(self, posts):
+        """Bulk create ``posts`` posts with tags and comments, deterministically."""
+        rng = random.Random(0)
+        password = make_password('password')
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'bench{i}', password=password) for i in range(max(1, posts // 10))
+            ])
+            tags = Tag.objects.bulk_create([Tag(name=word) for word in WORDS])
+            created = Post.objects.bulk_create([
+                Post(
+                    title=' '.join(rng.choices(WORDS, k=rng.randint(3, 8))).capitalize(),
+                    content=' '.join(rng.choices(WORDS, k=rng.randint(40, 200))),
+                    author=rng.choice(users),
+                )
+                for _ in range(posts)
+            ], batch_size=BATCH_SIZE)
+            Post.tags.through.objects.bulk_create([
+                Post.tags.through(post_id=post.pk, tag_id=tag.pk)
+                for post in created
+                for tag in rng.sample(tags, rng.randint(0, 4))
+            ], batch_size=BATCH_SIZE)
+            Comment.objects.bulk_create([
+                Comment(post=post, author=rng.choice(users), content=' '.join(rng.choices(WORDS, k=12)))
+                for post in created
+                for _ in range(int(rng.expovariate(1 / 3)))
+            ], batch_size=BATCH_SIZE)
+        # bulk_create sends no signals; rebuild the search index from the
+        # database on the first search.
+        search.reset_index()
+
+    def get_scenarios(self):
+        home = reverse('home')
+        post = Post.objects.order_by('-published_date', '-id').first()
+        return [
+            Scenario('home', home),
+            Scenario('home-page-5', home, data={'page': 5}),
+            Scenario('search', home, data={'search': 'django'}),
+            Scenario('search-phrase', home, data={'search': 'coffee garden recipe'}),
+            Scenario('post-detail', reverse('post_detail', args=[post.pk])),
+            Scenario('tag', reverse('posts_by_tag', args=['python'])),
+        ]
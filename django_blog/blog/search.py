@@ -0,0 +1,118 @@
+"""
+Blog post search backed by the in-process inverted index in blog.inverted_index.
+
+Each process builds the index from the database on first use (or maps the
+snapshot at BLOG_SEARCH_INDEX_PATH) and keeps it current through the signal
+receivers in blog.signals. Changes made by other processes are picked up when
+the index is reloaded after BLOG_SEARCH_INDEX_MAX_AGE seconds; matches are
+always filtered through the database, so deleted posts never appear.
+"""
+
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.db.models import Case, IntegerField, Q, When
+from .inverted_index import InvertedIndex
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# 'memory' uses the inverted index; 'database' keeps the icontains lookups.
+BLOG_SEARCH_BACKEND = getattr(settings, 'BLOG_SEARCH_BACKEND', 'memory')
+BLOG_SEARCH_INDEX_PATH = getattr(settings, 'BLOG_SEARCH_INDEX_PATH', None)
+BLOG_SEARCH_INDEX_MAX_AGE = getattr(settings, 'BLOG_SEARCH_INDEX_MAX_AGE', 300)
+BLOG_SEARCH_MAX_RESULTS = getattr(settings, 'BLOG_SEARCH_MAX_RESULTS', 1000)
+
+FIELD_WEIGHTS = {'title': 3, 'tags': 2, 'content': 1}
+
+_index = None
+_loaded_at = None
+_lock = threading.Lock()
+
+
+def post_fields(post):
+    return {
+        'title': post.title,
+        'content': post.content,
+        'tags': ' '.join(tag.name for tag in post.tags.all()),
+    }
+
+
+def build_index():
+    index = InvertedIndex(FIELD_WEIGHTS)
+    for post in Post.objects.prefetch_related('tags').order_by('pk').iterator(chunk_size=2000):
+        index.add(post.pk, post_fields(post))
+    return index
+
+
+def _load_index():
+    path = BLOG_SEARCH_INDEX_PATH
+    if path and os.path.exists(path):
+        age = time.time() - os.path.getmtime(path)
+        if not BLOG_SEARCH_INDEX_MAX_AGE or age < BLOG_SEARCH_INDEX_MAX_AGE:
+            try:
+                return InvertedIndex.load(path)
+            except (OSError, ValueError):
+                logger.warning('Ignoring unreadable search snapshot %s', path, exc_info=True)
+    index = build_index()
+    if path:
+        index.save(path)
+    return index
+
+
+def get_index():
+    """Return this process's index, loading or reloading it as needed."""
+    global _index, _loaded_at
+    with _lock:
+        expired = (
+            BLOG_SEARCH_INDEX_MAX_AGE and _loaded_at is not None
+            and time.monotonic() - _loaded_at > BLOG_SEARCH_INDEX_MAX_AGE
+        )
+        if _index is None or expired:
+            _index = _load_index()
+            _loaded_at = time.monotonic()
+        return _index
+
+
+def reset_index():
+    """Drop this process's index so the next search rebuilds it."""
+    global _index, _loaded_at
+    with _lock:
+        _index = None
+        _loaded_at = None
+
+
+def index_posts(posts):
+    if BLOG_SEARCH_BACKEND != 'memory' or _index is None:
+        # Not loaded yet: the first search builds it from the database.
+        return
+    for post in posts:
+        _index.add(post.pk, post_fields(post))
+
+
+def remove_posts(post_ids):
+    if BLOG_SEARCH_BACKEND != 'memory' or _index is None:
+        return
+    for pk in post_ids:
+        _index.remove(pk)
+
+
+def search_posts(queryset, query):
+    """Filter ``queryset`` to posts matching ``query``, best matches first."""
+    if BLOG_SEARCH_BACKEND != 'memory':
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(content__icontains=query) |
+            Q(tags__name__icontains=query)
+        ).distinct()
+
+    matches = get_index().search(query, limit=BLOG_SEARCH_MAX_RESULTS)
+    if not matches:
+        return queryset.none()
+    position = Case(
+        *[When(pk=pk, then=i) for i, (pk, _) in enumerate(matches)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=[pk for pk, _ in matches]).order_by(position)
@@ -0,0 +1,36 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Post, Tag
+from .search import index_posts, remove_posts
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Keep the search index in step with saved posts."""
+    index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    remove_posts([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_tagged_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # Tags are shown on the detail page, so they count as an edit.
+        Post.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+        index_posts([instance])
+    elif pk_set:
+        Post.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+        index_posts(Post.objects.filter(pk__in=pk_set).prefetch_related('tags'))
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, **kwargs):
+    if not created:
+        instance.posts.update(updated_at=timezone.now())
+        index_posts(instance.posts.prefetch_related('tags'))
@@ -1,3 +1,120 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from . import search
+from .models import Post, Comment, Tag
 
-# Create your tests here.
+
+class PostDetailConditionalGetTestCase(TestCase):
+    """
+    Test ETag/Last-Modified revalidation of the post detail page.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(title='Post', content='Body', author=self.author)
+        self.url = reverse('post_detail', args=[self.post.pk])
+
+    def assertChangesEtag(self, change):
+        """The unchanged page is a 304; after ``change`` it is a full 200."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_skips_rendering(self):
+        etag = self.client.get(self.url)['ETag']
+        # The validators' aggregate only; the post and template are skipped.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        def edit():
+            self.post.content = 'Edited'
+            self.post.save()
+        self.assertChangesEtag(edit)
+
+    def test_comment_changes_etag(self):
+        self.assertChangesEtag(lambda: Comment.objects.create(
+            post=self.post, author=self.author, content='New'
+        ))
+
+    def test_tagging_changes_etag(self):
+        tag = Tag.objects.create(name='django')
+        self.assertChangesEtag(lambda: self.post.tags.add(tag))
+
+    def test_etag_varies_by_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class PostSearchTestCase(TestCase):
+    """
+    Test home page search over the in-memory inverted index.
+    """
+
+    def setUp(self):
+        search.reset_index()
+        self.addCleanup(search.reset_index)
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.title_match = Post.objects.create(
+            title='Django performance', content='Notes on caching.', author=self.author
+        )
+        self.content_match = Post.objects.create(
+            title='Weekend', content='Read a book about Django and gardening.', author=self.author
+        )
+        self.other = Post.objects.create(title='Lunch', content='Soup again.', author=self.author)
+
+    def search(self, query):
+        response = self.client.get(reverse('home'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['search_query'], query)
+        return [post.pk for post in response.context['posts']]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search('django'), [self.title_match.pk, self.content_match.pk])
+        self.assertEqual(self.search('DJANGO gardening'), [self.content_match.pk])
+        self.assertEqual(self.search('django soup'), [])
+
+    def test_tags_are_searchable(self):
+        tag = Tag.objects.create(name='recipes')
+        self.other.tags.add(tag)
+        self.assertEqual(self.search('recipes'), [self.other.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.search('django')  # Load the index.
+        self.other.content = 'Soup with django croutons.'
+        self.other.save()
+        self.assertEqual(self.search('croutons'), [self.other.pk])
+
+        new = Post.objects.create(title='Croutons', content='', author=self.author)
+        self.assertEqual(self.search('croutons'), [new.pk, self.other.pk])
+
+        self.other.delete()
+        self.assertEqual(self.search('croutons'), [new.pk])
+
+    def test_index_follows_tag_changes(self):
+        tag = Tag.objects.create(name='recipes')
+        self.search('django')
+        self.other.tags.add(tag)
+        self.assertEqual(self.search('recipes'), [self.other.pk])
+
+        tag.name = 'cooking'
+        tag.save()
+        self.assertEqual(self.search('recipes'), [])
+        self.assertEqual(self.search('cooking'), [self.other.pk])
+
+        self.other.tags.remove(tag)
+        self.assertEqual(self.search('cooking'), [])
@@ -6,8 +6,6 @@ from .views import (
     posts_by_tag
 )
 
-app_name = 'blog'
-
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
     path('post/<int:pk>/', PostDetailView.as_view(), name='post_detail'),
@@ -20,6 +18,6 @@ urlpatterns = [
     path('tag/<str:tag_name>/', posts_by_tag, name='posts_by_tag'),
     path('register/', register, name='register'),
     path('login/', auth_views.LoginView.as_view(template_name='blog/login.html'), name='login'),
-    path('logout/', auth_views.LogoutView.as_view(next_page='blog:home'), name='logout'),
+    path('logout/', auth_views.LogoutView.as_view(next_page='home'), name='logout'),
     path('profile/', profile, name='profile'),
 ]
\ No newline at end of file
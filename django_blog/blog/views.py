@@ -3,12 +3,16 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
+import hashlib
 from django.contrib import messages
+from django.db.models import Count, Max
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.contrib.auth.models import User
-from django.db.models import Q
-from .models import Post, Comment
+from .models import Post, Comment, Tag
 from .forms import CustomUserCreationForm, PostForm, CommentForm
+from .search import search_posts
 
 # Create your views here.
 
@@ -22,11 +26,7 @@ class HomeView(ListView):
         queryset = Post.objects.all()
         search_query = self.request.GET.get('search', '')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query) |
-                Q(tags__name__icontains=search_query)
-            ).distinct()
+            queryset = search_posts(queryset, search_query)
         return queryset
     
     def get_context_data(self, **kwargs):
@@ -65,6 +65,40 @@ def profile(request):
     
     return render(request, 'blog/profile.html')
 
+def _post_detail_state(request, pk):
+    """
+    The post's last edit, its comment count and latest comment edit, read in
+    one aggregate query and memoized on the request for both validators.
+    Returns None when the page should not be revalidated.
+    """
+    if not hasattr(request, '_post_detail_state'):
+        state = None
+        # Pending flash messages are rendered into the page.
+        if not len(messages.get_messages(request)):
+            state = Post.objects.filter(pk=pk).annotate(
+                comment_count=Count('comments'), last_comment_at=Max('comments__updated_at')
+            ).values('updated_at', 'comment_count', 'last_comment_at').order_by('pk').first()
+        request._post_detail_state = state
+    return request._post_detail_state
+
+
+def post_detail_etag(request, pk):
+    state = _post_detail_state(request, pk)
+    if state is None:
+        return None
+    # The page shows edit links for the viewer, so it varies by user.
+    parts = (request.user.pk, pk, state['updated_at'], state['comment_count'], state['last_comment_at'])
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def post_detail_last_modified(request, pk):
+    state = _post_detail_state(request, pk)
+    if state is None:
+        return None
+    return max(filter(None, [state['updated_at'], state['last_comment_at']]))
+
+
+@method_decorator(condition(etag_func=post_detail_etag, last_modified_func=post_detail_last_modified), name='get')
 class PostDetailView(DetailView):
     model = Post
     template_name = 'blog/post_detail.html'
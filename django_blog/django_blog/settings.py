@@ -124,3 +124,9 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Post search (see blog/search.py). 'memory' uses an in-process inverted index
+# ranked with BM25; 'database' uses icontains lookups.
+BLOG_SEARCH_BACKEND = 'memory'
+BLOG_SEARCH_INDEX_PATH = None
+BLOG_SEARCH_INDEX_MAX_AGE = 300
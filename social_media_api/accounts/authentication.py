@@ -0,0 +1,130 @@
+"""
+Token authentication backed by the cache.
+
+CachedTokenAuthentication accepts two kinds of ``Authorization: Token <key>``
+credentials:
+
+* database tokens (rest_framework.authtoken) - the authenticated user is
+  cached under the token key for AUTH_TOKEN_CACHE_TIMEOUT seconds, so only a
+  cache miss joins ``authtoken_token`` to the user table;
+* signed tokens - ``django.core.signing`` payloads carrying the user id and
+  ``token_version``, verified without a token lookup. The user itself comes
+  from the same cache.
+
+Which kind login and registration issue is chosen by AUTH_TOKEN_MODE ('db'
+or 'signed'). Cached entries are dropped when a user is saved (profile or
+password changes) and when a database token is deleted or rotated; signed
+tokens are revoked by bumping ``CustomUser.token_version`` (logout and
+password changes).
+"""
+
+import hashlib
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from .models import CustomUser
+
+# 'db' issues rest_framework.authtoken tokens; 'signed' issues stateless tokens.
+AUTH_TOKEN_MODE = getattr(settings, 'AUTH_TOKEN_MODE', 'db')
+
+# Seconds a token's user is cached. Cached users may show counters up to this
+# stale.
+AUTH_TOKEN_CACHE_TIMEOUT = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60)
+
+# Lifetime of signed tokens in seconds.
+AUTH_SIGNED_TOKEN_MAX_AGE = getattr(settings, 'AUTH_SIGNED_TOKEN_MAX_AGE', 30 * 24 * 60 * 60)
+
+SIGNED_TOKEN_SALT = 'accounts.authentication.signed-token'
+
+
+def token_cache_key(key):
+    # Hash the key so raw credentials never reach the cache.
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def issue_token(user):
+    """Return an API token for ``user`` in the configured AUTH_TOKEN_MODE."""
+    if AUTH_TOKEN_MODE == 'signed':
+        return signing.dumps({'u': user.pk, 'v': user.token_version}, salt=SIGNED_TOKEN_SALT)
+    token, created = Token.objects.get_or_create(user=user)
+    return token.key
+
+
+def revoke_tokens(user):
+    """Invalidate every token issued to ``user`` (used on logout)."""
+    keys = list(Token.objects.filter(user=user).values_list('key', flat=True))
+    Token.objects.filter(user=user).delete()
+    CustomUser.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    invalidate_user(user.pk, keys)
+
+
+def invalidate_user(user_id, token_keys=None):
+    """Drop cached authentication entries for a user and their tokens."""
+    if token_keys is None:
+        token_keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    cache.delete_many([user_cache_key(user_id)] + [token_cache_key(key) for key in token_keys])
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def get_cached_user(user_id):
+    user = cache.get(user_cache_key(user_id))
+    if user is None:
+        user = CustomUser.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(user_cache_key(user_id), user, AUTH_TOKEN_CACHE_TIMEOUT)
+    return user
+
+
+def authenticate_key(key):
+    """
+    Return the active user for a token key, or None. Shared by the DRF
+    authentication class and the notification stream.
+    """
+    if ':' in key:
+        return _authenticate_signed(key)
+
+    cache_key = token_cache_key(key)
+    user = cache.get(cache_key)
+    if user is None:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is None:
+            return None
+        user = token.user
+        cache.set(cache_key, user, AUTH_TOKEN_CACHE_TIMEOUT)
+    return user if user.is_active else None
+
+
+def _authenticate_signed(key):
+    try:
+        payload = signing.loads(key, salt=SIGNED_TOKEN_SALT, max_age=AUTH_SIGNED_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    user = get_cached_user(payload['u'])
+    if user is None or not user.is_active or user.token_version != payload['v']:
+        return None
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that serves database tokens from the cache and also
+    accepts signed tokens.
+    """
+
+    def authenticate_credentials(self, key):
+        user = authenticate_key(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return (user, key)
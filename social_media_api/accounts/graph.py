@@ -0,0 +1,105 @@
+"""
+Follow-graph lookups and follow writes.
+
+Rows of ``CustomUser.followers.through`` are (from_customuser=followed user,
+to_customuser=follower). Each user's set of followed ids is cached as an
+adjacency set; it is dropped whenever that user's follows change (see the
+m2m_changed receiver in accounts.signals). Users who follow more than
+FOLLOW_GRAPH_CACHE_MAX_SIZE accounts are not cached and are answered with
+indexed queries instead.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed
+from .models import CustomUser
+
+Follow = CustomUser.followers.through
+
+# Seconds an adjacency set is cached.
+FOLLOW_GRAPH_CACHE_TIMEOUT = getattr(settings, 'FOLLOW_GRAPH_CACHE_TIMEOUT', 60 * 60)
+
+# Largest following list kept in the cache.
+FOLLOW_GRAPH_CACHE_MAX_SIZE = getattr(settings, 'FOLLOW_GRAPH_CACHE_MAX_SIZE', 10000)
+
+# Cached in place of the set for users who follow too many accounts.
+_TOO_LARGE = 'too-large'
+
+
+def following_key(user_id):
+    return f'accounts:following:{user_id}'
+
+
+def get_following_ids(user_id):
+    """
+    Return the ids the user follows as a frozenset, or None if the set is too
+    large to cache.
+    """
+    key = following_key(user_id)
+    cached = cache.get(key)
+    if cached == _TOO_LARGE:
+        return None
+    if cached is not None:
+        return cached
+
+    ids = Follow.objects.filter(to_customuser_id=user_id).values_list(
+        'from_customuser_id', flat=True
+    )[:FOLLOW_GRAPH_CACHE_MAX_SIZE + 1]
+    ids = frozenset(ids)
+    if len(ids) > FOLLOW_GRAPH_CACHE_MAX_SIZE:
+        cache.set(key, _TOO_LARGE, FOLLOW_GRAPH_CACHE_TIMEOUT)
+        return None
+    cache.set(key, ids, FOLLOW_GRAPH_CACHE_TIMEOUT)
+    return ids
+
+
+def is_following(user_id, target_id):
+    following = get_following_ids(user_id)
+    if following is not None:
+        return target_id in following
+    return Follow.objects.filter(from_customuser_id=target_id, to_customuser_id=user_id).exists()
+
+
+def following_among(user_id, target_ids):
+    """Return the subset of ``target_ids`` that the user follows."""
+    target_ids = set(target_ids)
+    if not target_ids:
+        return set()
+    following = get_following_ids(user_id)
+    if following is not None:
+        return target_ids & following
+    return set(Follow.objects.filter(
+        to_customuser_id=user_id, from_customuser_id__in=target_ids
+    ).values_list('from_customuser_id', flat=True))
+
+
+def invalidate_following(user_ids):
+    cache.delete_many([following_key(user_id) for user_id in set(user_ids)])
+
+
+def _follow_changed(action, follower, followed):
+    # What follower.following.add/remove() would send for the changed row.
+    m2m_changed.send(
+        sender=Follow, instance=follower, action=action, reverse=True,
+        model=CustomUser, pk_set={followed.pk}, using=Follow.objects.db,
+    )
+
+
+def add_follow(follower, followed):
+    """
+    Make ``follower`` follow ``followed``. Returns False if the follow already
+    existed, including when a concurrent request created it first, so callers
+    only count follows that were actually created.
+    """
+    _, created = Follow.objects.get_or_create(from_customuser=followed, to_customuser=follower)
+    if created:
+        _follow_changed('post_add', follower, followed)
+    return created
+
+
+def remove_follow(follower, followed):
+    """Remove the follow. Returns False if there was none to remove."""
+    deleted, _ = Follow.objects.filter(from_customuser=followed, to_customuser=follower).delete()
+    if deleted:
+        _follow_changed('post_remove', follower, followed)
+    return bool(deleted)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from accounts.models import FollowGraphChange
+from accounts.recommendations import (
+    FOLLOW_RECOMMENDATIONS_CHUNK_SIZE,
+    FOLLOW_RECOMMENDATIONS_LIMIT,
+    all_user_ids,
+    refresh_recommendations,
+    users_affected_by_changes,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compute friend-of-friend "who to follow" recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only refresh users affected by follows changed since the last run',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=FOLLOW_RECOMMENDATIONS_CHUNK_SIZE,
+            help='Number of users processed together',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=FOLLOW_RECOMMENDATIONS_LIMIT,
+            help='Recommendations stored per user',
+        )
+
+    def handle(self, *args, **options):
+        # Changes logged after this point are left for the next run.
+        max_change_id = FollowGraphChange.objects.aggregate(Max('id'))['id__max'] or 0
+
+        if options['incremental']:
+            user_ids = sorted(users_affected_by_changes(max_change_id, options['chunk_size']))
+        else:
+            user_ids = all_user_ids(options['chunk_size'])
+
+        users, written = refresh_recommendations(
+            user_ids, limit=options['limit'], chunk_size=options['chunk_size']
+        )
+        FollowGraphChange.objects.filter(pk__lte=max_change_id).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} recommendations for {users} users'
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Follow = CustomUser.followers.through
+
+    def count_of(field):
+        return Coalesce(Subquery(
+            Follow.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(n=Count('*')).values('n')
+        ), 0)
+
+    CustomUser.objects.update(
+        followers_count=count_of('from_customuser'),
+        following_count=count_of('to_customuser'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
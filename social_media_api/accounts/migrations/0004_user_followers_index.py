@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_follow_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['followers_count', 'id'], name='accounts_user_followers'),
+        ),
+    ]
@@ -11,14 +11,49 @@ class CustomUser(AbstractUser):
         related_name='following',
         blank=True
     )
+    # Denormalized counters, kept in step with ``followers`` by the follow
+    # views and repaired by ``manage.py reconcile_counters``.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # Embedded in signed API tokens; bumping it revokes them.
+    token_version = models.PositiveIntegerField(default=0)
+    
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Ordering the user list by popularity and finding the authors
+            # whose posts are merged into feeds at read time.
+            models.Index(fields=['followers_count', 'id'], name='accounts_user_followers'),
+        ]
     
     def __str__(self):
         return self.username
+
+
+class FollowRecommendation(models.Model):
+    """
+    A precomputed "who to follow" candidate: someone followed by
+    ``mutual_count`` of the accounts ``user`` follows. Written by
+    ``manage.py compute_recommendations``.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='recommendations')
+    candidate = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    mutual_count = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(auto_now_add=True)
     
-    @property
-    def followers_count(self):
-        return self.followers.count()
+    class Meta:
+        unique_together = ['user', 'candidate']
+        indexes = [
+            models.Index(fields=['user', '-mutual_count'], name='accounts_rec_user_score'),
+        ]
     
-    @property
-    def following_count(self):
-        return self.following.count()
+    def __str__(self):
+        return f"{self.candidate.username} for {self.user.username}"
+
+
+class FollowGraphChange(models.Model):
+    """
+    Users whose follows changed since recommendations were last computed;
+    consumed by ``compute_recommendations --incremental``.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,138 @@
+"""
+Offline friend-of-friend recommendations.
+
+For a user U, every account followed by someone U follows is a candidate,
+scored by how many of U's follows lead to it. Users are processed in chunks:
+for each chunk the follow edges of its members and of the accounts they follow
+are streamed from the through table in bounded ``__in`` batches, and candidate
+counts are accumulated with set/Counter operations, so memory depends on the
+chunk size rather than on the size of the graph.
+"""
+
+from collections import Counter, defaultdict
+from heapq import nsmallest
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from .graph import Follow
+from .models import CustomUser, FollowGraphChange, FollowRecommendation
+
+# Recommendations stored per user.
+FOLLOW_RECOMMENDATIONS_LIMIT = getattr(settings, 'FOLLOW_RECOMMENDATIONS_LIMIT', 50)
+
+# Users processed together, and ids per ``__in`` lookup.
+FOLLOW_RECOMMENDATIONS_CHUNK_SIZE = getattr(settings, 'FOLLOW_RECOMMENDATIONS_CHUNK_SIZE', 1000)
+
+
+def _batches(ids, size):
+    ids = iter(ids)
+    while True:
+        batch = list(islice(ids, size))
+        if not batch:
+            return
+        yield batch
+
+
+def all_user_ids(batch_size=FOLLOW_RECOMMENDATIONS_CHUNK_SIZE):
+    """Yield every user id in order, fetched in keyset pages."""
+    last_id = 0
+    while True:
+        ids = list(CustomUser.objects.filter(id__gt=last_id).order_by('id').values_list(
+            'id', flat=True
+        )[:batch_size])
+        if not ids:
+            return
+        yield from ids
+        last_id = ids[-1]
+
+
+def following_of(user_ids, batch_size=FOLLOW_RECOMMENDATIONS_CHUNK_SIZE):
+    """Map each of ``user_ids`` to the set of ids it follows."""
+    following = defaultdict(set)
+    for batch in _batches(user_ids, batch_size):
+        edges = Follow.objects.filter(to_customuser_id__in=batch).values_list(
+            'to_customuser_id', 'from_customuser_id'
+        )
+        for follower_id, followed_id in edges.iterator():
+            following[follower_id].add(followed_id)
+    return following
+
+
+def compute_recommendations(user_ids, limit=FOLLOW_RECOMMENDATIONS_LIMIT,
+                            batch_size=FOLLOW_RECOMMENDATIONS_CHUNK_SIZE):
+    """
+    Return ``{user_id: [(candidate_id, mutual_count), ...]}`` for a chunk of
+    users, best candidates first.
+    """
+    following = following_of(user_ids, batch_size)
+    # Accounts followed by the chunk, mapped back to their followers in it.
+    followed_by = defaultdict(list)
+    for user_id, followed in following.items():
+        for followed_id in followed:
+            followed_by[followed_id].append(user_id)
+
+    counts = defaultdict(Counter)
+    for batch in _batches(followed_by, batch_size):
+        for via_id, second_degree in following_of(batch, batch_size).items():
+            for user_id in followed_by[via_id]:
+                counts[user_id].update(second_degree)
+
+    results = {}
+    for user_id in user_ids:
+        candidates = counts.get(user_id)
+        if not candidates:
+            results[user_id] = []
+            continue
+        exclude = following.get(user_id, set()) | {user_id}
+        results[user_id] = nsmallest(
+            limit,
+            ((candidate, count) for candidate, count in candidates.items() if candidate not in exclude),
+            key=lambda item: (-item[1], item[0]),
+        )
+    return results
+
+
+def refresh_recommendations(user_ids, limit=FOLLOW_RECOMMENDATIONS_LIMIT,
+                            chunk_size=FOLLOW_RECOMMENDATIONS_CHUNK_SIZE):
+    """
+    Recompute and store recommendations for ``user_ids`` (any iterable)
+    chunk by chunk. Returns the number of users and of rows written.
+    """
+    users = 0
+    written = 0
+    for chunk in _batches(user_ids, chunk_size):
+        results = compute_recommendations(chunk, limit, chunk_size)
+        rows = [
+            FollowRecommendation(user_id=user_id, candidate_id=candidate_id, mutual_count=count)
+            for user_id, candidates in results.items()
+            for candidate_id, count in candidates
+        ]
+        with transaction.atomic():
+            FollowRecommendation.objects.filter(user_id__in=chunk).delete()
+            FollowRecommendation.objects.bulk_create(rows, batch_size=chunk_size)
+        users += len(chunk)
+        written += len(rows)
+    return users, written
+
+
+def record_follow_changes(user_ids):
+    """Log users whose follows changed for the next incremental refresh."""
+    FollowGraphChange.objects.bulk_create(
+        [FollowGraphChange(user_id=user_id) for user_id in set(user_ids)]
+    )
+
+
+def users_affected_by_changes(max_change_id, batch_size=FOLLOW_RECOMMENDATIONS_CHUNK_SIZE):
+    """
+    Users whose recommendations depend on the logged changes: the users whose
+    follows changed, and everyone who follows them.
+    """
+    changed = set(FollowGraphChange.objects.filter(pk__lte=max_change_id).values_list(
+        'user_id', flat=True
+    ))
+    affected = set(changed)
+    for batch in _batches(changed, batch_size):
+        affected.update(Follow.objects.filter(from_customuser_id__in=batch).values_list(
+            'to_customuser_id', flat=True
+        ))
+    return affected
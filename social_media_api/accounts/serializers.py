@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import CustomUser
+from .graph import is_following
+from .models import CustomUser, FollowRecommendation
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -52,11 +53,43 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined']
 
 
-class UserListSerializer(serializers.ModelSerializer):
+class FollowStateMixin:
+    """
+    ``is_following`` for the requesting user. Views listing several users
+    pass the followed ids in the ``following_ids`` context entry.
+    """
+    
+    def get_is_following(self, obj):
+        following_ids = self.context.get('following_ids')
+        if following_ids is not None:
+            return obj.pk in following_ids
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return is_following(request.user.pk, obj.pk)
+        return False
+
+
+class UserDetailSerializer(FollowStateMixin, UserProfileSerializer):
+    is_following = serializers.SerializerMethodField()
+    
+    class Meta(UserProfileSerializer.Meta):
+        fields = UserProfileSerializer.Meta.fields + ['is_following']
+
+
+class UserListSerializer(FollowStateMixin, serializers.ModelSerializer):
     followers_count = serializers.ReadOnlyField()
     following_count = serializers.ReadOnlyField()
+    is_following = serializers.SerializerMethodField()
     
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'bio', 'profile_picture', 
-                 'followers_count', 'following_count']
\ No newline at end of file
+                 'followers_count', 'following_count', 'is_following']
+
+
+class FollowRecommendationSerializer(serializers.ModelSerializer):
+    user = UserListSerializer(source='candidate', read_only=True)
+    
+    class Meta:
+        model = FollowRecommendation
+        fields = ['user', 'mutual_count', 'computed_at']
@@ -0,0 +1,67 @@
+from functools import partial
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_token, invalidate_user
+from .graph import Follow, invalidate_following
+from .models import CustomUser
+from .recommendations import record_follow_changes
+
+
+@receiver(m2m_changed, sender=Follow)
+def invalidate_follow_graph(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drop the cached following sets of every follower whose follows changed
+    and log them for the next incremental recommendations refresh.
+    
+    ``user.following`` changes (reverse) affect ``user``; ``user.followers``
+    changes affect the users in ``pk_set``.
+    """
+    if action == 'pre_clear' and not reverse:
+        # The followers are gone by post_clear, so remember them now.
+        instance._cleared_follower_ids = list(
+            Follow.objects.filter(from_customuser=instance).values_list('to_customuser_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if reverse:
+        follower_ids = [instance.pk]
+    elif action == 'post_clear':
+        follower_ids = getattr(instance, '_cleared_follower_ids', [])
+    else:
+        follower_ids = pk_set
+    # Invalidate now and again on commit so no request re-caches the old set
+    # in between.
+    invalidate_following(follower_ids)
+    transaction.on_commit(partial(invalidate_following, list(follower_ids)))
+    record_follow_changes(follower_ids)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_cached_user(sender, instance, created, **kwargs):
+    """Cached users must not outlive profile, password or activation changes."""
+    if not created:
+        invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def revoke_signed_tokens(sender, instance, created, **kwargs):
+    """
+    Revoke signed tokens when a new password is saved. set_password keeps
+    the raw password until the save that stores it; the hash upgrade in
+    check_password clears it first, so rehashing on login revokes nothing.
+    """
+    if created or instance._password is None:
+        return
+    CustomUser.objects.filter(pk=instance.pk).update(token_version=F('token_version') + 1)
+    instance.refresh_from_db(fields=['token_version'])
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
@@ -1,3 +1,257 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from . import authentication, graph
+from .models import CustomUser, FollowGraphChange, FollowRecommendation
 
-# Create your tests here.
+
+class FollowGraphTestCase(APITestCase):
+    """
+    Test follow checks and relationship state served from the follow graph.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='reader', password='testpass123')
+        self.others = [
+            CustomUser.objects.create_user(username=f'user{i}', password='testpass123')
+            for i in range(5)
+        ]
+        self.client.force_authenticate(user=self.user)
+    
+    def test_follow_and_unfollow_checks(self):
+        target = self.others[0]
+        response = self.client.post(reverse('accounts:follow-user', args=[target.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('accounts:follow-user', args=[target.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(reverse('accounts:unfollow-user', args=[target.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('accounts:unfollow-user', args=[target.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_repeated_follow_counts_once(self):
+        target = self.others[0]
+        # As if a concurrent request changed the follow after the check.
+        with mock.patch('accounts.views.is_following', return_value=False):
+            self.client.post(reverse('accounts:follow-user', args=[target.id]))
+            response = self.client.post(reverse('accounts:follow-user', args=[target.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        counts = lambda: (
+            CustomUser.objects.get(pk=self.user.pk).following_count,
+            CustomUser.objects.get(pk=target.pk).followers_count,
+        )
+        self.assertEqual(counts(), (1, 1))
+        self.assertTrue(graph.is_following(self.user.pk, target.pk))
+        
+        with mock.patch('accounts.views.is_following', return_value=True):
+            self.client.post(reverse('accounts:unfollow-user', args=[target.id]))
+            response = self.client.post(reverse('accounts:unfollow-user', args=[target.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(counts(), (0, 0))
+        self.assertFalse(graph.is_following(self.user.pk, target.pk))
+    
+    def test_adjacency_set_is_cached_and_invalidated(self):
+        self.user.following.add(self.others[0])
+        self.assertEqual(graph.get_following_ids(self.user.pk), {self.others[0].pk})
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(self.user.pk, self.others[0].pk))
+        
+        # Changes from either side of the relation drop the cached set.
+        self.others[1].followers.add(self.user)
+        self.assertTrue(graph.is_following(self.user.pk, self.others[1].pk))
+        self.others[1].followers.clear()
+        self.assertFalse(graph.is_following(self.user.pk, self.others[1].pk))
+        self.user.following.remove(self.others[0])
+        self.assertEqual(graph.get_following_ids(self.user.pk), frozenset())
+    
+    def test_large_following_sets_are_not_cached(self):
+        self.user.following.add(*self.others)
+        with mock.patch.object(graph, 'FOLLOW_GRAPH_CACHE_MAX_SIZE', 2):
+            self.assertIsNone(graph.get_following_ids(self.user.pk))
+            self.assertTrue(graph.is_following(self.user.pk, self.others[4].pk))
+            self.assertEqual(
+                graph.following_among(self.user.pk, [self.others[0].pk, 12345]),
+                {self.others[0].pk}
+            )
+    
+    def test_user_list_and_detail_report_is_following(self):
+        self.user.following.add(self.others[1], self.others[3])
+        graph.get_following_ids(self.user.pk)
+        
+        # Page count and page; is_following comes from the cached set.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('accounts:user-list'))
+        following = {u['username'] for u in response.data['results'] if u['is_following']}
+        self.assertEqual(following, {'user1', 'user3'})
+        
+        response = self.client.get(reverse('accounts:user-detail', args=[self.others[3].id]))
+        self.assertTrue(response.data['is_following'])
+        response = self.client.get(reverse('accounts:user-detail', args=[self.others[2].id]))
+        self.assertFalse(response.data['is_following'])
+
+
+class FollowRecommendationTestCase(APITestCase):
+    """
+    Test offline friend-of-friend recommendations and their endpoint.
+    """
+    
+    def setUp(self):
+        self.users = {
+            name: CustomUser.objects.create_user(username=name, password='testpass123')
+            for name in ['alice', 'bob', 'carol', 'dave', 'erin']
+        }
+        self.follow('alice', 'bob', 'carol')
+        self.follow('bob', 'dave', 'erin')
+        self.follow('carol', 'dave', 'alice')
+    
+    def follow(self, name, *others):
+        self.users[name].following.add(*[self.users[other] for other in others])
+    
+    def recommended(self, name):
+        self.client.force_authenticate(user=self.users[name])
+        response = self.client.get(reverse('accounts:recommendations'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(r['user']['username'], r['mutual_count']) for r in response.data['results']]
+    
+    def test_full_run_ranks_by_mutual_follows(self):
+        out = StringIO()
+        call_command('compute_recommendations', '--chunk-size', '2', stdout=out)
+        self.assertIn('for 5 users', out.getvalue())
+        # dave is followed by both of alice's follows; alice herself is excluded.
+        self.assertEqual(self.recommended('alice'), [('dave', 2), ('erin', 1)])
+        self.assertEqual(self.recommended('bob'), [])
+        self.assertFalse(FollowGraphChange.objects.exists())
+    
+    def test_followed_candidates_are_hidden(self):
+        call_command('compute_recommendations', stdout=StringIO())
+        self.follow('alice', 'dave')
+        self.assertEqual(self.recommended('alice'), [('erin', 1)])
+    
+    def test_incremental_refresh_only_touches_affected_users(self):
+        call_command('compute_recommendations', stdout=StringIO())
+        stale = FollowRecommendation.objects.get(user=self.users['carol'], candidate=self.users['bob'])
+        
+        # erin's follows change: erin and her followers (bob) are refreshed.
+        self.follow('erin', 'carol')
+        out = StringIO()
+        call_command('compute_recommendations', '--incremental', stdout=out)
+        self.assertIn('for 2 users', out.getvalue())
+        self.assertEqual(self.recommended('bob'), [('carol', 1)])
+        self.assertTrue(FollowRecommendation.objects.filter(pk=stale.pk).exists())
+        self.assertFalse(FollowGraphChange.objects.exists())
+
+
+class UserListTestCase(APITestCase):
+    """
+    Test searching and ordering the user list.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.viewer = CustomUser.objects.create_user(username='viewer', password='testpass123')
+        for name, followers in [('carol', 5), ('alice', 12), ('bob', 5), ('dan', 0)]:
+            CustomUser.objects.create_user(
+                username=name, password='testpass123', followers_count=followers
+            )
+        self.client.force_authenticate(user=self.viewer)
+    
+    def usernames(self, **params):
+        response = self.client.get(reverse('accounts:user-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [u['username'] for u in response.data['results']]
+    
+    def test_ordering_by_follower_count(self):
+        self.assertEqual(self.usernames(), ['alice', 'bob', 'carol', 'dan', 'viewer'])
+        self.assertEqual(self.usernames(ordering='-followers_count')[:3], ['alice', 'bob', 'carol'])
+        self.assertEqual(self.usernames(ordering='followers_count')[-3:], ['carol', 'bob', 'alice'])
+        # Unknown fields fall back to the default ordering.
+        self.assertEqual(self.usernames(ordering='password')[0], 'alice')
+    
+    def test_search(self):
+        self.assertEqual(self.usernames(search='AL'), ['alice'])
+        self.assertEqual(self.usernames(search='a', ordering='-followers_count'), ['alice', 'carol', 'dan'])
+    
+    def test_page_reads_stored_counts(self):
+        # Page count, page, and the viewer's following set.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('accounts:user-list'), {'ordering': '-followers_count'})
+        self.assertEqual(response.data['results'][0]['followers_count'], 12)
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """
+    Test cached database tokens and signed tokens.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='reader', password='testpass123')
+    
+    def login(self):
+        self.client.credentials()
+        response = self.client.post(
+            reverse('accounts:login'), {'username': 'reader', 'password': 'testpass123'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['token']
+    
+    def get_profile(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return self.client.get(reverse('accounts:profile'))
+    
+    def test_database_token_is_served_from_cache(self):
+        token = self.login()
+        self.assertEqual(self.get_profile(token).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(authentication.authenticate_key(token), self.user)
+        
+        # Profile changes drop the cached user.
+        self.client.patch(reverse('accounts:profile'), {'bio': 'Updated'})
+        self.assertEqual(authentication.authenticate_key(token).bio, 'Updated')
+    
+    def test_logout_revokes_database_token(self):
+        token = self.login()
+        self.get_profile(token)
+        self.assertEqual(self.client.post(reverse('accounts:logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_profile(token).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotEqual(self.login(), token)
+    
+    def test_signed_tokens(self):
+        with mock.patch.object(authentication, 'AUTH_TOKEN_MODE', 'signed'):
+            token = self.login()
+        self.assertEqual(self.get_profile(token).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(authentication.authenticate_key(token), self.user)
+        
+        self.assertIsNone(authentication.authenticate_key(token[:-1] + 'x'))
+        
+        self.user.set_password('newpass456')
+        self.user.save()
+        self.assertEqual(self.get_profile(token).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_password_rehash_on_login_keeps_signed_tokens(self):
+        hasher = PBKDF2PasswordHasher()
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            password=hasher.encode('testpass123', hasher.salt(), iterations=1000)
+        )
+        with mock.patch.object(authentication, 'AUTH_TOKEN_MODE', 'signed'):
+            token = self.login()
+        self.user.refresh_from_db()
+        # The login upgraded the hash without revoking anything.
+        self.assertNotIn('$1000$', self.user.password)
+        self.assertEqual(self.user.token_version, 0)
+        self.assertEqual(self.get_profile(token).status_code, status.HTTP_200_OK)
+    
+    def test_logout_revokes_signed_token(self):
+        with mock.patch.object(authentication, 'AUTH_TOKEN_MODE', 'signed'):
+            token = self.login()
+        self.get_profile(token)
+        self.client.post(reverse('accounts:logout'))
+        self.assertEqual(self.get_profile(token).status_code, status.HTTP_401_UNAUTHORIZED)
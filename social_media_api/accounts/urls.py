@@ -6,9 +6,11 @@ app_name = 'accounts'
 urlpatterns = [
     path('register/', views.UserRegistrationView.as_view(), name='register'),
     path('login/', views.UserLoginView.as_view(), name='login'),
+    path('logout/', views.UserLogoutView.as_view(), name='logout'),
     path('profile/', views.UserProfileView.as_view(), name='profile'),
     path('users/', views.UserListView.as_view(), name='user-list'),
     path('users/<int:pk>/', views.UserDetailView.as_view(), name='user-detail'),
+    path('recommendations/', views.FollowRecommendationListView.as_view(), name='recommendations'),
     path('follow/<int:user_id>/', views.follow_user, name='follow-user'),
     path('unfollow/<int:user_id>/', views.unfollow_user, name='unfollow-user'),
 ]
\ No newline at end of file
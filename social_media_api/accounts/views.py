@@ -1,15 +1,20 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
+from django.db import transaction
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
-from .models import CustomUser
+from .authentication import issue_token, revoke_tokens
+from .graph import add_follow, following_among, is_following, remove_follow
+from .models import CustomUser, FollowRecommendation
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
     UserProfileSerializer,
-    UserListSerializer
+    UserDetailSerializer,
+    UserListSerializer,
+    FollowRecommendationSerializer
 )
 
 
@@ -22,11 +27,10 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
         
         return Response({
             'user': UserProfileSerializer(user).data,
-            'token': token.key
+            'token': issue_token(user)
         }, status=status.HTTP_201_CREATED)
 
 
@@ -38,34 +42,101 @@ class UserLoginView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
         
         return Response({
             'user': UserProfileSerializer(user).data,
-            'token': token.key
+            'token': issue_token(user)
         })
 
 
+class UserLogoutView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        revoke_tokens(request.user)
+        return Response({'message': 'Logged out'})
+
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # request.user may come from the authentication cache; read the
+        # profile (and its counters) fresh.
+        return CustomUser.objects.get(pk=self.request.user.pk)
 
 
 class UserListView(generics.ListAPIView):
+    """
+    Users matching ``?search=`` (username or name), sorted by ``?ordering=``.
+    Follower and following counts are stored on the user rows, so a page
+    costs one query plus the paginator's COUNT.
+    """
     queryset = CustomUser.objects.all()
     serializer_class = UserListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering_fields = ['username', 'date_joined', 'followers_count', 'following_count']
+    default_ordering = 'username'
+    
+    def get_queryset(self):
+        queryset = CustomUser.objects.all()
+        search = self.request.query_params.get('search', None)
+        if search:
+            queryset = queryset.filter(
+                Q(username__icontains=search) |
+                Q(first_name__icontains=search) |
+                Q(last_name__icontains=search)
+            )
+        ordering = self.request.query_params.get('ordering', self.default_ordering)
+        if ordering.lstrip('-') not in self.ordering_fields:
+            ordering = self.default_ordering
+        # Break ties on id in the same direction, matching the
+        # (followers_count, id) index.
+        direction = '-' if ordering.startswith('-') else ''
+        return queryset.order_by(ordering, f'{direction}id')
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        users = page if page is not None else list(queryset)
+        
+        # Resolve is_following for the whole page in one lookup.
+        context = self.get_serializer_context()
+        context['following_ids'] = following_among(request.user.pk, [u.pk for u in users])
+        serializer = self.get_serializer_class()(users, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
 
 class UserDetailView(generics.RetrieveAPIView):
     queryset = CustomUser.objects.all()
-    serializer_class = UserProfileSerializer
+    serializer_class = UserDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
+class FollowRecommendationListView(generics.ListAPIView):
+    """
+    Precomputed "who to follow" suggestions for the current user, most mutual
+    follows first. Accounts followed since the last computation are skipped.
+    """
+    serializer_class = FollowRecommendationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        user = self.request.user
+        return FollowRecommendation.objects.filter(user=user).exclude(
+            candidate__followers=user
+        ).select_related('candidate').order_by('-mutual_count', 'candidate_id')
+    
+    def get_serializer_context(self):
+        # Followed candidates are excluded above.
+        context = super().get_serializer_context()
+        context['following_ids'] = frozenset()
+        return context
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def follow_user(request, user_id):
@@ -77,13 +148,28 @@ def follow_user(request, user_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    if user_to_follow in request.user.following.all():
+    if is_following(request.user.pk, user_to_follow.pk):
         return Response(
             {'error': 'You are already following this user'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    request.user.following.add(user_to_follow)
+    with transaction.atomic():
+        # The check above can race with a concurrent follow.
+        if not add_follow(request.user, user_to_follow):
+            return Response(
+                {'error': 'You are already following this user'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        CustomUser.objects.filter(pk=request.user.pk).update(following_count=F('following_count') + 1)
+        CustomUser.objects.filter(pk=user_to_follow.pk).update(followers_count=F('followers_count') + 1)
+    
+    # Backfill the followed user's posts into the home timeline
+    try:
+        from posts.timeline import add_author_to_timeline
+        add_author_to_timeline(request.user, user_to_follow)
+    except ImportError:
+        pass  # Posts app might not be available yet
     
     # Create notification
     try:
@@ -100,11 +186,29 @@ def follow_user(request, user_id):
 def unfollow_user(request, user_id):
     user_to_unfollow = get_object_or_404(CustomUser, id=user_id)
     
-    if user_to_unfollow not in request.user.following.all():
+    if not is_following(request.user.pk, user_to_unfollow.pk):
         return Response(
             {'error': 'You are not following this user'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    request.user.following.remove(user_to_unfollow)
+    with transaction.atomic():
+        if not remove_follow(request.user, user_to_unfollow):
+            return Response(
+                {'error': 'You are not following this user'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        CustomUser.objects.filter(pk=request.user.pk, following_count__gt=0).update(
+            following_count=F('following_count') - 1
+        )
+        CustomUser.objects.filter(pk=user_to_unfollow.pk, followers_count__gt=0).update(
+            followers_count=F('followers_count') - 1
+        )
+    
+    try:
+        from posts.timeline import remove_author_from_timeline
+        remove_author_from_timeline(request.user, user_to_unfollow)
+    except ImportError:
+        pass  # Posts app might not be available yet
+    
     return Response({'message': f'You have unfollowed {user_to_unfollow.username}'})
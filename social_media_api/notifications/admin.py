@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .counters import invalidate_unread_counts
 from .models import Notification
 
 
@@ -13,5 +14,6 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def mark_as_read(self, request, queryset):
         queryset.update(is_read=True)
+        invalidate_unread_counts(queryset.values_list('recipient_id', flat=True))
         self.message_user(request, f"{queryset.count()} notifications marked as read.")
     mark_as_read.short_description = "Mark selected notifications as read"
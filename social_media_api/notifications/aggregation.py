@@ -0,0 +1,114 @@
+"""
+Collapse bursts of similar notifications into one row per
+(recipient, notification_type, target) and time window.
+
+A group's window starts at its ``created_at`` and does not move; merging an
+event bumps ``updated_at`` instead. Every actor of a group is recorded in
+NotificationActor, so ``actor_count`` counts distinct actors.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .models import Notification, NotificationActor
+
+# Group notifications instead of writing one row per event.
+NOTIFICATION_AGGREGATION = getattr(settings, 'NOTIFICATION_AGGREGATION', True)
+
+# Notification types that are grouped.
+NOTIFICATION_AGGREGATE_TYPES = getattr(settings, 'NOTIFICATION_AGGREGATE_TYPES', ('like', 'follow'))
+
+# Events are merged into an unread group started within this many seconds.
+NOTIFICATION_AGGREGATION_WINDOW = getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', 24 * 60 * 60)
+
+# Number of actors kept in ``Notification.recent_actors``.
+NOTIFICATION_RECENT_ACTORS = getattr(settings, 'NOTIFICATION_RECENT_ACTORS', 3)
+
+
+def group_key(notification):
+    return (
+        notification.recipient_id,
+        notification.notification_type,
+        notification.target_content_type_id,
+        notification.target_object_id,
+    )
+
+
+def merge_recent_actors(recent_actors, notifications):
+    """Prepend the actors of ``notifications`` (oldest first) to a recent-actors snapshot."""
+    for notification in notifications:
+        recent_actors = [a for a in recent_actors if a['id'] != notification.actor_id]
+        recent_actors.insert(0, {
+            'id': notification.actor_id,
+            'username': notification.actor.username,
+        })
+    return recent_actors[:NOTIFICATION_RECENT_ACTORS]
+
+
+def aggregate(notifications, updated=None):
+    """
+    Fold aggregatable notifications into existing unread groups.
+
+    Returns the notifications that still have to be inserted: non-aggregatable
+    ones unchanged, plus one new group row for each key with no open group,
+    carrying its ``group_actor_ids`` for ``record_actors``. The ids of groups
+    that were updated in place are appended to ``updated``.
+    """
+    pending = []
+    groups = {}
+    for notification in notifications:
+        if notification.notification_type in NOTIFICATION_AGGREGATE_TYPES:
+            groups.setdefault(group_key(notification), []).append(notification)
+        else:
+            pending.append(notification)
+
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=NOTIFICATION_AGGREGATION_WINDOW)
+    for (recipient_id, notification_type, content_type_id, object_id), group in groups.items():
+        latest = group[-1]
+        actor_ids = {n.actor_id for n in group}
+        existing = Notification.objects.filter(
+            recipient_id=recipient_id,
+            notification_type=notification_type,
+            target_content_type_id=content_type_id,
+            target_object_id=object_id,
+            is_read=False,
+            created_at__gte=cutoff,
+        ).order_by('-created_at').only('id', 'recent_actors').first()
+
+        if existing is None:
+            latest.actor_count = len(actor_ids)
+            latest.recent_actors = merge_recent_actors([], group)
+            latest.group_actor_ids = actor_ids
+            pending.append(latest)
+            continue
+
+        # Actors who already took part (e.g. like, unlike, like again) are
+        # not counted twice.
+        new_actor_ids = actor_ids - set(NotificationActor.objects.filter(
+            notification_id=existing.pk, actor_id__in=actor_ids
+        ).values_list('actor_id', flat=True))
+        NotificationActor.objects.bulk_create([
+            NotificationActor(notification_id=existing.pk, actor_id=actor_id)
+            for actor_id in new_actor_ids
+        ], ignore_conflicts=True)
+        Notification.objects.filter(pk=existing.pk).update(
+            actor_id=latest.actor_id,
+            verb=latest.verb,
+            actor_count=F('actor_count') + len(new_actor_ids),
+            recent_actors=merge_recent_actors(existing.recent_actors, group),
+            updated_at=now,
+        )
+        if updated is not None:
+            updated.append(existing.pk)
+    return pending
+
+
+def record_actors(notifications):
+    """Record the actors of groups created by ``aggregate`` once they are saved."""
+    NotificationActor.objects.bulk_create([
+        NotificationActor(notification_id=notification.pk, actor_id=actor_id)
+        for notification in notifications
+        for actor_id in getattr(notification, 'group_actor_ids', ())
+    ], ignore_conflicts=True)
@@ -0,0 +1,64 @@
+"""
+Per-user unread notification counters kept in the cache.
+
+Counters are adjusted as notifications are written and read. A missing key
+is recomputed from the database (served by the partial unread index), so a
+lost or evicted counter heals itself on the next read.
+"""
+
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from .models import Notification
+
+# Seconds a counter lives before it is recomputed from the database.
+UNREAD_COUNT_CACHE_TIMEOUT = getattr(settings, 'UNREAD_COUNT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def unread_count_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def get_unread_count(user_id):
+    """Return the user's unread count, recomputing it on a cache miss."""
+    count = cache.get(unread_count_key(user_id))
+    if count is not None and count >= 0:
+        return count
+    count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+    cache.set(unread_count_key(user_id), count, UNREAD_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def _adjust(user_id, delta):
+    key = unread_count_key(user_id)
+    try:
+        if delta >= 0:
+            count = cache.incr(key, delta)
+        else:
+            count = cache.decr(key, -delta)
+    except ValueError:
+        # Not cached: the next read recomputes it.
+        return
+    if count < 0:
+        cache.delete(key)
+
+
+def increment_unread_counts(notifications):
+    """Count newly inserted unread notifications against their recipients."""
+    for recipient_id, count in Counter(
+        n.recipient_id for n in notifications if not n.is_read
+    ).items():
+        _adjust(recipient_id, count)
+
+
+def decrement_unread_count(user_id, count=1):
+    if count:
+        _adjust(user_id, -count)
+
+
+def reset_unread_count(user_id):
+    cache.set(unread_count_key(user_id), 0, UNREAD_COUNT_CACHE_TIMEOUT)
+
+
+def invalidate_unread_counts(user_ids):
+    cache.delete_many([unread_count_key(user_id) for user_id in set(user_ids)])
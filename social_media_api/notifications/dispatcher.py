@@ -0,0 +1,165 @@
+"""
+Background writer for notifications.
+
+Request handlers hand unsaved Notification instances to the dispatcher once
+their own transaction has committed. A worker thread collects them from a
+bounded queue, coalesces duplicates and writes them with bulk_create, so
+notification work is not part of the request's write latency.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from . import aggregation
+from .counters import increment_unread_counts
+from .models import Notification
+from .pubsub import publish_notifications
+
+logger = logging.getLogger(__name__)
+
+# Write notifications from a background thread. When False, notifications are
+# written synchronously once the surrounding transaction commits.
+NOTIFICATIONS_ASYNC = getattr(settings, 'NOTIFICATIONS_ASYNC', True)
+
+# Pending notifications held in memory before callers fall back to writing
+# synchronously.
+NOTIFICATION_QUEUE_SIZE = getattr(settings, 'NOTIFICATION_QUEUE_SIZE', 10000)
+
+# Maximum rows per bulk_create and how long (seconds) the worker waits to fill
+# a batch.
+NOTIFICATION_BATCH_SIZE = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+NOTIFICATION_FLUSH_INTERVAL = getattr(settings, 'NOTIFICATION_FLUSH_INTERVAL', 0.5)
+
+
+def coalesce(notifications):
+    """
+    Collapse duplicate events (same recipient, actor, type and target) in a
+    batch, keeping the most recent one.
+    """
+    unique = {}
+    for notification in notifications:
+        key = (
+            notification.recipient_id,
+            notification.actor_id,
+            notification.notification_type,
+            notification.target_content_type_id,
+            notification.target_object_id,
+        )
+        unique.pop(key, None)
+        unique[key] = notification
+    return list(unique.values())
+
+
+def write_notifications(notifications):
+    """
+    Coalesce, aggregate and insert a batch of unsaved notifications, then
+    update unread counters and push the changes to open streams.
+    """
+    notifications = coalesce(notifications)
+    updated = []
+    if aggregation.NOTIFICATION_AGGREGATION:
+        notifications = aggregation.aggregate(notifications, updated)
+    notifications = Notification.objects.bulk_create(notifications, batch_size=NOTIFICATION_BATCH_SIZE)
+    aggregation.record_actors(notifications)
+    increment_unread_counts(notifications)
+    publish_notifications(notifications)
+    if updated:
+        publish_notifications(Notification.objects.filter(pk__in=updated).select_related('actor'))
+    return notifications
+
+
+class NotificationDispatcher:
+    """
+    Bounded queue drained by a daemon worker thread in batches.
+    """
+
+    def __init__(self, maxsize=NOTIFICATION_QUEUE_SIZE, batch_size=NOTIFICATION_BATCH_SIZE,
+                 flush_interval=NOTIFICATION_FLUSH_INTERVAL):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, notification):
+        """Queue a notification, writing it inline if async dispatch is off or the queue is full."""
+        if not NOTIFICATIONS_ASYNC:
+            write_notifications([notification])
+            return
+
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(notification)
+        except queue.Full:
+            logger.warning('Notification queue is full; writing notification synchronously')
+            write_notifications([notification])
+
+    def flush(self):
+        """Block until every queued notification has been written."""
+        self.queue.join()
+
+    def _ensure_worker(self):
+        # Worker threads do not survive fork(), so pre-forking servers need a
+        # new one per child process.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='notification-dispatcher', daemon=True
+            )
+            self._thread.start()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                close_old_connections()
+                write_notifications(batch)
+            except Exception:
+                logger.exception('Failed to write %d notifications', len(batch))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def drain(self):
+        """Synchronously write whatever is still queued (used at interpreter exit)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            try:
+                write_notifications(batch)
+            except Exception:
+                logger.exception('Failed to write %d notifications at exit', len(batch))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+
+dispatcher = NotificationDispatcher()
+atexit.register(dispatcher.drain)
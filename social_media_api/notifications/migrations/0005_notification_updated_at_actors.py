@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill(apps, schema_editor):
+    """
+    Start updated_at at created_at, which merges used to move, and record the
+    known actors (the latest and ``recent_actors``) of unread groups. Older
+    actors of those groups are not known and may be counted again.
+    """
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationActor = apps.get_model('notifications', 'NotificationActor')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Notification.objects.update(updated_at=models.F('created_at'))
+
+    groups = Notification.objects.filter(
+        is_read=False, notification_type__in=('like', 'follow')
+    ).values_list('id', 'actor_id', 'recent_actors')
+    batch = []
+    for pk, actor_id, recent_actors in groups.iterator(chunk_size=2000):
+        batch.extend((pk, actor) for actor in {actor_id, *(a['id'] for a in recent_actors)})
+        if len(batch) >= 2000:
+            _create_actors(NotificationActor, User, batch)
+            batch = []
+    _create_actors(NotificationActor, User, batch)
+
+
+def _create_actors(NotificationActor, User, pairs):
+    # recent_actors may name deleted accounts.
+    existing = set(User.objects.filter(pk__in={actor for _, actor in pairs}).values_list('pk', flat=True))
+    NotificationActor.objects.bulk_create([
+        NotificationActor(notification_id=pk, actor_id=actor) for pk, actor in pairs if actor in existing
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0004_notification_unread_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='notifications.notification')),
+            ],
+            options={
+                'unique_together': {('notification', 'actor')},
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-updated_at']},
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_recipient_created',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-updated_at'], name='notif_recipient_updated'),
+        ),
+    ]
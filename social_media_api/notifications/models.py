@@ -23,13 +23,53 @@ class Notification(models.Model):
     target = GenericForeignKey('target_content_type', 'target_object_id')
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the notification is written and whenever a group gains an
+    # actor; lists, bulk mark-read and stream replay are keyed on it.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Aggregated notifications ("alice and 41 others liked your post") group
+    # events by (recipient, notification_type, target) from ``created_at``
+    # on; ``actor`` is the most recent actor and ``recent_actors`` a snapshot
+    # of the last few. Every actor is recorded in NotificationActor.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['recipient', '-updated_at'], name='notif_recipient_updated'),
+            models.Index(
+                fields=['recipient', 'notification_type', 'target_object_id'],
+                name='notif_group'
+            ),
+            models.Index(
+                fields=['recipient'],
+                condition=models.Q(is_read=False),
+                name='notif_unread_recipient'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.actor.username} {self.verb} - {self.recipient.username}"
     
     def mark_as_read(self):
+        """
+        Mark as read with a single-column UPDATE. Returns False if the
+        notification was already read, so callers can keep counters exact.
+        """
+        if self.is_read:
+            return False
+        updated = Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True)
         self.is_read = True
-        self.save()
+        return bool(updated)
+
+
+class NotificationActor(models.Model):
+    """
+    An actor of an unread aggregated notification, so an actor who comes back
+    (e.g. like, unlike, like again) is not counted twice.
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        unique_together = ['notification', 'actor']
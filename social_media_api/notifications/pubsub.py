@@ -0,0 +1,151 @@
+"""
+Publish/subscribe hub that fans new notifications out to open SSE streams.
+
+NotificationHub delivers events to subscribers in the current process. When
+NOTIFICATION_PUBSUB_URL points at Redis, RedisNotificationHub publishes on a
+Redis channel instead and every process relays what it receives to its own
+local subscribers.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .serializers import NotificationListSerializer
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per stream before a slow client is told to reconnect.
+NOTIFICATION_STREAM_QUEUE_SIZE = getattr(settings, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+
+# Redis URL for cross-process delivery; None keeps delivery in-process.
+NOTIFICATION_PUBSUB_URL = getattr(settings, 'NOTIFICATION_PUBSUB_URL', None)
+
+
+class Subscription:
+    """
+    A single stream's bounded event queue.
+
+    ``overflowed`` is set instead of blocking the publisher when the client
+    cannot keep up; the stream then ends and the client resumes from its
+    Last-Event-ID.
+    """
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class NotificationHub:
+    """
+    In-process hub. ``publish`` may be called from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, user_id, maxsize=NOTIFICATION_STREAM_QUEUE_SIZE):
+        subscription = Subscription(user_id, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscriptions
+
+    def publish(self, user_id, event):
+        self._deliver_local(user_id, event)
+
+    def _deliver_local(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The stream's event loop has shut down.
+                self.unsubscribe(subscription)
+
+
+class RedisNotificationHub(NotificationHub):
+    """
+    Hub that relays events through Redis so every process sees them.
+    """
+    channel_prefix = 'notifications:stream:'
+
+    def __init__(self, url):
+        import redis
+
+        super().__init__()
+        self.redis = redis.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self, user_id, maxsize=NOTIFICATION_STREAM_QUEUE_SIZE):
+        self._ensure_listener()
+        return super().subscribe(user_id, maxsize)
+
+    def has_subscribers(self, user_id):
+        # Subscribers may live in other processes.
+        return True
+
+    def publish(self, user_id, event):
+        self.redis.publish(
+            f'{self.channel_prefix}{user_id}', json.dumps(event, cls=DjangoJSONEncoder)
+        )
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name='notification-pubsub', daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f'{self.channel_prefix}*')
+        for message in pubsub.listen():
+            try:
+                user_id = int(message['channel'].decode().rsplit(':', 1)[1])
+                self._deliver_local(user_id, json.loads(message['data']))
+            except (ValueError, KeyError):
+                logger.warning('Ignoring malformed notification message %r', message)
+
+
+def _create_hub():
+    if NOTIFICATION_PUBSUB_URL:
+        return RedisNotificationHub(NOTIFICATION_PUBSUB_URL)
+    return NotificationHub()
+
+
+hub = _create_hub()
+
+
+def publish_notifications(notifications):
+    """Push saved notifications to their recipients' open streams."""
+    for notification in notifications:
+        if not hub.has_subscribers(notification.recipient_id):
+            continue
+        hub.publish(
+            notification.recipient_id,
+            dict(NotificationListSerializer(notification).data),
+        )
@@ -11,22 +11,53 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'profile_picture']
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class AggregatedNotificationMixin(serializers.Serializer):
+    """
+    Render grouped notifications, e.g. "alice and 41 others liked your post".
+    """
+    summary = serializers.SerializerMethodField()
+    
+    def get_summary(self, obj):
+        others = obj.actor_count - 1
+        if others <= 0:
+            return f"{obj.actor.username} {obj.verb}"
+        return f"{obj.actor.username} and {others} other{'s' if others > 1 else ''} {obj.verb}"
+
+
+class NotificationSerializer(AggregatedNotificationMixin, serializers.ModelSerializer):
     actor = UserSerializer(read_only=True)
     recipient = UserSerializer(read_only=True)
     
     class Meta:
         model = Notification
         fields = ['id', 'actor', 'recipient', 'verb', 'notification_type', 
-                 'target_object_id', 'is_read', 'created_at']
-        read_only_fields = ['id', 'created_at']
+                 'target_object_id', 'actor_count', 'recent_actors', 'summary',
+                 'is_read', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'actor_count', 'recent_actors', 'created_at', 'updated_at']
 
 
-class NotificationListSerializer(serializers.ModelSerializer):
+class NotificationListSerializer(AggregatedNotificationMixin, serializers.ModelSerializer):
     actor = UserSerializer(read_only=True)
     
     class Meta:
         model = Notification
         fields = ['id', 'actor', 'verb', 'notification_type', 
-                 'target_object_id', 'is_read', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+                 'target_object_id', 'actor_count', 'recent_actors', 'summary',
+                 'is_read', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'actor_count', 'recent_actors', 'created_at', 'updated_at']
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    """
+    Payload for marking several notifications read: either explicit ``ids``
+    or ``up_to``, the newest ``updated_at`` the client has seen.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, max_length=500
+    )
+    up_to = serializers.DateTimeField(required=False)
+    
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('up_to' in attrs):
+            raise serializers.ValidationError("Provide either 'ids' or 'up_to'")
+        return attrs
@@ -1,3 +1,308 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from posts.models import Post
+from . import aggregation, dispatcher as dispatcher_module, views
+from .counters import get_unread_count, unread_count_key
+from .dispatcher import NotificationDispatcher, coalesce, write_notifications
+from .models import Notification
+from .pubsub import hub
+from .serializers import NotificationListSerializer
+from .utils import create_like_notification
 
-# Create your tests here.
+User = get_user_model()
+
+
+@mock.patch.object(dispatcher_module, 'NOTIFICATIONS_ASYNC', False)
+class NotificationDispatchTestCase(APITestCase):
+    """
+    Test that notifications are written once the triggering write commits.
+    """
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Post', content='Body')
+        self.client.force_authenticate(user=self.reader)
+    
+    def test_like_notification_written_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(reverse('post-like', args=[self.post.id]))
+            self.assertFalse(Notification.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.target, self.post)
+    
+    def test_no_notification_without_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(reverse('post-like', args=[self.post.id]))
+        self.assertFalse(Notification.objects.exists())
+
+
+class CoalesceTestCase(TestCase):
+    """
+    Test that duplicate events in a batch collapse into one row.
+    """
+    
+    def test_duplicates_are_coalesced(self):
+        author = User.objects.create_user(username='author', password='testpass123')
+        reader = User.objects.create_user(username='reader', password='testpass123')
+        post = Post.objects.create(author=author, title='Post', content='Body')
+        
+        with self.captureOnCommitCallbacks():
+            first = create_like_notification(reader, post)
+            second = create_like_notification(reader, post)
+            follow = Notification(recipient=author, actor=reader, verb='followed', notification_type='follow')
+        
+        self.assertEqual(coalesce([first, follow, second]), [follow, second])
+
+
+class NotificationDispatcherThreadTestCase(TransactionTestCase):
+    """
+    Test the background worker writes queued notifications in batches.
+    """
+    
+    def test_worker_bulk_writes_queue(self):
+        author = User.objects.create_user(username='author', password='testpass123')
+        actors = [User.objects.create_user(username=f'actor{i}', password='testpass123') for i in range(5)]
+        dispatcher = NotificationDispatcher(batch_size=10, flush_interval=0.05)
+        
+        with mock.patch.object(dispatcher_module, 'NOTIFICATIONS_ASYNC', True):
+            for actor in actors:
+                dispatcher.submit(Notification(
+                    recipient=author, actor=actor, verb='mentioned you', notification_type='mention'
+                ))
+            dispatcher.flush()
+        
+        self.assertEqual(Notification.objects.filter(recipient=author).count(), 5)
+
+
+class AggregationTestCase(APITestCase):
+    """
+    Test that likes on the same post collapse into one grouped notification.
+    """
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Post', content='Body')
+        self.likers = [
+            User.objects.create_user(username=f'liker{i}', password='testpass123')
+            for i in range(5)
+        ]
+    
+    def like(self, likers):
+        with self.captureOnCommitCallbacks():
+            write_notifications([create_like_notification(liker, self.post) for liker in likers])
+    
+    def test_likes_are_grouped_across_batches(self):
+        self.like(self.likers[:2])
+        self.like(self.likers[2:])
+        
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.likers[-1])
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual(
+            [a['username'] for a in notification.recent_actors],
+            ['liker4', 'liker3', 'liker2']
+        )
+        
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get(reverse('notifications:notification-list'))
+        self.assertEqual(
+            response.data['results'][0]['summary'],
+            "liker4 and 4 others liked your post 'Post'"
+        )
+    
+    def test_repeat_actors_are_counted_once(self):
+        self.like(self.likers[:4])
+        # liker0 has left recent_actors by now but is still known.
+        self.like(self.likers[:1])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 4)
+        self.assertEqual(notification.actors.count(), 4)
+    
+    def test_window_does_not_slide(self):
+        self.like(self.likers[:1])
+        group = Notification.objects.get()
+        self.like(self.likers[1:2])
+        merged = Notification.objects.get()
+        self.assertEqual(merged.created_at, group.created_at)
+        self.assertGreater(merged.updated_at, group.updated_at)
+        
+        # A trickle of likes still starts a new group once the window that
+        # began with the first like has passed.
+        Notification.objects.update(
+            created_at=timezone.now() - timedelta(seconds=aggregation.NOTIFICATION_AGGREGATION_WINDOW + 1)
+        )
+        self.like(self.likers[2:3])
+        self.assertEqual(Notification.objects.count(), 2)
+    
+    def test_updated_group_moves_to_the_top(self):
+        self.like(self.likers[:1])
+        group = Notification.objects.get()
+        Notification.objects.create(
+            recipient=self.author, actor=self.likers[0], verb='mentioned you', notification_type='mention'
+        )
+        self.like(self.likers[1:2])
+        
+        self.client.force_authenticate(user=self.author)
+        for params in ({}, {'pagination': 'cursor'}):
+            response = self.client.get(reverse('notifications:notification-list'), params)
+            self.assertEqual(response.data['results'][0]['id'], group.id)
+    
+    def test_read_group_starts_a_new_one(self):
+        self.like(self.likers[:2])
+        Notification.objects.update(is_read=True)
+        self.like(self.likers[2:3])
+        
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Notification.objects.get(is_read=False).actor_count, 1)
+    
+    @mock.patch.object(aggregation, 'NOTIFICATION_AGGREGATION', False)
+    def test_aggregation_can_be_disabled(self):
+        self.like(self.likers)
+        self.assertEqual(Notification.objects.count(), 5)
+
+
+@mock.patch.object(aggregation, 'NOTIFICATION_AGGREGATION', False)
+class UnreadCountTestCase(APITestCase):
+    """
+    Test the cached unread notification counter.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='testpass123')
+        self.actor = User.objects.create_user(username='actor', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('notifications:unread-count')
+    
+    def notify(self, count):
+        return write_notifications([
+            Notification(recipient=self.user, actor=self.actor, verb=f'mentioned you {i}',
+                         notification_type='mention', target_object_id=i)
+            for i in range(count)
+        ])
+    
+    def test_count_served_from_cache(self):
+        self.notify(3)
+        self.assertEqual(self.client.get(self.url).data['unread_count'], 3)
+        
+        self.notify(2)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['unread_count'], 5)
+    
+    def test_mark_read_updates_count(self):
+        notifications = self.notify(3)
+        get_unread_count(self.user.id)
+        
+        self.client.post(reverse('notifications:mark-read', args=[notifications[0].id]))
+        self.client.post(reverse('notifications:mark-read', args=[notifications[0].id]))
+        self.assertEqual(self.client.get(self.url).data['unread_count'], 2)
+        
+        self.client.post(reverse('notifications:mark-all-read'))
+        self.assertEqual(self.client.get(self.url).data['unread_count'], 0)
+    
+    def test_bulk_mark_read(self):
+        notifications = self.notify(5)
+        url = reverse('notifications:mark-read-bulk')
+        
+        response = self.client.post(url, {'ids': [notifications[0].id, notifications[1].id]}, format='json')
+        self.assertEqual(response.data, {'marked_read': 2, 'unread_count': 3})
+        
+        # Everything the client has seen, by updated_at; the last one was
+        # regrouped after that and stays unread.
+        seen = self.client.get(reverse('notifications:notification-list')).data['results'][0]['updated_at']
+        Notification.objects.filter(pk=notifications[4].pk).update(
+            updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        response = self.client.post(url, {'up_to': seen}, format='json')
+        self.assertEqual(response.data, {'marked_read': 2, 'unread_count': 1})
+        self.assertFalse(Notification.objects.get(pk=notifications[4].pk).is_read)
+        
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_mark_as_read_skips_read_rows(self):
+        notification = self.notify(1)[0]
+        self.assertTrue(notification.mark_as_read())
+        with self.assertNumQueries(0):
+            self.assertFalse(notification.mark_as_read())
+    
+    def test_count_recomputed_on_cache_miss(self):
+        self.notify(2)
+        get_unread_count(self.user.id)
+        cache.delete(unread_count_key(self.user.id))
+        self.assertEqual(self.client.get(self.url).data['unread_count'], 2)
+
+
+class NotificationStreamTestCase(TestCase):
+    """
+    Test the Server-Sent Events notification stream.
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='testpass123')
+        self.actor = User.objects.create_user(username='actor', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.missed = Notification.objects.create(
+            recipient=self.user, actor=self.actor, verb='mentioned you', notification_type='mention'
+        )
+    
+    async def test_stream_replays_and_pushes(self):
+        # Resume from an event seen before the missed notification was updated.
+        seen = self.missed.updated_at - timedelta(seconds=1)
+        response = await self.async_client.get(
+            reverse('notifications:notification-stream'),
+            headers={'Authorization': f'Token {self.token.key}', 'Last-Event-ID': f'{seen.isoformat()}/{self.missed.id}'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        
+        async def next_chunk():
+            chunk = await asyncio.wait_for(stream.__anext__(), 5)
+            return chunk.decode() if isinstance(chunk, bytes) else chunk
+        
+        self.assertTrue((await next_chunk()).startswith('retry:'))
+        missed = await asyncio.to_thread(lambda: NotificationListSerializer(self.missed).data)
+        self.assertIn(f"id: {missed['updated_at']}/{self.missed.id}\n", await next_chunk())
+        
+        hub.publish(self.user.id, {'id': 12345, 'updated_at': 'now', 'verb': 'liked your post'})
+        self.assertIn('id: now/12345\n', await next_chunk())
+        await stream.aclose()
+    
+    async def test_stream_replays_more_than_one_batch(self):
+        await Notification.objects.abulk_create([
+            Notification(recipient=self.user, actor=self.actor, verb='mentioned you', notification_type='mention')
+            for _ in range(4)
+        ])
+        seen = self.missed.updated_at - timedelta(seconds=1)
+        with mock.patch.object(views, 'NOTIFICATION_STREAM_QUEUE_SIZE', 2):
+            response = await self.async_client.get(
+                reverse('notifications:notification-stream'),
+                headers={'Authorization': f'Token {self.token.key}', 'Last-Event-ID': f'{seen.isoformat()}/{self.missed.id}'}
+            )
+            stream = response.streaming_content
+            chunks = [await asyncio.wait_for(stream.__anext__(), 5) for _ in range(6)]
+            await stream.aclose()
+        chunks = [chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in chunks]
+        # All five missed notifications arrive in order, with no reset.
+        self.assertTrue(chunks[0].startswith('retry:'))
+        ids = [pk async for pk in Notification.objects.order_by('updated_at', 'id').values_list('id', flat=True)]
+        self.assertEqual(len(ids), 5)
+        for chunk, pk in zip(chunks[1:], ids):
+            self.assertIn('event: notification\n', chunk)
+            self.assertIn(f'"id": {pk},', chunk)
+    
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get(reverse('notifications:notification-stream'))
+        self.assertEqual(response.status_code, 401)
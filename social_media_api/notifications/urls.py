@@ -7,6 +7,8 @@ urlpatterns = [
     path('', views.NotificationListView.as_view(), name='notification-list'),
     path('<int:pk>/', views.NotificationDetailView.as_view(), name='notification-detail'),
     path('<int:notification_id>/read/', views.mark_notification_read, name='mark-read'),
+    path('mark-read/', views.mark_notifications_read, name='mark-read-bulk'),
     path('mark-all-read/', views.mark_all_notifications_read, name='mark-all-read'),
     path('unread-count/', views.unread_notifications_count, name='unread-count'),
+    path('stream/', views.notification_stream, name='notification-stream'),
 ]
\ No newline at end of file
@@ -1,11 +1,16 @@
 from .models import Notification
+from .dispatcher import dispatcher
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 
 
 def create_notification(recipient, actor, verb, notification_type, target=None):
     """
     Create a notification for a user.
     
+    The notification is handed to the background dispatcher once the current
+    transaction commits, so it is not saved when this function returns.
+    
     Args:
         recipient: User receiving the notification
         actor: User performing the action
@@ -17,10 +22,11 @@ def create_notification(recipient, actor, verb, notification_type, target=None):
     target_object_id = None
     
     if target:
+        # Served from ContentType's in-process cache after the first lookup.
         target_content_type = ContentType.objects.get_for_model(target)
         target_object_id = target.id
     
-    notification = Notification.objects.create(
+    notification = Notification(
         recipient=recipient,
         actor=actor,
         verb=verb,
@@ -28,6 +34,7 @@ def create_notification(recipient, actor, verb, notification_type, target=None):
         target_content_type=target_content_type,
         target_object_id=target_object_id
     )
+    transaction.on_commit(lambda: dispatcher.submit(notification))
     
     return notification
 
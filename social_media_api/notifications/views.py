@@ -1,17 +1,38 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
+from accounts.authentication import authenticate_key
+from social_media_api.pagination import PageNumberOrKeysetPagination, keyset_page
+from .counters import decrement_unread_count, get_unread_count, reset_unread_count
 from .models import Notification
-from .serializers import NotificationListSerializer, NotificationSerializer
+from .pubsub import NOTIFICATION_STREAM_QUEUE_SIZE, hub
+from .serializers import (
+    NotificationListSerializer,
+    NotificationMarkReadSerializer,
+    NotificationSerializer
+)
+
+
+class NotificationPagination(PageNumberOrKeysetPagination):
+    # Groups move to the top when they gain actors.
+    position_field = 'updated_at'
 
 
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
     
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.filter(recipient=self.request.user).select_related('actor')
 
 
 class NotificationDetailView(generics.RetrieveAPIView):
@@ -19,26 +40,173 @@ class NotificationDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.filter(recipient=self.request.user).select_related(
+            'actor', 'recipient'
+        )
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_notification_read(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
-    notification.mark_as_read()
-    return Response({'message': 'Notification marked as read'})
+    if notification.mark_as_read():
+        decrement_unread_count(request.user.id)
+    return Response({
+        'message': 'Notification marked as read',
+        'unread_count': get_unread_count(request.user.id)
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def mark_notifications_read(request):
+    """
+    Mark a list of notifications, or everything last updated at or before a
+    given time, as read with one UPDATE. Groups that gained actors since stay
+    unread.
+    """
+    serializer = NotificationMarkReadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    notifications = Notification.objects.filter(recipient=request.user, is_read=False)
+    if 'ids' in serializer.validated_data:
+        notifications = notifications.filter(id__in=serializer.validated_data['ids'])
+    else:
+        notifications = notifications.filter(updated_at__lte=serializer.validated_data['up_to'])
+    marked = notifications.update(is_read=True)
+    decrement_unread_count(request.user.id, marked)
+    
+    return Response({
+        'marked_read': marked,
+        'unread_count': get_unread_count(request.user.id)
+    })
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_all_notifications_read(request):
     Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
-    return Response({'message': 'All notifications marked as read'})
+    reset_unread_count(request.user.id)
+    return Response({'message': 'All notifications marked as read', 'unread_count': 0})
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def unread_notifications_count(request):
-    count = Notification.objects.filter(recipient=request.user, is_read=False).count()
+    count = get_unread_count(request.user.id)
     return Response({'unread_count': count})
+
+
+# Seconds between SSE comment lines that keep idle connections open, and the
+# lifetime of one stream before the client is asked to reconnect.
+NOTIFICATION_STREAM_HEARTBEAT = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+NOTIFICATION_STREAM_MAX_AGE = getattr(settings, 'NOTIFICATION_STREAM_MAX_AGE', 300)
+
+
+def _stream_user(request):
+    """
+    Resolve the user from an ``Authorization: Token`` header, or a ``token``
+    query parameter since browsers' EventSource cannot send headers.
+    """
+    header = request.headers.get('Authorization', '')
+    key = header[len('Token '):] if header.startswith('Token ') else request.GET.get('token')
+    if not key:
+        return None
+    return authenticate_key(key)
+
+
+def _event_id(event):
+    # Groups keep their id when they gain actors, so events are positioned by
+    # (updated_at, id) and a resumed stream also replays regrouped ones.
+    return f"{event['updated_at']}/{event['id']}"
+
+
+def _parse_event_id(value):
+    updated_at, _, pk = value.rpartition('/')
+    try:
+        updated_at = parse_datetime(updated_at)
+        pk = int(pk)
+    except ValueError:
+        return None
+    return (updated_at, pk) if updated_at is not None else None
+
+
+def _missed_notifications(user, position):
+    """
+    Return the next batch of notifications updated after ``position``, oldest
+    first, and the position to resume from, or None after the last batch.
+    """
+    notifications = keyset_page(
+        Notification.objects.filter(recipient=user).select_related('actor'),
+        position, reverse=True, limit=NOTIFICATION_STREAM_QUEUE_SIZE, field='updated_at',
+    )
+    if len(notifications) < NOTIFICATION_STREAM_QUEUE_SIZE:
+        position = None
+    else:
+        position = (notifications[-1].updated_at, notifications[-1].pk)
+    return [dict(NotificationListSerializer(n).data) for n in notifications], position
+
+
+def _sse_message(event):
+    return f"id: {_event_id(event)}\nevent: notification\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def notification_stream(request):
+    """
+    Stream new notifications to the current user as Server-Sent Events.
+    
+    Must be served under ASGI. Notifications updated since the event named
+    by the ``Last-Event-ID`` header (or ``last_event_id`` parameter) are
+    replayed first, in keyset batches so none are skipped. A client that
+    falls more than NOTIFICATION_STREAM_QUEUE_SIZE events behind receives a
+    ``reset`` event and should reconnect.
+    """
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    position = _parse_event_id(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id', '')
+    )
+    
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + NOTIFICATION_STREAM_MAX_AGE
+        # Subscribe before replaying so nothing published in between is lost.
+        subscription = hub.subscribe(user.id)
+        try:
+            yield 'retry: 3000\n\n'
+            replayed = set()
+            resume = position
+            while resume is not None:
+                missed, resume = await sync_to_async(_missed_notifications)(user, resume)
+                for event in missed:
+                    replayed.add(_event_id(event))
+                    yield _sse_message(event)
+            
+            while True:
+                if subscription.overflowed:
+                    yield 'event: reset\ndata: {}\n\n'
+                    return
+                timeout = min(NOTIFICATION_STREAM_HEARTBEAT, deadline - loop.time())
+                if timeout <= 0:
+                    return
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield ': heartbeat\n\n'
+                    continue
+                if _event_id(event) in replayed:
+                    replayed.discard(_event_id(event))
+                    continue
+                yield _sse_message(event)
+        finally:
+            hub.unsubscribe(subscription)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,262 @@
+"""
+In-process inverted index with BM25 ranking.
+
+Each term maps to two parallel arrays: the sorted ids of the documents that
+contain it (``array('q')``) and the weighted term frequency in each of them
+(``array('I')``). An index can be written to a snapshot file and memory-mapped
+when a worker starts; postings are then read straight from the mapping and
+only copied into arrays when a term is updated.
+
+django_blog (blog.inverted_index) and social_media_api (posts.inverted_index)
+carry identical copies of this module: the projects are deployed separately
+and share no package, so a change to one copy is made to both.
+"""
+
+import bisect
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+
+TOKEN_RE = re.compile(r'\w+')
+
+SNAPSHOT_MAGIC = b'INVIDX01'
+# Magic followed by the length of the JSON metadata block.
+SNAPSHOT_HEADER = struct.Struct('<8sQ')
+ID_TYPECODE = 'q'
+TF_TYPECODE = 'I'
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+
+def _align(size, boundary=8):
+    return (-size) % boundary
+
+
+class InvertedIndex:
+    """
+    Term -> postings index over documents made of weighted text fields.
+
+    ``field_weights`` maps field names to integer weights: a term in a field
+    of weight 3 counts as three occurrences. All query terms must match;
+    matches are scored with BM25.
+    """
+
+    def __init__(self, field_weights, k1=1.2, b=0.75):
+        self.field_weights = dict(field_weights)
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._doc_lengths = {}
+        self._doc_terms = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self._mmap = None
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._doc_lengths
+
+    def _analyze(self, fields):
+        frequencies = {}
+        length = 0
+        for name, weight in self.field_weights.items():
+            for term in tokenize(fields.get(name)):
+                frequencies[term] = frequencies.get(term, 0) + weight
+                length += weight
+        return frequencies, length
+
+    def _writable_postings(self, term):
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = (array(ID_TYPECODE), array(TF_TYPECODE))
+        elif not isinstance(postings[0], array):
+            # Copy a memory-mapped posting list before changing it.
+            ids, tfs = array(ID_TYPECODE), array(TF_TYPECODE)
+            ids.frombytes(postings[0].cast('B'))
+            tfs.frombytes(postings[1].cast('B'))
+            postings = self._postings[term] = (ids, tfs)
+        return postings
+
+    def add(self, doc_id, fields):
+        """Index a document, replacing any previous version of it."""
+        frequencies, length = self._analyze(fields)
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in frequencies.items():
+                ids, tfs = self._writable_postings(term)
+                i = bisect.bisect_left(ids, doc_id)
+                ids.insert(i, doc_id)
+                tfs.insert(i, tf)
+            self._doc_lengths[doc_id] = length
+            self._doc_terms[doc_id] = tuple(frequencies)
+            self._total_length += length
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        length = self._doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        if doc_id not in self._doc_terms:
+            self._map_loaded_terms()
+        for term in self._doc_terms.pop(doc_id, ()):
+            ids, tfs = self._writable_postings(term)
+            i = bisect.bisect_left(ids, doc_id)
+            del ids[i]
+            del tfs[i]
+            if not ids:
+                del self._postings[term]
+
+    def _map_loaded_terms(self):
+        """
+        Record the terms of documents loaded from a snapshot, which does not
+        store them. Done in one pass over the postings the first time such a
+        document is changed, so that mapping a snapshot stays cheap.
+        """
+        terms = {}
+        for term, (ids, _) in self._postings.items():
+            for doc_id in ids:
+                if doc_id not in self._doc_terms:
+                    terms.setdefault(doc_id, []).append(term)
+        for doc_id, doc_terms in terms.items():
+            self._doc_terms[doc_id] = tuple(doc_terms)
+        for doc_id in self._doc_lengths:
+            # Documents without any terms.
+            self._doc_terms.setdefault(doc_id, ())
+
+    def search(self, query, limit=None):
+        """
+        Return ``(doc_id, score)`` pairs for documents containing every term
+        of ``query``, best first (ties broken by the higher id).
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if any(p is None for p in postings) or not self._doc_lengths:
+                return []
+            doc_count = len(self._doc_lengths)
+            avg_length = self._total_length / doc_count
+            # Walk the rarest term and look the candidates up in the others.
+            postings.sort(key=lambda p: len(p[0]))
+            scores = self._score(postings[0], None, doc_count, avg_length)
+            for other in postings[1:]:
+                scores = self._score(other, scores, doc_count, avg_length)
+                if not scores:
+                    return []
+
+        key = lambda item: (item[1], item[0])
+        if limit is None:
+            return sorted(scores.items(), key=key, reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=key)
+
+    def _score(self, postings, candidates, doc_count, avg_length):
+        ids, tfs = postings
+        df = len(ids)
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        k1, b = self.k1, self.b
+
+        def term_score(i, doc_id):
+            tf = tfs[i]
+            norm = k1 * (1 - b + b * self._doc_lengths[doc_id] / avg_length)
+            return idf * tf * (k1 + 1) / (tf + norm)
+
+        if candidates is None:
+            return {doc_id: term_score(i, doc_id) for i, doc_id in enumerate(ids)}
+        scores = {}
+        for doc_id, score in candidates.items():
+            i = bisect.bisect_left(ids, doc_id)
+            if i < df and ids[i] == doc_id:
+                scores[doc_id] = score + term_score(i, doc_id)
+        return scores
+
+    def save(self, path):
+        """Write a snapshot atomically (to a temporary file, then renamed)."""
+        with self._lock:
+            terms = {}
+            offset = 0
+            blocks = []
+            for term, (ids, tfs) in self._postings.items():
+                data = ids.tobytes() + tfs.tobytes()
+                data += b'\0' * _align(len(data))
+                terms[term] = [offset, len(ids)]
+                blocks.append(data)
+                offset += len(data)
+            metadata = json.dumps({
+                'byteorder': sys.byteorder,
+                'itemsizes': [array(ID_TYPECODE).itemsize, array(TF_TYPECODE).itemsize],
+                'field_weights': self.field_weights,
+                'k1': self.k1,
+                'b': self.b,
+                'doc_lengths': list(self._doc_lengths.items()),
+                'terms': terms,
+            }).encode()
+
+        metadata += b' ' * _align(SNAPSHOT_HEADER.size + len(metadata))
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.index-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(metadata)))
+                f.write(metadata)
+                for data in blocks:
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a snapshot written by ``save``. Raises ValueError if the file is
+        not a snapshot or was written on a platform with a different layout.
+        """
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        if len(view) < SNAPSHOT_HEADER.size:
+            raise ValueError(f'{path} is not an index snapshot')
+        magic, metadata_length = SNAPSHOT_HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f'{path} is not an index snapshot')
+        start = SNAPSHOT_HEADER.size + metadata_length
+        metadata = json.loads(bytes(view[SNAPSHOT_HEADER.size:start]))
+        id_size, tf_size = metadata['itemsizes']
+        if (metadata['byteorder'] != sys.byteorder
+                or id_size != array(ID_TYPECODE).itemsize
+                or tf_size != array(TF_TYPECODE).itemsize):
+            raise ValueError(f'{path} was written on an incompatible platform')
+
+        index = cls(metadata['field_weights'], k1=metadata['k1'], b=metadata['b'])
+        index._mmap = mapping
+        for doc_id, length in metadata['doc_lengths']:
+            index._doc_lengths[doc_id] = length
+            index._total_length += length
+        for term, (offset, count) in metadata['terms'].items():
+            ids_start = start + offset
+            tfs_start = ids_start + count * id_size
+            index._postings[term] = (
+                view[ids_start:tfs_start].cast(ID_TYPECODE),
+                view[tfs_start:tfs_start + count * tf_size].cast(TF_TYPECODE),
+            )
+        return index
@@ -0,0 +1,425 @@
+"""
+Write-behind buffer for likes.
+
+With LIKE_BUFFER enabled, PostViewSet.like records (post, user) pairs in a
+buffer instead of inserting a Like row and bumping the post's counter in the
+request. A worker thread flushes the buffer every LIKE_BUFFER_FLUSH_INTERVAL
+seconds: new likes are written with one bulk_create(ignore_conflicts=True),
+counters are updated once per post and like notifications are sent. Until
+then every post representation (detail, lists and the feed) adds the
+pending likes to the stored count.
+
+Two buffers are available:
+
+* LikeBuffer - in-process. Every change is appended to a per-process journal
+  file in LIKE_BUFFER_JOURNAL_DIR; journals left behind by a crashed process
+  are replayed by ``recover`` (run when a buffer starts and by
+  ``manage.py flush_likes``).
+* RedisLikeBuffer - when LIKE_BUFFER_URL is set. Pending likes live in Redis
+  and are shared by all processes; a flush renames the pending set to a
+  per-flush key and deletes it once written, so ``recover`` can re-flush the
+  keys of a flush that never finished.
+
+Flushing is idempotent: likes already in the table are skipped. A flush
+locks its posts' rows first, so flushes of the same posts from different
+processes run one after the other and each counts only the likes it wrote.
+"""
+
+import atexit
+import glob
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from .models import Like, Post
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Record likes in the write-behind buffer instead of inserting them inline.
+LIKE_BUFFER = getattr(settings, 'LIKE_BUFFER', False)
+
+# Redis URL for a buffer shared by all processes; None keeps it in-process.
+LIKE_BUFFER_URL = getattr(settings, 'LIKE_BUFFER_URL', None)
+
+# Directory for the in-process buffer's journals; None disables journaling.
+LIKE_BUFFER_JOURNAL_DIR = getattr(settings, 'LIKE_BUFFER_JOURNAL_DIR', None)
+
+# Seconds between flushes, and pending likes that trigger an early flush.
+LIKE_BUFFER_FLUSH_INTERVAL = getattr(settings, 'LIKE_BUFFER_FLUSH_INTERVAL', 1.0)
+LIKE_BUFFER_BATCH_SIZE = getattr(settings, 'LIKE_BUFFER_BATCH_SIZE', 1000)
+
+
+def write_likes(pairs):
+    """
+    Insert buffered (post_id, user_id) likes that are not in the table yet,
+    update the posts' counters and notify the authors. Returns the pairs that
+    were written.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return []
+    users = User.objects.in_bulk({user_id for _, user_id in pairs})
+
+    with transaction.atomic():
+        # Locked in pk order, so concurrent flushes cannot deadlock. Likes
+        # written by a flush that held the lock before are seen below.
+        posts = Post.objects.select_related('author').select_for_update(of=('self',)).order_by(
+            'pk'
+        ).in_bulk({post_id for post_id, _ in pairs})
+        # Skip likes of deleted posts or users, and likes already written.
+        pairs = {(p, u) for p, u in pairs if p in posts and u in users}
+        existing = set(Like.objects.filter(
+            post_id__in={p for p, _ in pairs}, user_id__in={u for _, u in pairs}
+        ).values_list('post_id', 'user_id'))
+        new = [pair for pair in pairs if pair not in existing]
+
+        Like.objects.bulk_create(
+            [Like(post_id=post_id, user_id=user_id) for post_id, user_id in new],
+            batch_size=LIKE_BUFFER_BATCH_SIZE, ignore_conflicts=True
+        )
+        for post_id, count in Counter(post_id for post_id, _ in new).items():
+            Post.objects.filter(pk=post_id).update(likes_count=F('likes_count') + count)
+
+        try:
+            from notifications.utils import create_like_notification
+        except ImportError:
+            pass  # Notifications app might not be available yet
+        else:
+            for post_id, user_id in new:
+                create_like_notification(users[user_id], posts[post_id])
+    return new
+
+
+class LikeBuffer:
+    """
+    In-process buffer, optionally journaled for crash recovery.
+    """
+
+    def __init__(self, journal_dir=LIKE_BUFFER_JOURNAL_DIR):
+        self.journal_dir = journal_dir
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._counts = Counter()
+        self._journal = None
+        self._token = None
+        self._token_pid = None
+
+    @property
+    def _journal_token(self):
+        # Journals are per process, so forked workers get a new token.
+        if self._token_pid != os.getpid():
+            self._token = uuid.uuid4().hex[:12]
+            self._token_pid = os.getpid()
+        return self._token
+
+    def _journal_path(self, suffix='journal'):
+        token = self._journal_token
+        return os.path.join(self.journal_dir, f'likes-{os.getpid()}-{token}.{suffix}')
+
+    def _log(self, op, post_id, user_id):
+        if not self.journal_dir:
+            return
+        if self._journal is None or self._journal.name != self._journal_path():
+            self._journal = open(self._journal_path(), 'a')
+        self._journal.write(f'{op} {post_id} {user_id}\n')
+        self._journal.flush()
+
+    def add(self, post_id, user_id):
+        """Buffer a like; returns False if it is already pending."""
+        with self._lock:
+            if (post_id, user_id) in self._pending:
+                return False
+            self._log('+', post_id, user_id)
+            self._pending.add((post_id, user_id))
+            self._counts[post_id] += 1
+            return True
+
+    def discard(self, post_id, user_id):
+        """Drop a pending like; returns False if it was not pending."""
+        with self._lock:
+            if (post_id, user_id) not in self._pending:
+                return False
+            self._log('-', post_id, user_id)
+            self._pending.discard((post_id, user_id))
+            self._counts[post_id] -= 1
+            return True
+
+    def contains(self, post_id, user_id):
+        return (post_id, user_id) in self._pending
+
+    def pending_count(self, post_id):
+        return max(self._counts.get(post_id, 0), 0)
+
+    def pending_likes(self, post_ids, user_id=None):
+        """Map each post id to its (pending count, pending like by ``user_id``)."""
+        return {
+            post_id: (self.pending_count(post_id), (post_id, user_id) in self._pending)
+            for post_id in post_ids
+        }
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Write every pending like. Returns the number of new likes."""
+        with self._lock:
+            batch = self._pending
+            self._pending = set()
+            flushing = None
+            if self._journal is not None:
+                # New changes go to a fresh journal; the old one is kept until
+                # the batch is written.
+                self._journal.close()
+                self._journal = None
+                flushing = self._journal_path(f'{uuid.uuid4().hex}.flushing')
+                os.replace(self._journal_path(), flushing)
+        if not batch:
+            if flushing:
+                # Only likes that were undone before the flush.
+                os.unlink(flushing)
+            return 0
+        try:
+            written = write_likes(batch)
+        except Exception:
+            # Retry with the next flush; the old journal stays for recovery.
+            with self._lock:
+                self._pending |= batch
+            raise
+        with self._lock:
+            # Pending counts cover the batch until it is in the table.
+            self._counts.subtract(Counter(post_id for post_id, _ in batch))
+            self._counts = +self._counts
+        if flushing:
+            os.unlink(flushing)
+        return len(written)
+
+    def recover(self):
+        """
+        Replay journals left behind by earlier processes. Returns the number
+        of likes written.
+        """
+        if not self.journal_dir:
+            return 0
+        written = 0
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, 'likes-*'))):
+            try:
+                pid, token = os.path.basename(path)[len('likes-'):].split('.', 1)[0].split('-')
+                pid = int(pid)
+            except ValueError:
+                continue
+            if token == self._token:
+                continue
+            # A live process other than this one still owns its journal; a
+            # journal with this pid but another token predates a restart.
+            if pid != os.getpid() and _process_alive(pid):
+                continue
+            pending = set()
+            with open(path) as journal:
+                for line in journal:
+                    try:
+                        op, post_id, user_id = line.split()
+                        pair = (int(post_id), int(user_id))
+                    except ValueError:
+                        continue  # A partly written last line.
+                    if op == '+':
+                        pending.add(pair)
+                    else:
+                        pending.discard(pair)
+            written += len(write_likes(pending))
+            os.unlink(path)
+        return written
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RedisLikeBuffer:
+    """
+    Buffer kept in Redis and shared by every process.
+    """
+    pending_key = 'likes:pending'
+    counts_key = 'likes:pending-counts'
+    flushing_prefix = 'likes:flushing:'
+
+    def __init__(self, url):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self._response_error = redis.exceptions.ResponseError
+
+    @staticmethod
+    def _member(post_id, user_id):
+        return f'{post_id}:{user_id}'
+
+    def add(self, post_id, user_id):
+        if not self.redis.sadd(self.pending_key, self._member(post_id, user_id)):
+            return False
+        self.redis.hincrby(self.counts_key, post_id, 1)
+        return True
+
+    def discard(self, post_id, user_id):
+        if not self.redis.srem(self.pending_key, self._member(post_id, user_id)):
+            return False
+        self.redis.hincrby(self.counts_key, post_id, -1)
+        return True
+
+    def contains(self, post_id, user_id):
+        return bool(self.redis.sismember(self.pending_key, self._member(post_id, user_id)))
+
+    def pending_count(self, post_id):
+        return max(int(self.redis.hget(self.counts_key, post_id) or 0), 0)
+
+    def pending_likes(self, post_ids, user_id=None):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        pipe = self.redis.pipeline()
+        pipe.hmget(self.counts_key, post_ids)
+        if user_id is not None:
+            for post_id in post_ids:
+                pipe.sismember(self.pending_key, self._member(post_id, user_id))
+        counts, *liked = pipe.execute()
+        liked = liked or [False] * len(post_ids)
+        return {
+            post_id: (max(int(count or 0), 0), bool(is_liked))
+            for post_id, count, is_liked in zip(post_ids, counts, liked)
+        }
+
+    def __len__(self):
+        return self.redis.scard(self.pending_key)
+
+    def flush(self):
+        key = f'{self.flushing_prefix}{uuid.uuid4().hex}'
+        try:
+            self.redis.rename(self.pending_key, key)
+        except self._response_error:
+            # Nothing pending.
+            return 0
+        return self._flush_key(key)
+
+    def _flush_key(self, key):
+        batch = set()
+        for member in self.redis.smembers(key):
+            post_id, user_id = member.decode().split(':')
+            batch.add((int(post_id), int(user_id)))
+        written = write_likes(batch)
+        pipe = self.redis.pipeline()
+        for post_id, count in Counter(post_id for post_id, _ in batch).items():
+            pipe.hincrby(self.counts_key, post_id, -count)
+        pipe.delete(key)
+        pipe.execute()
+        return len(written)
+
+    def recover(self, min_age=60):
+        """Re-flush batches whose flush started ``min_age`` seconds ago or more."""
+        written = 0
+        for key in self.redis.scan_iter(f'{self.flushing_prefix}*'):
+            idle = self.redis.object('idletime', key) or 0
+            if idle >= min_age:
+                written += self._flush_key(key.decode())
+        return written
+
+
+class LikeFlusher:
+    """
+    Daemon thread that flushes a buffer periodically or once it is full.
+    """
+
+    def __init__(self, buffer, interval=LIKE_BUFFER_FLUSH_INTERVAL, batch_size=LIKE_BUFFER_BATCH_SIZE):
+        self.buffer = buffer
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def notify(self):
+        """Start the worker if needed and wake it early when the buffer is full."""
+        self._ensure_worker()
+        if len(self.buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(); start one per process.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='like-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        close_old_connections()
+        try:
+            self.buffer.recover()
+        except Exception:
+            logger.exception('Failed to recover buffered likes')
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                close_old_connections()
+                self.buffer.flush()
+            except Exception:
+                logger.exception('Failed to flush buffered likes')
+
+
+def _create_buffer():
+    if LIKE_BUFFER_URL:
+        return RedisLikeBuffer(LIKE_BUFFER_URL)
+    return LikeBuffer()
+
+
+buffer = _create_buffer()
+flusher = LikeFlusher(buffer)
+
+
+def _flush_at_exit():
+    if not LIKE_BUFFER:
+        return
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception('Failed to flush buffered likes at exit')
+
+
+atexit.register(_flush_at_exit)
+
+
+def add_pending_likes(posts, user=None):
+    """
+    Set ``pending_likes`` on each post to its buffered like count and whether
+    ``user`` has a buffered like on it, in one buffer lookup.
+    """
+    posts = [post for post in posts if not hasattr(post, 'pending_likes')]
+    if not posts:
+        return
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    pending = buffer.pending_likes([post.pk for post in posts], user_id)
+    for post in posts:
+        post.pending_likes = pending[post.pk]
+
+
+def buffer_like(post_id, user_id):
+    """Record a like for write-behind; returns False if it is already pending."""
+    added = buffer.add(post_id, user_id)
+    if added:
+        flusher.notify()
+    return added
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.urls import reverse
+from accounts.authentication import issue_token
+from notifications import dispatcher
+from posts.models import Post
+from social_media_api.benchmark import BenchmarkCommand, Scenario
+from social_media_api.seed import generate
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Benchmark the feed, posts, post creation, likes, follows and notifications '
+        'against seeded data and compare the results with stored baselines'
+    )
+    sizes = {
+        'small': {'users': 200},
+        'medium': {'users': 2000},
+        'large': {'users': 20000},
+    }
+
+    def seed(self, **options):
+        generate(prefix='bench', seed=0, **options)
+
+    def handle(self, *args, **options):
+        # Write notifications in the request, so their cost is measured and
+        # no worker thread writes to the database between measurements.
+        asynchronous = dispatcher.NOTIFICATIONS_ASYNC
+        dispatcher.NOTIFICATIONS_ASYNC = False
+        try:
+            super().handle(*args, **options)
+        finally:
+            dispatcher.NOTIFICATIONS_ASYNC = asynchronous
+
+    def get_scenarios(self):
+        # The account following the most others has the busiest feed, and
+        # the most followed one the most notifications.
+        reader = User.objects.order_by('-following_count', 'id').first()
+        celebrity = User.objects.order_by('-followers_count', 'id').first()
+        as_reader = {'HTTP_AUTHORIZATION': f'Token {issue_token(reader)}'}
+        as_celebrity = {'HTTP_AUTHORIZATION': f'Token {issue_token(celebrity)}'}
+
+        popular = Post.objects.order_by('-likes_count', 'id').first()
+        unliked = Post.objects.exclude(likes__user=reader).order_by('-likes_count', 'id').first()
+        stranger = User.objects.exclude(
+            Q(pk=reader.pk) | Q(followers=reader)
+        ).order_by('-followers_count', 'id').first()
+        word = popular.title.split()[0].lower()
+        new_post = {'title': 'Benchmark post', 'content': 'Body', 'author_id': celebrity.pk}
+
+        return [
+            Scenario('feed', reverse('feed'), headers=as_reader),
+            Scenario('feed-cursor', reverse('feed') + '?pagination=cursor', headers=as_reader),
+            Scenario('post-list', reverse('post-list'), headers=as_reader),
+            Scenario('post-search', reverse('post-list'), data={'search': word}, headers=as_reader),
+            Scenario('post-detail', reverse('post-detail', args=[popular.pk]), headers=as_reader),
+            # Fans out to the most followers.
+            Scenario(
+                'post-create', reverse('post-list'), method='post', data=new_post,
+                headers=as_celebrity, status=201,
+                reset=lambda client: Post.objects.filter(author=celebrity, title=new_post['title']).delete(),
+            ),
+            Scenario(
+                'like', reverse('post-like', args=[unliked.pk]), method='post', headers=as_reader,
+                status=201,
+                reset=lambda client: client.post(reverse('post-unlike', args=[unliked.pk]), **as_reader),
+            ),
+            Scenario(
+                'follow', reverse('accounts:follow-user', args=[stranger.pk]), method='post',
+                headers=as_reader,
+                reset=lambda client: client.post(
+                    reverse('accounts:unfollow-user', args=[stranger.pk]), **as_reader
+                ),
+            ),
+            Scenario('notification-list', reverse('notifications:notification-list'), headers=as_celebrity),
+            Scenario('unread-count', reverse('notifications:unread-count'), headers=as_celebrity),
+        ]
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from posts import likes
+
+
+class Command(BaseCommand):
+    help = 'Write buffered likes, including those left behind by crashed workers'
+
+    def handle(self, *args, **options):
+        recovered = likes.buffer.recover()
+        flushed = likes.buffer.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recovered {recovered} and flushed {flushed} likes'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from posts.timeline import rebuild_timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized home timelines from the follow graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Only rebuild the timeline of this user (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        rebuilt = 0
+        entries = 0
+        for user in users.iterator():
+            entries += rebuild_timeline(user)
+            rebuilt += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {rebuilt} timelines ({entries} entries)')
+        )
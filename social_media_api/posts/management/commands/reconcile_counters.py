@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from posts.models import Post, Like, Comment
+
+User = get_user_model()
+Follow = User.followers.through
+
+
+def count_of(model, field):
+    """Correlated COUNT(*) of ``model`` rows whose ``field`` points at the outer row."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(n=Count('*')).values('n')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in the denormalized like, comment and follower counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted rows without updating them',
+        )
+
+    def handle(self, *args, **options):
+        counters = [
+            (Post, {'likes_count': count_of(Like, 'post'),
+                    'comments_count': count_of(Comment, 'post')}),
+            (User, {'followers_count': count_of(Follow, f'from_{User._meta.model_name}'),
+                    'following_count': count_of(Follow, f'to_{User._meta.model_name}')}),
+        ]
+
+        for model, expressions in counters:
+            drift = Q()
+            for field in expressions:
+                drift |= ~Q(**{field: F(f'actual_{field}')})
+            drifted = model.objects.annotate(
+                **{f'actual_{field}': expression for field, expression in expressions.items()}
+            ).filter(drift).values('pk')
+
+            with transaction.atomic():
+                if options['dry_run']:
+                    repaired = drifted.count()
+                else:
+                    repaired = model.objects.filter(pk__in=drifted).update(**expressions)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {repaired} rows '
+                f'{"drifted" if options["dry_run"] else "repaired"}'
+            ))
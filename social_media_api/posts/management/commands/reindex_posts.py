@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.models import Post
+from posts.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of posts indexed per statement batch',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        batch_size = options['batch_size']
+        posts = Post.objects.only('id', 'title', 'content').order_by('id')
+
+        indexed = 0
+        with transaction.atomic():
+            backend.clear()
+            batch = []
+            for post in posts.iterator(chunk_size=batch_size):
+                batch.append(post)
+                if len(batch) >= batch_size:
+                    backend.index(batch)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                backend.index(batch)
+                indexed += len(batch)
+        backend.save()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} posts with {backend.__class__.__name__}'
+        ))
@@ -0,0 +1,84 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from social_media_api.seed import SEED_PASSWORD, generate
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic data set for load tests and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Accounts to create')
+        parser.add_argument(
+            '--following', type=float, default=20,
+            help='Mean number of accounts each account follows',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.0,
+            help='Power-law exponent of follower popularity (higher is more skewed)',
+        )
+        parser.add_argument('--posts', type=float, default=5, help='Mean posts per account')
+        parser.add_argument('--comments', type=float, default=2, help='Mean comments per post')
+        parser.add_argument('--likes', type=float, default=5, help='Mean likes per post')
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help='Spread posts over this many days before now',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows written per INSERT',
+        )
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Username prefix; accounts are named <prefix><n>',
+        )
+        parser.add_argument(
+            '--no-notifications', action='store_false', dest='notifications',
+            help='Do not create notifications',
+        )
+        parser.add_argument(
+            '--no-timelines', action='store_false', dest='timelines',
+            help='Do not rebuild home timelines (run rebuild_timelines later)',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--users and --batch-size must be positive')
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f"Users named {options['prefix']}* already exist; pass another --prefix"
+            )
+
+        verbosity = options['verbosity']
+        started = time.monotonic()
+
+        def log(message):
+            if verbosity >= 2:
+                self.stdout.write(f'{message} ({time.monotonic() - started:.1f}s)')
+
+        counts = generate(
+            users=options['users'],
+            following=options['following'],
+            exponent=options['exponent'],
+            posts=options['posts'],
+            comments=options['comments'],
+            likes=options['likes'],
+            notifications=options['notifications'],
+            timelines=options['timelines'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            log=log,
+        )
+
+        elapsed = time.monotonic() - started
+        rows = sum(counts.values())
+        summary = ', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {summary} in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s). '
+            f'Every account\'s password is "{SEED_PASSWORD}".'
+        ))
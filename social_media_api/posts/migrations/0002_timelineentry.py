@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_timelines(apps, schema_editor):
+    """
+    Fill every user's timeline the way posts.timeline.rebuild_timeline does,
+    writing the entries of TIMELINE_FANOUT_BATCH_SIZE users at a time.
+    """
+    from posts.timeline import (
+        TIMELINE_FANOUT_BATCH_SIZE, TIMELINE_FANOUT_MAX_FOLLOWERS, TIMELINE_MAX_LENGTH,
+    )
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+
+    def write(entries):
+        TimelineEntry.objects.bulk_create(
+            entries, batch_size=TIMELINE_FANOUT_BATCH_SIZE, ignore_conflicts=True
+        )
+
+    entries = []
+    users = User.objects.order_by('pk').iterator(chunk_size=TIMELINE_FANOUT_BATCH_SIZE)
+    for count, user in enumerate(users, 1):
+        posts = Post.objects.filter(
+            author__in=user.following.filter(followers_count__lte=TIMELINE_FANOUT_MAX_FOLLOWERS)
+        ).order_by('-created_at').values_list('id', 'created_at')[:TIMELINE_MAX_LENGTH]
+        entries += [
+            TimelineEntry(user_id=user.pk, post_id=post_id, created_at=created_at)
+            for post_id, created_at in posts
+        ]
+        if count % TIMELINE_FANOUT_BATCH_SIZE == 0:
+            write(entries)
+            entries = []
+    write(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0002_user_counters'),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='posts_timeline_user_created')],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
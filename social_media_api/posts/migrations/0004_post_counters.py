@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    Comment = apps.get_model('posts', 'Comment')
+
+    def count_of(model):
+        return Coalesce(Subquery(
+            model.objects.filter(post=OuterRef('pk')).order_by()
+            .values('post').annotate(n=Count('*')).values('n')
+        ), 0)
+
+    Post.objects.update(likes_count=count_of(Like), comments_count=count_of(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_author_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
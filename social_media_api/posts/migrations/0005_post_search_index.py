@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == 'postgresql':
+        # Same configuration as PostgresSearchBackend, so the backfilled
+        # documents match the queries run against them.
+        config = getattr(settings, 'POST_SEARCH_CONFIG', 'english')
+        schema_editor.execute(
+            'CREATE TABLE posts_post_search ('
+            'post_id bigint PRIMARY KEY REFERENCES posts_post (id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX posts_post_search_document ON posts_post_search USING GIN (document)'
+        )
+        schema_editor.execute(
+            "INSERT INTO posts_post_search (post_id, document) SELECT id, "
+            "setweight(to_tsvector(%s::regconfig, title), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, content), 'B') FROM posts_post",
+            params=[config, config]
+        )
+    elif connection.vendor == 'sqlite':
+        Post = apps.get_model('posts', 'Post')
+        posts = Post.objects.using(connection.alias).values_list('id', 'title', 'content')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+                "title, content, tokenize='porter unicode61')"
+            )
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, title, content) VALUES (%s, %s, %s)',
+                list(posts.iterator())
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_search')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -4,26 +4,40 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def with_is_liked(self, user):
+        """
+        Annotate each post with ``user_has_liked`` so serializers can render
+        ``is_liked`` without a query per post.
+        """
+        if not user.is_authenticated:
+            return self.annotate(user_has_liked=models.Value(False))
+        return self.annotate(user_has_liked=models.Exists(
+            Like.objects.filter(post=models.OuterRef('pk'), user=user)
+        ))
+
+
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=200)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in step with ``likes``/``comments`` by the
+    # views and repaired by ``manage.py reconcile_counters``.
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    
+    objects = PostQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['author', '-created_at'], name='posts_post_author_created'),
+        ]
     
     def __str__(self):
         return f"{self.title} by {self.author.username}"
-    
-    @property
-    def likes_count(self):
-        return self.likes.count()
-    
-    @property
-    def comments_count(self):
-        return self.comments.count()
 
 
 class Comment(models.Model):
@@ -50,3 +64,26 @@ class Like(models.Model):
     
     def __str__(self):
         return f"{self.user.username} likes {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """
+    A post materialized into a follower's home timeline (fan-out on write).
+
+    Rows are written when a post is created and trimmed to
+    TIMELINE_MAX_LENGTH per user, so feed reads never join the follow graph.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['user', 'post']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='posts_timeline_user_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.post.title} in {self.user.username}'s timeline"
+
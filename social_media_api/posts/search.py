@@ -0,0 +1,283 @@
+"""
+Full-text search over posts.
+
+A search backend keeps a text index of every post's title and content and
+turns a search string into a filtered, ranked Post queryset:
+
+* PostgresSearchBackend - weighted tsvector documents in ``posts_post_search``
+  with a GIN index, ranked by ts_rank.
+* SQLiteSearchBackend - an FTS5 virtual table ``posts_post_fts``, ranked by bm25
+  (used in development and tests).
+* InMemorySearchBackend - a pure-Python inverted index held by each process
+  (posts.inverted_index), for databases without full-text search.
+* DatabaseSearchBackend - plain icontains filtering for any other database.
+
+The index tables are created by migration 0005_post_search_index and kept in
+step by the post_save/post_delete receivers in posts.signals.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.db.models import Case, FloatField, Q, Value, When
+from .inverted_index import InvertedIndex
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# 'auto' picks a backend for the configured database; 'memory' uses the
+# in-process inverted index and 'database' forces the icontains fallback.
+POST_SEARCH_BACKEND = getattr(settings, 'POST_SEARCH_BACKEND', 'auto')
+
+# Text search configuration used for stemming on PostgreSQL.
+POST_SEARCH_CONFIG = getattr(settings, 'POST_SEARCH_CONFIG', 'english')
+
+# Snapshot file for the in-memory index; workers map it on startup instead of
+# rebuilding the index from the database. None disables snapshots.
+POST_SEARCH_INDEX_PATH = getattr(settings, 'POST_SEARCH_INDEX_PATH', None)
+
+# Seconds before a worker reloads its in-memory index, picking up posts
+# written by other processes. 0 keeps the index for the life of the process.
+POST_SEARCH_INDEX_MAX_AGE = getattr(settings, 'POST_SEARCH_INDEX_MAX_AGE', 300)
+
+# Maximum number of matches returned by the in-memory index.
+POST_SEARCH_MAX_RESULTS = getattr(settings, 'POST_SEARCH_MAX_RESULTS', 1000)
+
+# Integer field weights for the in-memory index.
+POST_SEARCH_FIELD_WEIGHTS = {'title': 3, 'content': 1}
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+
+class DatabaseSearchBackend:
+    """
+    Substring search without an index. Results keep the queryset's ordering.
+    """
+
+    def index(self, posts):
+        pass
+
+    def remove(self, post_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def save(self):
+        pass
+
+    def search(self, queryset, query, highlight=False):
+        return queryset.filter(Q(title__icontains=query) | Q(content__icontains=query))
+
+
+class SQLiteSearchBackend(DatabaseSearchBackend):
+    """
+    SQLite FTS5 index; the virtual table's rowid is the post id.
+    """
+    table = 'posts_post_fts'
+
+    def index(self, posts):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)',
+                [(post.pk, post.title, post.content) for post in posts]
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in post_ids]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def match_expression(self, query):
+        # Quote every term so user input cannot use FTS5 query syntax.
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def search(self, queryset, query, highlight=False):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+
+        post_table = Post._meta.db_table
+        # bm25() is lower for better matches; title hits weigh 10x content hits.
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({self.table}, 10.0, 1.0) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = {post_table}.id', [match]
+        ))
+        if highlight:
+            queryset = queryset.annotate(search_snippet=RawSQL(
+                f"SELECT snippet({self.table}, -1, %s, %s, '…', 16) FROM {self.table} "
+                f'WHERE {self.table} MATCH %s AND rowid = {post_table}.id',
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, match]
+            ))
+        return queryset.order_by('-search_rank', '-created_at')
+
+
+class PostgresSearchBackend(DatabaseSearchBackend):
+    """
+    PostgreSQL tsvector index with title weighted above content.
+    """
+    table = 'posts_post_search'
+
+    def index(self, posts):
+        config = POST_SEARCH_CONFIG
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (post_id, document) VALUES ('
+                '%s, setweight(to_tsvector(%s::regconfig, %s), \'A\') || '
+                'setweight(to_tsvector(%s::regconfig, %s), \'B\')) '
+                'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+                [(post.pk, config, post.title, config, post.content) for post in posts]
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE post_id = ANY(%s)', [list(post_ids)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    def search(self, queryset, query, highlight=False):
+        config = POST_SEARCH_CONFIG
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        post_table = Post._meta.db_table
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT post_id FROM {self.table} WHERE document @@ {tsquery}', [config, query]
+        )).annotate(search_rank=RawSQL(
+            f'SELECT ts_rank(document, {tsquery}) FROM {self.table} '
+            f'WHERE post_id = {post_table}.id', [config, query]
+        ))
+        if highlight:
+            queryset = queryset.annotate(search_snippet=RawSQL(
+                f'ts_headline(%s::regconfig, {post_table}.content, {tsquery}, %s)',
+                [config, config, query,
+                 f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=1']
+            ))
+        return queryset.order_by('-search_rank', '-created_at')
+
+
+class InMemorySearchBackend(DatabaseSearchBackend):
+    """
+    BM25 search over an inverted index held in process memory.
+    
+    The index is loaded from the snapshot at ``path`` when it is fresh enough,
+    otherwise rebuilt from the database (and the snapshot rewritten). Saves and
+    deletes in this process update it immediately; changes made by other
+    processes are picked up when it is reloaded after ``max_age`` seconds.
+    Results are always filtered through the database, so deleted posts never
+    appear. Highlighting is not supported.
+    """
+
+    def __init__(self, path=POST_SEARCH_INDEX_PATH, max_age=POST_SEARCH_INDEX_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._index = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def get_index(self):
+        with self._lock:
+            expired = (
+                self.max_age and self._loaded_at is not None
+                and time.monotonic() - self._loaded_at > self.max_age
+            )
+            if self._index is None or expired:
+                self._index = self._load()
+                self._loaded_at = time.monotonic()
+            return self._index
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            age = time.time() - os.path.getmtime(self.path)
+            if not self.max_age or age < self.max_age:
+                try:
+                    return InvertedIndex.load(self.path)
+                except (OSError, ValueError):
+                    logger.warning('Ignoring unreadable search snapshot %s', self.path, exc_info=True)
+        index = self.build()
+        if self.path:
+            index.save(self.path)
+        return index
+
+    def build(self):
+        index = InvertedIndex(POST_SEARCH_FIELD_WEIGHTS)
+        posts = Post.objects.values_list('id', 'title', 'content').order_by('id')
+        for pk, title, content in posts.iterator(chunk_size=2000):
+            index.add(pk, {'title': title, 'content': content})
+        return index
+
+    def index(self, posts):
+        index = self._index
+        if index is None:
+            # Not loaded yet: the first search builds it from the database.
+            return
+        for post in posts:
+            index.add(post.pk, {'title': post.title, 'content': post.content})
+
+    def remove(self, post_ids):
+        index = self._index
+        if index is None:
+            return
+        for pk in post_ids:
+            index.remove(pk)
+
+    def clear(self):
+        with self._lock:
+            self._index = InvertedIndex(POST_SEARCH_FIELD_WEIGHTS)
+            self._loaded_at = time.monotonic()
+
+    def save(self):
+        if self.path:
+            self.get_index().save(self.path)
+
+    def search(self, queryset, query, highlight=False):
+        matches = self.get_index().search(query, limit=POST_SEARCH_MAX_RESULTS)
+        if not matches:
+            return queryset.none()
+        rank = Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in matches],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=[pk for pk, _ in matches]).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-created_at')
+
+
+_backend = None
+
+
+def get_search_backend():
+    """Return the search backend for the default database, created once per process."""
+    global _backend
+    if _backend is None:
+        tables = connection.introspection.table_names()
+        if POST_SEARCH_BACKEND == 'database':
+            _backend = DatabaseSearchBackend()
+        elif POST_SEARCH_BACKEND == 'memory':
+            _backend = InMemorySearchBackend()
+        elif connection.vendor == 'postgresql' and PostgresSearchBackend.table in tables:
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and SQLiteSearchBackend.table in tables:
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = DatabaseSearchBackend()
+    return _backend
+
+
+def search_posts(queryset, query, highlight=False):
+    """Filter ``queryset`` to posts matching ``query``, best matches first."""
+    return get_search_backend().search(queryset, query, highlight=highlight)
@@ -1,9 +1,16 @@
+from django.db import models
+from django.urls import reverse
 from rest_framework import serializers
+from . import likes
 from .models import Post, Comment, Like
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Maximum number of comments embedded in a post detail response; the rest are
+# available from the post's comments endpoint.
+COMMENTS_PREVIEW_LIMIT = 10
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -25,10 +32,53 @@ class CommentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PostSerializer(serializers.ModelSerializer):
+class SearchSnippetMixin:
+    """
+    Adds ``search_snippet`` to posts returned by a highlighted search.
+    """
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if getattr(instance, 'search_snippet', None) is not None:
+            data['search_snippet'] = instance.search_snippet
+        return data
+
+
+class PendingLikesListSerializer(serializers.ListSerializer):
+    """
+    Looks up the buffered likes of a whole page at once.
+    """
+    
+    def to_representation(self, data):
+        if likes.LIKE_BUFFER:
+            data = list(data.all() if isinstance(data, models.Manager) else data)
+            request = self.context.get('request')
+            likes.add_pending_likes(data, request.user if request else None)
+        return super().to_representation(data)
+
+
+class PendingLikesMixin:
+    """
+    Includes likes still waiting in the write-behind buffer in
+    ``likes_count`` and ``is_liked``.
+    """
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if likes.LIKE_BUFFER:
+            request = self.context.get('request')
+            likes.add_pending_likes([instance], request.user if request else None)
+            count, liked = instance.pending_likes
+            data['likes_count'] += count
+            data['is_liked'] = data['is_liked'] or liked
+        return data
+
+
+class PostSerializer(PendingLikesMixin, SearchSnippetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     author_id = serializers.IntegerField(write_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    comments_url = serializers.SerializerMethodField()
     likes_count = serializers.ReadOnlyField()
     comments_count = serializers.ReadOnlyField()
     is_liked = serializers.SerializerMethodField()
@@ -36,10 +86,30 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ['id', 'title', 'content', 'author', 'author_id', 'created_at', 
-                 'updated_at', 'comments', 'likes_count', 'comments_count', 'is_liked']
+                 'updated_at', 'comments', 'comments_url', 'likes_count', 
+                 'comments_count', 'is_liked']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = PendingLikesListSerializer
+    
+    def get_comments(self, obj):
+        """
+        Embed at most COMMENTS_PREVIEW_LIMIT comments. Uses the comments
+        prefetched by PostViewSet when available.
+        """
+        if hasattr(obj, 'preview_comments'):
+            comments = obj.preview_comments
+        else:
+            comments = obj.comments.select_related('author')[:COMMENTS_PREVIEW_LIMIT]
+        return CommentSerializer(comments, many=True, context=self.context).data
+    
+    def get_comments_url(self, obj):
+        url = reverse('post-comments', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
     
     def get_is_liked(self, obj):
+        if hasattr(obj, 'user_has_liked'):
+            return obj.user_has_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
@@ -50,7 +120,7 @@ class PostSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class PostListSerializer(PendingLikesMixin, SearchSnippetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     likes_count = serializers.ReadOnlyField()
     comments_count = serializers.ReadOnlyField()
@@ -60,8 +130,11 @@ class PostListSerializer(serializers.ModelSerializer):
         model = Post
         fields = ['id', 'title', 'content', 'author', 'created_at', 
                  'likes_count', 'comments_count', 'is_liked']
+        list_serializer_class = PendingLikesListSerializer
     
     def get_is_liked(self, obj):
+        if hasattr(obj, 'user_has_liked'):
+            return obj.user_has_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
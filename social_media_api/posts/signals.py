@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Post
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Keep the full-text index in step with saved posts."""
+    get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
@@ -1,3 +1,693 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from notifications.models import Notification
+from accounts.authentication import issue_token
+from social_media_api import benchmark, seed
+from . import likes, search, timeline
+from .inverted_index import InvertedIndex
+from .models import Post, Comment, Like, TimelineEntry
 
-# Create your tests here.
+User = get_user_model()
+
+
+class TimelineTestCase(APITestCase):
+    """
+    Test the fan-out-on-write home timeline behind FeedView.
+    """
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(reverse('accounts:follow-user', args=[self.author.id]))
+        self.author.refresh_from_db()
+    
+    def create_post(self, title='Post'):
+        self.client.force_authenticate(user=self.author)
+        response = self.client.post(reverse('post-list'), {
+            'title': title, 'content': 'Body', 'author_id': self.author.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Post.objects.get(id=response.data['id'])
+    
+    def test_create_post_fans_out_to_followers(self):
+        post = self.create_post()
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(reverse('feed'))
+        self.assertEqual([p['id'] for p in response.data['results']], [post.id])
+    
+    def test_timeline_is_trimmed(self):
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        with mock.patch.object(timeline, 'TIMELINE_MAX_LENGTH', 2), \
+                mock.patch.object(timeline, 'TIMELINE_TRIM_SLACK', 1):
+            posts = [self.create_post(f'Post {i}') for i in range(3)]
+            # Within the slack nothing is trimmed.
+            self.assertEqual(entries.count(), 3)
+            posts.append(self.create_post('Post 3'))
+        self.assertEqual(
+            sorted(entries.values_list('post_id', flat=True)),
+            sorted(p.id for p in posts[2:])
+        )
+    
+    def test_popular_author_is_merged_at_read_time(self):
+        with mock.patch.object(timeline, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 0):
+            post = self.create_post()
+            self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+            
+            self.client.force_authenticate(user=self.reader)
+            response = self.client.get(reverse('feed'))
+        self.assertEqual([p['id'] for p in response.data['results']], [post.id])
+    
+    def test_merged_feed_pages(self):
+        fanned_out = [self.create_post(f'Fanned out {i}') for i in range(12)]
+        with mock.patch.object(timeline, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 0):
+            merged = [self.create_post(f'Merged {i}') for i in range(12)]
+            newest_first = [p.id for p in reversed(fanned_out + merged)]
+            
+            self.client.force_authenticate(user=self.reader)
+            response = self.client.get(reverse('feed'), {'page': 2})
+            # Posts in the timeline are not counted twice.
+            self.assertEqual(response.data['count'], 24)
+            self.assertEqual([p['id'] for p in response.data['results']], newest_first[10:20])
+            
+            response = self.client.get(reverse('feed'), {'pagination': 'cursor'})
+            seen = [p['id'] for p in response.data['results']]
+            while response.data['next']:
+                response = self.client.get(response.data['next'])
+                seen += [p['id'] for p in response.data['results']]
+            self.assertEqual(seen, newest_first)
+            
+            response = self.client.get(response.data['previous'])
+            self.assertEqual([p['id'] for p in response.data['results']], newest_first[10:20])
+    
+    def test_follow_and_unfollow_update_timeline(self):
+        post = self.create_post()
+        other = User.objects.create_user(username='other', password='testpass123')
+        
+        self.client.force_authenticate(user=other)
+        self.client.post(reverse('accounts:follow-user', args=[self.author.id]))
+        self.assertTrue(TimelineEntry.objects.filter(user=other, post=post).exists())
+        
+        self.client.post(reverse('accounts:unfollow-user', args=[self.author.id]))
+        self.assertFalse(TimelineEntry.objects.filter(user=other).exists())
+    
+    def test_rebuild_timeline(self):
+        post = self.create_post()
+        TimelineEntry.objects.all().delete()
+        
+        self.assertEqual(timeline.rebuild_timeline(self.reader), 1)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+
+
+class KeysetPaginationTestCase(APITestCase):
+    """
+    Test cursor pagination on UserPostsView.
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='testpass123')
+        self.posts = [
+            Post.objects.create(author=self.user, title=f'Post {i}', content='Body')
+            for i in range(25)
+        ]
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('user-posts', args=[self.user.id])
+    
+    def test_walk_pages_forward_and_back(self):
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        seen = [p['id'] for p in response.data['results']]
+        
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [p['id'] for p in response.data['results']]
+        self.assertEqual(seen, [p.id for p in reversed(self.posts)])
+        
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(
+            [p['id'] for p in response.data['results']],
+            [p.id for p in reversed(self.posts[5:15])]
+        )
+    
+    def test_tampered_cursor_is_rejected(self):
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        cursor = response.data['next'].split('cursor=')[1]
+        response = self.client.get(self.url, {'cursor': cursor[:-2] + 'xx'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 25)
+
+
+class CounterTestCase(APITestCase):
+    """
+    Test the denormalized like, comment and follower counters.
+    """
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Post', content='Body')
+        self.client.force_authenticate(user=self.reader)
+    
+    def test_like_and_unlike_update_likes_count(self):
+        self.client.post(reverse('post-like', args=[self.post.id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        
+        self.client.post(reverse('post-unlike', args=[self.post.id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+    
+    def test_comment_create_and_delete_update_comments_count(self):
+        response = self.client.post(
+            reverse('post-comments', args=[self.post.id]),
+            {'content': 'Nice', 'author_id': self.reader.id}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        
+        self.client.delete(reverse('post-comment-detail', args=[self.post.id, response.data['id']]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+    
+    def test_follow_and_unfollow_update_user_counts(self):
+        self.client.post(reverse('accounts:follow-user', args=[self.author.id]))
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual((self.author.followers_count, self.reader.following_count), (1, 1))
+        
+        self.client.post(reverse('accounts:unfollow-user', args=[self.author.id]))
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual((self.author.followers_count, self.reader.following_count), (0, 0))
+    
+    def test_reconcile_counters_repairs_drift(self):
+        Like.objects.create(post=self.post, user=self.reader)
+        Comment.objects.create(post=self.post, author=self.reader, content='Hi')
+        self.reader.following.add(self.author)
+        
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 1))
+        self.assertEqual((self.author.followers_count, self.reader.following_count), (1, 1))
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Test that list endpoints run a constant number of queries per page.
+    """
+    
+    # The followed popular authors, the timeline's count and page, and the
+    # page's posts.
+    FEED_QUERY_BUDGET = 4
+    # COUNT(*) for the page number paginator plus the page itself.
+    USER_POSTS_QUERY_BUDGET = 2
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(reverse('accounts:follow-user', args=[self.author.id]))
+    
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(author=self.author, title=f'Post {i}', content='Body')
+            timeline.fan_out_post(post)
+            Like.objects.create(post=post, user=self.reader)
+    
+    def test_feed_query_count_is_constant(self):
+        self.create_posts(1)
+        with self.assertNumQueries(self.FEED_QUERY_BUDGET):
+            self.client.get(reverse('feed'))
+        
+        self.create_posts(9)
+        with self.assertNumQueries(self.FEED_QUERY_BUDGET):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertTrue(all(p['is_liked'] for p in response.data['results']))
+    
+    def test_post_detail_embeds_bounded_comments(self):
+        post = Post.objects.create(author=self.author, title='Popular', content='Body')
+        for i in range(30):
+            commenter = User.objects.create_user(username=f'commenter{i}', password='testpass123')
+            Comment.objects.create(post=post, author=commenter, content=f'Comment {i}')
+        
+        # Post with author and is_liked, then the prefetched comments with authors.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('post-detail', args=[post.id]))
+        self.assertEqual(len(response.data['comments']), 10)
+        self.assertEqual(response.data['comments'][0]['content'], 'Comment 0')
+        self.assertTrue(response.data['comments_url'].endswith(f'/api/posts/{post.id}/comments/'))
+    
+    def test_user_posts_query_count_is_constant(self):
+        self.create_posts(10)
+        with self.assertNumQueries(self.USER_POSTS_QUERY_BUDGET):
+            response = self.client.get(reverse('user-posts', args=[self.author.id]))
+        self.assertTrue(all(p['is_liked'] for p in response.data['results']))
+
+
+class PostSearchTestCase(APITestCase):
+    """
+    Test full-text search over posts.
+    """
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.title_match = Post.objects.create(
+            author=self.user, title='Django performance', content='Notes on caching.'
+        )
+        self.content_match = Post.objects.create(
+            author=self.user, title='Weekend', content='Read a book about Django and gardening.'
+        )
+        self.other = Post.objects.create(author=self.user, title='Lunch', content='Soup again.')
+    
+    def search(self, query, **params):
+        response = self.client.get(reverse('post-list'), {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+    
+    def test_search_ranks_title_matches_first(self):
+        results = self.search('django')
+        self.assertEqual([p['id'] for p in results], [self.title_match.id, self.content_match.id])
+    
+    def test_search_ignores_query_syntax(self):
+        self.assertEqual(self.search('"django" OR (lunch'), [])
+        self.assertEqual(self.search('***'), [])
+    
+    def test_highlight_returns_snippet(self):
+        results = self.search('gardening', highlight='true')
+        self.assertEqual(len(results), 1)
+        self.assertIn('<mark>gardening</mark>', results[0]['search_snippet'])
+        self.assertNotIn('search_snippet', self.search('gardening')[0])
+    
+    def test_index_follows_updates_and_deletes(self):
+        self.other.content = 'Soup with django croutons.'
+        self.other.save()
+        self.assertIn(self.other.id, [p['id'] for p in self.search('croutons')])
+        
+        self.other.delete()
+        self.assertEqual(self.search('croutons'), [])
+    
+    def test_reindex_command(self):
+        search.get_search_backend().clear()
+        self.assertEqual(self.search('django'), [])
+        
+        out = StringIO()
+        call_command('reindex_posts', '--batch-size', '2', stdout=out)
+        self.assertIn('Indexed 3 posts', out.getvalue())
+        self.assertEqual(len(self.search('django')), 2)
+
+
+class InvertedIndexTestCase(APITestCase):
+    """
+    Test the in-process inverted index and its search backend.
+    """
+    
+    def setUp(self):
+        self.index = InvertedIndex({'title': 3, 'content': 1})
+        self.index.add(1, {'title': 'Django tips', 'content': 'Caching querysets.'})
+        self.index.add(2, {'title': 'Gardening', 'content': 'Django, tomatoes and more tomatoes.'})
+        self.index.add(3, {'title': 'Lunch', 'content': 'Tomato soup.'})
+    
+    def test_bm25_ranking_requires_all_terms(self):
+        self.assertEqual([doc for doc, _ in self.index.search('django')], [1, 2])
+        self.assertEqual([doc for doc, _ in self.index.search('DJANGO tomatoes')], [2])
+        self.assertEqual(self.index.search('django soup'), [])
+        self.assertEqual(self.index.search('!!!'), [])
+    
+    def test_update_and_remove(self):
+        self.index.add(3, {'title': 'Django lunch', 'content': ''})
+        self.assertEqual(len(self.index.search('django')), 3)
+        self.assertEqual(self.index.search('soup'), [])
+        
+        self.index.remove(1)
+        self.assertEqual([doc for doc, _ in self.index.search('django')], [3, 2])
+        self.assertNotIn(1, self.index)
+    
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.idx')
+            self.index.save(path)
+            loaded = InvertedIndex.load(path)
+            self.assertEqual(loaded.search('django'), self.index.search('django'))
+            
+            # Mapped postings are copied on write.
+            loaded.remove(2)
+            loaded.add(4, {'title': 'More django', 'content': ''})
+            self.assertEqual([doc for doc, _ in loaded.search('django')], [4, 1])
+            # Only the removed document's own posting lists were copied.
+            self.assertIsInstance(loaded._postings['caching'][0], memoryview)
+            loaded.remove(3)
+            self.assertEqual(loaded.search('soup'), [])
+            self.assertEqual([doc for doc, _ in loaded.search('django')], [4, 1])
+            
+            with open(path, 'wb') as f:
+                f.write(b'not an index')
+            with self.assertRaises(ValueError):
+                InvertedIndex.load(path)
+    
+    def test_in_memory_backend(self):
+        user = User.objects.create_user(username='searcher', password='testpass123')
+        self.client.force_authenticate(user=user)
+        old = Post.objects.create(author=user, title='Weekend', content='Read about django.')
+        backend = search.InMemorySearchBackend(path=None, max_age=0)
+        with mock.patch.object(search, '_backend', backend):
+            new = Post.objects.create(author=user, title='Django release', content='Notes.')
+            response = self.client.get(reverse('post-list'), {'search': 'django'})
+            self.assertEqual([p['id'] for p in response.data['results']], [new.id, old.id])
+            
+            new.delete()
+            response = self.client.get(reverse('post-list'), {'search': 'release'})
+            self.assertEqual(response.data['results'], [])
+
+
+class LikeBufferTestCase(APITestCase):
+    """
+    Test the write-behind like buffer.
+    """
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Hot', content='Body')
+        self.fans = [
+            User.objects.create_user(username=f'fan{i}', password='testpass123') for i in range(3)
+        ]
+        self.buffer = likes.LikeBuffer(journal_dir=None)
+        patches = [
+            mock.patch.object(likes, 'LIKE_BUFFER', True),
+            mock.patch.object(likes, 'buffer', self.buffer),
+            mock.patch.object(likes.flusher, 'notify'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+    
+    def like(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('post-like', args=[self.post.id]))
+    
+    def test_likes_are_buffered_then_flushed(self):
+        response = self.like(self.fans[0])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['likes_count'], 1)
+        self.assertEqual(self.like(self.fans[0]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.like(self.fans[1])
+        self.assertFalse(Like.objects.exists())
+        
+        detail = self.client.get(reverse('post-detail', args=[self.post.id])).data
+        self.assertEqual((detail['likes_count'], detail['is_liked']), (2, True))
+        
+        # Likes already in the table are skipped.
+        Like.objects.create(post=self.post, user=self.fans[1])
+        Post.objects.filter(pk=self.post.pk).update(likes_count=1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        self.assertEqual(self.buffer.pending_count(self.post.pk), 0)
+        self.assertEqual(self.like(self.fans[0]).status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_unlike_drops_pending_like(self):
+        self.like(self.fans[0])
+        response = self.client.post(reverse('post-unlike', args=[self.post.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertFalse(Like.objects.exists())
+    
+    def test_lists_and_feed_include_pending_likes(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        self.client.post(reverse('accounts:follow-user', args=[self.author.id]))
+        for url in (reverse('post-list'), reverse('feed'), reverse('user-posts', args=[self.author.id])):
+            post = self.client.get(url).data['results'][0]
+            self.assertEqual((post['likes_count'], post['is_liked']), (2, True), url)
+        
+        self.client.force_authenticate(user=self.fans[1])
+        etag = self.client.get(reverse('feed'))['ETag']
+        self.assertEqual(self.client.get(reverse('feed'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.like(self.fans[2])
+        self.client.force_authenticate(user=self.fans[1])
+        response = self.client.get(reverse('feed'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_same_like_from_two_buffers_counts_once(self):
+        other = likes.LikeBuffer(journal_dir=None)
+        self.buffer.add(self.post.pk, self.fans[0].pk)
+        other.add(self.post.pk, self.fans[0].pk)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(other.flush(), 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+    
+    def test_flush_of_undone_likes_removes_journal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            buffer = likes.LikeBuffer(journal_dir=directory)
+            buffer.add(self.post.pk, self.fans[0].pk)
+            buffer.discard(self.post.pk, self.fans[0].pk)
+            self.assertEqual(buffer.flush(), 0)
+            self.assertEqual(os.listdir(directory), [])
+    
+    def test_journal_recovery_after_crash(self):
+        with tempfile.TemporaryDirectory() as directory:
+            crashed = likes.LikeBuffer(journal_dir=directory)
+            crashed.add(self.post.pk, self.fans[0].pk)
+            crashed.add(self.post.pk, self.fans[1].pk)
+            crashed.discard(self.post.pk, self.fans[1].pk)
+            crashed.add(self.post.pk, self.fans[2].pk)
+            # The process dies without flushing; its successor replays the journal.
+            crashed._journal.close()
+            survivor = likes.LikeBuffer(journal_dir=directory)
+            self.assertEqual(survivor.recover(), 2)
+            self.assertEqual(os.listdir(directory), [])
+        self.assertEqual(
+            set(Like.objects.values_list('user__username', flat=True)), {'fan0', 'fan2'}
+        )
+
+
+class ConditionalGetTestCase(APITestCase):
+    """
+    Test ETag/Last-Modified revalidation of posts, comments and the feed.
+    """
+    
+    FEED_PAGE_QUERIES = QueryBudgetTestCase.FEED_QUERY_BUDGET
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(reverse('accounts:follow-user', args=[self.author.id]))
+        self.post = Post.objects.create(author=self.author, title='Post', content='Body')
+        timeline.fan_out_post(self.post)
+    
+    def assertRevalidates(self, url, change=None):
+        """The unchanged resource is a 304; after ``change`` it is a full 200."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('Authorization', response['Vary'])
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        
+        if change:
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], etag)
+    
+    def test_post_detail(self):
+        url = reverse('post-detail', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+        # The post lookup only; the embedded comments are not fetched.
+        with self.assertNumQueries(1):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertRevalidates(url, lambda: self.client.post(reverse('post-like', args=[self.post.id])))
+        self.assertRevalidates(url, lambda: Comment.objects.create(
+            post=self.post, author=self.author, content='New'
+        ))
+        
+        # Validators are per user.
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=self.author)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.client.get(reverse('post-detail', args=[0])).status_code, status.HTTP_404_NOT_FOUND
+        )
+    
+    def test_comment_list(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, content='First')
+        self.assertRevalidates(reverse('post-comments', args=[self.post.id]), comment.delete)
+    
+    def test_feed_validators_skip_serialization(self):
+        url = reverse('feed')
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+        etag = response['ETag']
+        # The count and page queries only, nothing over the whole feed.
+        with self.assertNumQueries(self.FEED_PAGE_QUERIES):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        def publish():
+            timeline.fan_out_post(Post.objects.create(author=self.author, title='Next', content='Body'))
+        self.assertRevalidates(url, publish)
+    
+    def test_cursor_feed_validators_come_from_the_page(self):
+        url = reverse('feed') + '?pagination=cursor'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(self.FEED_PAGE_QUERIES - 1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertRevalidates(url, lambda: self.client.post(reverse('post-like', args=[self.post.id])))
+
+
+class SeedDataTestCase(APITestCase):
+    """
+    Test the synthetic data generator behind ``manage.py seed_data``.
+    """
+    
+    def generate(self, prefix):
+        return seed.generate(
+            users=60, following=8, posts=3, comments=2, likes=4, seed=7, batch_size=50,
+            prefix=prefix, now=timezone.now(),
+        )
+    
+    def structure(self, prefix):
+        """Follow edges and posts per account, keyed by account index."""
+        def index(username):
+            return int(username[len(prefix):])
+        follows = {
+            (index(followed), index(follower))
+            for followed, follower in User.followers.through.objects.filter(
+                from_customuser__username__startswith=prefix
+            ).values_list('from_customuser__username', 'to_customuser__username')
+        }
+        posts = sorted(
+            (index(username), title, likes_count, comments_count)
+            for username, title, likes_count, comments_count in Post.objects.filter(
+                author__username__startswith=prefix
+            ).values_list('author__username', 'title', 'likes_count', 'comments_count')
+        )
+        return follows, posts
+    
+    def test_generates_consistent_data(self):
+        counts = self.generate('seed')
+        self.assertEqual(User.objects.filter(username__startswith='seed').count(), 60)
+        self.assertEqual(counts['posts'], Post.objects.count())
+        self.assertEqual(counts['likes'], Like.objects.count())
+        self.assertEqual(counts['comments'], Comment.objects.count())
+        self.assertEqual(counts['notifications'], Notification.objects.count())
+        # Groups that can still be merged into know all their actors.
+        for notification in Notification.objects.annotate(recorded=Count('actors')).filter(recorded__gt=0):
+            self.assertEqual(notification.recorded, notification.actor_count)
+        self.assertGreater(counts['follows'], 0)
+        
+        # Counters match the rows, and timelines match a rebuild.
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('posts: 0 rows drifted', out.getvalue())
+        self.assertIn('users: 0 rows drifted', out.getvalue())
+        self.assertEqual(counts['timeline_entries'], TimelineEntry.objects.count())
+        for user in User.objects.filter(following_count__gt=0)[:5]:
+            entries = set(TimelineEntry.objects.filter(user=user).values_list('post_id', flat=True))
+            timeline.rebuild_timeline(user)
+            self.assertEqual(
+                entries, set(TimelineEntry.objects.filter(user=user).values_list('post_id', flat=True))
+            )
+        
+        # Posts are searchable and accounts can log in.
+        word = Post.objects.first().title.split()[0].lower()
+        self.assertTrue(search.search_posts(Post.objects.all(), word).exists())
+        response = self.client.post(reverse('accounts:login'), {
+            'username': 'seed0', 'password': seed.SEED_PASSWORD
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_same_seed_same_data(self):
+        self.generate('first')
+        self.generate('second')
+        self.assertEqual(self.structure('first'), self.structure('second'))
+    
+    def test_command_refuses_existing_prefix(self):
+        out = StringIO()
+        call_command('seed_data', '--users', '5', '--prefix', 'cmd', stdout=out)
+        self.assertIn('Created 5 users', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('seed_data', '--users', '5', '--prefix', 'cmd', stdout=StringIO())
+
+
+class BenchmarkTestCase(APITestCase):
+    """
+    Test the measurement and regression checks behind ``manage.py benchmark``.
+    """
+    
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Post', content='Body')
+        self.headers = {'HTTP_AUTHORIZATION': f'Token {issue_token(self.author)}'}
+    
+    def test_measure_resets_writes(self):
+        resets = []
+        
+        def unlike(client):
+            resets.append(client.post(reverse('post-unlike', args=[self.post.id]), **self.headers))
+        
+        scenario = benchmark.Scenario(
+            'like', reverse('post-like', args=[self.post.id]), method='post',
+            headers=self.headers, status=201, reset=unlike,
+        )
+        metrics = benchmark.measure(scenario, self.client, iterations=3, warmup=1)
+        # Warmup, timed, query-counting and tracing requests are all undone.
+        self.assertEqual(len(resets), 6)
+        self.assertFalse(Like.objects.exists())
+        self.assertGreater(metrics['queries'], 0)
+        self.assertGreater(metrics['peak_kib'], 0)
+        self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+    
+    def test_unexpected_status_fails(self):
+        scenario = benchmark.Scenario('feed', reverse('feed'))
+        with self.assertRaises(AssertionError):
+            benchmark.measure(scenario, self.client, iterations=1, warmup=0)
+    
+    def test_compare(self):
+        base = {'p50_ms': 10.0, 'p99_ms': 20.0, 'queries': 3, 'peak_kib': 100.0}
+        baseline = {'small': {'feed': base}}
+        
+        def check(**changes):
+            return benchmark.compare({'small': {'feed': {**base, **changes}}}, baseline)
+        
+        self.assertEqual(check(p50_ms=14.0, peak_kib=120.0, queries=2), [])
+        self.assertEqual(len(check(queries=4)), 1)
+        self.assertEqual(len(check(p50_ms=16.0, p99_ms=31.0)), 2)
+        self.assertEqual(len(check(peak_kib=130.0)), 1)
+        # Sub-millisecond noise is never a regression.
+        baseline['small']['feed'] = {**base, 'p50_ms': 0.5}
+        self.assertEqual(benchmark.compare({'small': {'feed': {**base, 'p50_ms': 1.2}}}, baseline), [])
+        # Unknown scenarios are skipped.
+        self.assertEqual(benchmark.compare({'large': {'feed': base}}, baseline), [])
+    
+    def test_command_must_define_scenarios(self):
+        class Incomplete(benchmark.BenchmarkCommand):
+            def seed(self, **options):
+                pass
+        
+        with self.assertRaises(TypeError):
+            Incomplete()
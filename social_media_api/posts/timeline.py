@@ -0,0 +1,171 @@
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils.functional import cached_property
+from social_media_api.pagination import keyset_page
+from .models import Post, TimelineEntry
+
+# Number of entries kept per user timeline.
+TIMELINE_MAX_LENGTH = getattr(settings, 'TIMELINE_MAX_LENGTH', 800)
+
+# Entries a timeline may grow past TIMELINE_MAX_LENGTH before it is trimmed
+# back, so a fan-out only trims the few timelines that reached the limit.
+TIMELINE_TRIM_SLACK = getattr(settings, 'TIMELINE_TRIM_SLACK', 100)
+
+# Authors with more followers than this are not fanned out on write; their
+# posts are merged into followers' feeds at read time instead.
+TIMELINE_FANOUT_MAX_FOLLOWERS = getattr(settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 5000)
+
+# Number of followers handled per INSERT/trim statement during fan-out.
+TIMELINE_FANOUT_BATCH_SIZE = getattr(settings, 'TIMELINE_FANOUT_BATCH_SIZE', 1000)
+
+
+def is_fan_out_on_read_author(author):
+    """Return True if posts by this author are merged into feeds at read time."""
+    return author.followers_count > TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def trim_timelines(user_ids):
+    """
+    Cut the given users' timelines back to TIMELINE_MAX_LENGTH entries if
+    they have grown more than TIMELINE_TRIM_SLACK past it.
+
+    One grouped count finds those timelines; each is then cut with a range
+    delete below its own cutoff, the newest ``(created_at, id)`` to drop.
+    """
+    over_limit = TimelineEntry.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        entries=Count('id')
+    ).filter(entries__gt=TIMELINE_MAX_LENGTH + TIMELINE_TRIM_SLACK).values_list('user_id', flat=True)
+
+    deleted = 0
+    for user_id in list(over_limit):
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        cutoff = entries.order_by('-created_at', '-id').values_list(
+            'created_at', 'id'
+        )[TIMELINE_MAX_LENGTH:TIMELINE_MAX_LENGTH + 1]
+        for created_at, pk in cutoff:
+            deleted += entries.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk)
+            ).delete()[0]
+    return deleted
+
+
+def fan_out_post(post):
+    """
+    Push a newly created post into the timelines of the author's followers.
+
+    Posts by authors above TIMELINE_FANOUT_MAX_FOLLOWERS are skipped; they are
+    picked up by Feed at read time.
+    """
+    if is_fan_out_on_read_author(post.author):
+        return 0
+
+    follower_ids = list(post.author.followers.values_list('id', flat=True))
+    for start in range(0, len(follower_ids), TIMELINE_FANOUT_BATCH_SIZE):
+        batch = follower_ids[start:start + TIMELINE_FANOUT_BATCH_SIZE]
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post=post, created_at=post.created_at)
+             for user_id in batch],
+            ignore_conflicts=True,
+        )
+        trim_timelines(batch)
+    return len(follower_ids)
+
+
+def add_author_to_timeline(user, author):
+    """Backfill an author's recent posts after ``user`` starts following them."""
+    if is_fan_out_on_read_author(author):
+        return 0
+
+    posts = Post.objects.filter(author=author).order_by(
+        '-created_at'
+    ).values_list('id', 'created_at')[:TIMELINE_MAX_LENGTH]
+    entries = TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=post_id, created_at=created_at)
+         for post_id, created_at in posts],
+        ignore_conflicts=True,
+    )
+    trim_timelines([user.id])
+    return len(entries)
+
+
+def remove_author_from_timeline(user, author):
+    """Drop an author's posts after ``user`` unfollows them."""
+    return TimelineEntry.objects.filter(user=user, post__author=author).delete()[0]
+
+
+def rebuild_timeline(user):
+    """Recompute a user's timeline from scratch from the accounts they follow."""
+    TimelineEntry.objects.filter(user=user).delete()
+    posts = Post.objects.filter(
+        author__in=user.following.exclude(id__in=_fan_out_on_read_author_ids(user))
+    ).order_by('-created_at').values_list('id', 'created_at')[:TIMELINE_MAX_LENGTH]
+    entries = TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=post_id, created_at=created_at)
+         for post_id, created_at in posts],
+        batch_size=TIMELINE_FANOUT_BATCH_SIZE,
+    )
+    return len(entries)
+
+
+def _fan_out_on_read_author_ids(user):
+    return user.following.filter(
+        followers_count__gt=TIMELINE_FANOUT_MAX_FOLLOWERS
+    ).values('id')
+
+
+class Feed:
+    """
+    A user's home feed, newest first: their timeline merged with the posts
+    of followed authors too popular to fan out on write.
+
+    A page is read as ``(created_at, post id)`` keys from the timeline index
+    and from the popular authors' posts, merged, and only then loaded as
+    posts, so it costs the same however long the feed is. Pass it to
+    KeysetPagination (``keyset_page``) or to a page number paginator
+    (``count`` and slicing).
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.posts = Post.objects.select_related('author').with_is_liked(user)
+
+    @cached_property
+    def popular_author_ids(self):
+        return list(_fan_out_on_read_author_ids(self.user).values_list('id', flat=True))
+
+    def _timeline_keys(self):
+        return TimelineEntry.objects.filter(user=self.user).values_list('created_at', 'post_id')
+
+    def _popular_keys(self):
+        return Post.objects.filter(author_id__in=self.popular_author_ids).values_list('created_at', 'id')
+
+    def count(self):
+        count = self._timeline_keys().count()
+        if self.popular_author_ids:
+            count += self._popular_keys().exclude(
+                id__in=self._timeline_keys().values('post_id')
+            ).count()
+        return count
+
+    def keyset_page(self, position, reverse, limit):
+        """Up to ``limit`` posts after ``position`` (before it if ``reverse``)."""
+        keys = keyset_page(self._timeline_keys(), position, reverse, limit, id_field='post_id')
+        if self.popular_author_ids:
+            keys += keyset_page(self._popular_keys(), position, reverse, limit)
+        return self._load(self._merge(keys, reverse)[:limit])
+
+    def __getitem__(self, index):
+        start, stop = index.start or 0, index.stop
+        keys = list(self._timeline_keys().order_by('-created_at', '-post_id')[:stop])
+        if self.popular_author_ids:
+            keys += self._popular_keys().order_by('-created_at', '-id')[:stop]
+        return self._load(self._merge(keys)[start:stop])
+
+    @staticmethod
+    def _merge(keys, reverse=False):
+        # A post can be in both sources if its author became popular later.
+        return sorted({pk: (created_at, pk) for created_at, pk in keys}.values(), reverse=not reverse)
+
+    def _load(self, keys):
+        posts = self.posts.in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
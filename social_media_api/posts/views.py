@@ -2,9 +2,17 @@ from rest_framework import viewsets, status, permissions, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Prefetch, Subquery, prefetch_related_objects
+from django.utils import timezone
+from social_media_api.conditional import ConditionalGetMixin, make_etag
+from social_media_api.pagination import PageNumberOrKeysetPagination
+from . import likes
 from .models import Post, Comment, Like
+from .search import search_posts
+from .timeline import Feed, fan_out_post
 from .serializers import (
+    COMMENTS_PREVIEW_LIMIT,
     PostSerializer, 
     PostListSerializer, 
     CommentSerializer, 
@@ -12,7 +20,12 @@ from .serializers import (
 )
 
 
-class PostViewSet(viewsets.ModelViewSet):
+def _latest(*timestamps):
+    timestamps = [t for t in timestamps if t is not None]
+    return max(timestamps) if timestamps else None
+
+
+class PostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     
@@ -22,16 +35,46 @@ class PostViewSet(viewsets.ModelViewSet):
         return PostSerializer
     
     def get_queryset(self):
-        queryset = Post.objects.all()
+        queryset = Post.objects.select_related('author').with_is_liked(self.request.user)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(content__icontains=search)
-            )
+            highlight = self.request.query_params.get('highlight') in ('1', 'true')
+            queryset = search_posts(queryset, search, highlight=highlight)
+        if self.action == 'retrieve':
+            queryset = queryset.annotate(last_comment_at=Subquery(
+                Comment.objects.filter(post=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+            ))
         return queryset
     
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Validators come from the post row itself (its fields, counters, latest
+        comment edit and is_liked), so a 304 costs the one lookup; the
+        embedded comments are only fetched for a full response.
+        """
+        instance = self.get_object()
+        parts = [
+            request.user.pk, instance.pk, instance.updated_at, instance.likes_count,
+            instance.comments_count, instance.last_comment_at, instance.user_has_liked,
+        ]
+        if likes.LIKE_BUFFER:
+            likes.add_pending_likes([instance], request.user)
+            parts.append(instance.pending_likes)
+        validators = (make_etag(*parts), _latest(instance.updated_at, instance.last_comment_at))
+        
+        response = self.get_not_modified(request, *validators)
+        if response is None:
+            prefetch_related_objects([instance], Prefetch(
+                'comments',
+                queryset=Comment.objects.select_related('author')[:COMMENTS_PREVIEW_LIMIT],
+                to_attr='preview_comments'
+            ))
+            response = Response(self.get_serializer(instance).data)
+        return self.set_validators(response, *validators)
+    
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        fan_out_post(post)
     
     def perform_update(self, serializer):
         if serializer.instance.author != self.request.user:
@@ -48,13 +91,27 @@ class PostViewSet(viewsets.ModelViewSet):
         post = self.get_object()
         user = request.user
         
-        if Like.objects.filter(post=post, user=user).exists():
+        # user_has_liked is annotated by get_queryset.
+        if post.user_has_liked:
             return Response(
                 {'error': 'You have already liked this post'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        like = Like.objects.create(post=post, user=user)
+        if likes.LIKE_BUFFER:
+            # Written by the like buffer's next flush.
+            if not likes.buffer_like(post.pk, user.pk):
+                return Response(
+                    {'error': 'You have already liked this post'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            data = LikeSerializer(Like(post=post, user=user, created_at=timezone.now())).data
+            data['likes_count'] = post.likes_count + likes.buffer.pending_count(post.pk)
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+        
+        with transaction.atomic():
+            like = Like.objects.create(post=post, user=user)
+            Post.objects.filter(pk=post.pk).update(likes_count=F('likes_count') + 1)
         
         # Create notification
         try:
@@ -71,28 +128,46 @@ class PostViewSet(viewsets.ModelViewSet):
         post = self.get_object()
         user = request.user
         
-        try:
-            like = Like.objects.get(post=post, user=user)
-            like.delete()
+        if likes.LIKE_BUFFER and likes.buffer.discard(post.pk, user.pk):
             return Response({'message': 'Post unliked successfully'})
-        except Like.DoesNotExist:
-            return Response(
-                {'error': 'You have not liked this post'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(post=post, user=user).delete()
+            if not deleted:
+                return Response(
+                    {'error': 'You have not liked this post'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            Post.objects.filter(pk=post.pk, likes_count__gt=0).update(likes_count=F('likes_count') - 1)
+        return Response({'message': 'Post unliked successfully'})
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Comment.objects.filter(post_id=self.kwargs['post_pk'])
+        return Comment.objects.filter(post_id=self.kwargs['post_pk']).select_related('author')
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().list, *args, **kwargs)
+    
+    def get_validators(self, request, post_pk=None, **kwargs):
+        try:
+            state = Comment.objects.filter(post_id=post_pk).aggregate(
+                count=Count('id'), last_updated=Max('updated_at')
+            )
+        except (TypeError, ValueError):
+            return None
+        etag = make_etag(request.get_full_path(), state['count'], state['last_updated'])
+        return etag, state['last_updated']
     
     def perform_create(self, serializer):
         post = get_object_or_404(Post, pk=self.kwargs['post_pk'])
-        comment = serializer.save(author=self.request.user, post=post)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user, post=post)
+            Post.objects.filter(pk=post.pk).update(comments_count=F('comments_count') + 1)
         
         # Create notification
         try:
@@ -109,23 +184,57 @@ class CommentViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         if instance.author != self.request.user:
             raise permissions.PermissionDenied("You can only delete your own comments.")
-        instance.delete()
+        with transaction.atomic():
+            instance.delete()
+            Post.objects.filter(pk=instance.post_id, comments_count__gt=0).update(
+                comments_count=F('comments_count') - 1
+            )
 
 
-class FeedView(generics.ListAPIView):
+class FeedView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = PostListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PageNumberOrKeysetPagination
     
     def get_queryset(self):
-        user = self.request.user
-        following_users = user.following.all()
-        return Post.objects.filter(author__in=following_users).order_by('-created_at')
+        return Feed(self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Validators come from the page itself (its posts' ids, edits, counters
+        and is_liked, plus the count and links), so revalidating costs the
+        page's own queries, never a pass over the whole feed; a 304 skips
+        serialization.
+        """
+        page = self.paginate_queryset(self.get_queryset())
+        validators = self.get_page_validators(request, page)
+        response = self.get_not_modified(request, *validators)
+        if response is None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return self.set_validators(response, *validators)
+    
+    def get_page_validators(self, request, page):
+        if likes.LIKE_BUFFER:
+            likes.add_pending_likes(page, request.user)
+        rows = [
+            (post.pk, post.updated_at, post.likes_count, post.comments_count, post.user_has_liked,
+             getattr(post, 'pending_likes', None))
+            for post in page
+        ]
+        etag = make_etag(
+            request.user.pk, request.get_full_path(), self.paginator.get_count(),
+            self.paginator.get_next_link(), self.paginator.get_previous_link(), rows,
+        )
+        return etag, max((post.updated_at for post in page), default=None)
 
 
 class UserPostsView(generics.ListAPIView):
     serializer_class = PostListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PageNumberOrKeysetPagination
     
     def get_queryset(self):
         user_id = self.kwargs['user_id']
-        return Post.objects.filter(author_id=user_id).order_by('-created_at')
+        return Post.objects.filter(author_id=user_id).select_related(
+            'author'
+        ).with_is_liked(self.request.user).order_by('-created_at')
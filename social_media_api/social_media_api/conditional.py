@@ -0,0 +1,62 @@
+"""
+Conditional GET support for API views.
+
+Views compute validators (an ETag and optionally a Last-Modified time) from
+cheap aggregate queries instead of serializing the response, so a client
+revalidating an unchanged resource gets a 304 without the body being built.
+"""
+
+import hashlib
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Hash validator parts (ids, counts, timestamps) into a strong ETag."""
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Adds ``conditional_get``, which answers with 304 Not Modified when the
+    request's If-None-Match / If-Modified-Since match the validators from
+    ``get_validators`` and otherwise runs the handler and attaches them.
+
+    Responses vary by user, so validators should include the user and the
+    responses carry ``Vary: Authorization``.
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        """
+        Return ``(etag, last_modified)``; ``last_modified`` may be None. Return
+        None to skip conditional handling (e.g. when the object is missing).
+        """
+        raise NotImplementedError
+
+    def conditional_get(self, request, handler, *args, **kwargs):
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        response = self.get_not_modified(request, *validators)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.set_validators(response, *validators)
+
+    def get_not_modified(self, request, etag, last_modified=None):
+        """Return a 304 response if the client's copy is current, else None."""
+        return get_conditional_response(
+            request, etag=etag, last_modified=_timestamp(last_modified)
+        )
+
+    def set_validators(self, response, etag, last_modified=None):
+        if response.status_code not in (200, 304):
+            return response
+        response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(_timestamp(last_modified))
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value is not None else None
@@ -0,0 +1,183 @@
+"""
+Pagination classes shared by the social_media_api apps.
+
+KeysetPagination pages through a queryset by its (created_at, id) position
+(or another timestamp's) instead of OFFSET, so every page costs the same as the first and no COUNT(*)
+is issued. Cursors are signed, so clients cannot forge positions.
+"""
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_page(queryset, position, reverse=False, limit=None, id_field='id', field='created_at'):
+    """
+    Return up to ``limit`` rows of ``queryset`` after ``position``, a
+    ``(timestamp, id)`` pair or None for the start, newest first; with
+    ``reverse``, the rows before it, oldest first. ``field`` names the
+    timestamp column and ``id_field`` the column that breaks ties on it.
+    """
+    if position is not None:
+        timestamp, pk = position
+        lookup = 'gt' if reverse else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': timestamp}) |
+            Q(**{field: timestamp, f'{id_field}__{lookup}': pk})
+        )
+    if reverse:
+        queryset = queryset.order_by(field, id_field)
+    else:
+        queryset = queryset.order_by(f'-{field}', f'-{id_field}')
+    return list(queryset[:limit])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (position_field, id), newest first.
+
+    Besides querysets it pages any object with a ``keyset_page(position,
+    reverse, limit)`` method behaving like the function of that name, such
+    as a feed merged from several sources.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+    signing_salt = 'social_media_api.pagination.KeysetPagination'
+    position_field = 'created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        # Fetch one extra row to find out whether another page follows.
+        if hasattr(queryset, 'keyset_page'):
+            results = queryset.keyset_page(position, reverse, page_size + 1)
+        else:
+            results = keyset_page(
+                queryset, position, reverse, page_size + 1, field=self.position_field
+            )
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = signing.loads(encoded, salt=self.signing_salt)
+            created_at = parse_datetime(data['c'])
+            pk = int(data['i'])
+            reverse = bool(data.get('r', False))
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (created_at, pk), reverse
+
+    def encode_cursor(self, obj, reverse=False):
+        data = {'c': getattr(obj, self.position_field).isoformat(), 'i': obj.pk}
+        if reverse:
+            data['r'] = True
+        encoded = signing.dumps(data, salt=self.signing_salt, compress=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PageNumberOrKeysetPagination(BasePagination):
+    """
+    Page number pagination by default; keyset pagination when the client
+    sends ``?pagination=cursor`` or a ``cursor`` parameter.
+    """
+    pagination_query_param = 'pagination'
+    position_field = KeysetPagination.position_field
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.paginator = KeysetPagination()
+            self.paginator.position_field = self.position_field
+        else:
+            self.paginator = PageNumberPagination()
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == 'cursor' or
+            KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def get_count(self):
+        """The total count in page number mode; None in keyset mode."""
+        if isinstance(self.paginator, PageNumberPagination):
+            return self.paginator.page.paginator.count
+        return None
+
+    def get_next_link(self):
+        return self.paginator.get_next_link()
+
+    def get_previous_link(self):
+        return self.paginator.get_previous_link()
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
@@ -90,6 +90,14 @@ CACHES = {
     }
 }
 
+# Relay notification stream events between workers through Redis
+NOTIFICATION_PUBSUB_URL = config('REDIS_URL', default='redis://127.0.0.1:6379/1')
+
+# Buffer likes and write them in batches; the buffer is shared through Redis
+# when REDIS_URL is set and kept in process otherwise
+LIKE_BUFFER = config('LIKE_BUFFER', default=False, cast=bool)
+LIKE_BUFFER_URL = config('REDIS_URL', default=None)
+
 # Email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
@@ -0,0 +1,445 @@
+"""
+Deterministic synthetic data for load tests and benchmarks.
+
+``generate`` writes users, a follow graph, posts, comments, likes,
+notifications and home timelines. The denormalized counters (followers,
+following, likes and comments) are computed while generating, and rows are
+written as plain tuples with ``executemany`` in batches, skipping model
+instances, signals and per-value SQL compilation, so millions of rows load per
+minute. Primary keys are allocated up front from the tables' current maximum,
+so nothing else may write to these tables while seeding.
+
+Follower counts follow a power law: each account follows accounts picked with
+probability proportional to ``1 / rank ** exponent``, so a few accounts have
+most of the followers, as on a real network. Likes per post are heavy-tailed
+too. Every random choice comes from ``random.Random`` instances derived from
+``seed`` and the account being generated, so the same options always produce
+the same rows whatever the batch size (timestamps are offsets back from
+``now``).
+"""
+
+import bisect
+import itertools
+import random
+from array import array
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from notifications.aggregation import NOTIFICATION_AGGREGATION_WINDOW, NOTIFICATION_RECENT_ACTORS
+from notifications.models import Notification, NotificationActor
+from posts.models import Comment, Like, Post, TimelineEntry
+from posts.search import get_search_backend
+from posts.timeline import (
+    TIMELINE_FANOUT_BATCH_SIZE, TIMELINE_FANOUT_MAX_FOLLOWERS, TIMELINE_MAX_LENGTH,
+)
+
+User = get_user_model()
+Follow = User.followers.through
+
+SEED_PASSWORD = 'password'
+
+WORDS = (
+    'django python api social network post comment like follow feed timeline '
+    'cache query index database search performance scale latency throughput '
+    'server client request response stream queue worker batch cursor page '
+    'model view serializer token user profile photo travel music coffee '
+    'weekend morning project release update launch design review test bug '
+    'deploy cloud mobile web open source community learning tutorial guide'
+).split()
+
+
+class Table:
+    """
+    Buffers rows for one model and inserts them with ``executemany``.
+
+    Rows hold the values of ``fields`` in order (foreign keys as ids); every
+    other column except an auto-incremented primary key gets its field's
+    default. The ``parents`` tables, whose rows these rows reference, are
+    flushed first.
+    """
+
+    def __init__(self, model, fields, batch_size, parents=()):
+        opts = model._meta
+        given = [opts.get_field(name) for name in fields]
+        rest = [
+            field for field in opts.concrete_fields
+            if field.name not in fields and not field.primary_key
+        ]
+        self.defaults = tuple(field.get_db_prep_save(field.get_default(), connection) for field in rest)
+        self.converters = [_converter(field) for field in given]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in given + rest)
+        placeholders = ', '.join(['%s'] * (len(given) + len(rest)))
+        self.sql = f'INSERT INTO {connection.ops.quote_name(opts.db_table)} ({columns}) VALUES ({placeholders})'
+        self.batch_size = batch_size
+        self.parents = parents
+        self.rows = []
+        self.count = 0
+
+    def add(self, *values):
+        self.rows.append(tuple(
+            convert(value) if convert else value for convert, value in zip(self.converters, values)
+        ) + self.defaults)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        for parent in self.parents:
+            parent.flush()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(self.sql, self.rows)
+        self.count += len(self.rows)
+        self.rows = []
+
+
+def _converter(field):
+    internal_type = field.get_internal_type()
+    if internal_type == 'DateTimeField':
+        return connection.ops.adapt_datetimefield_value
+    if internal_type == 'JSONField':
+        return lambda value: field.get_db_prep_save(value, connection)
+    return None
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _sentence(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _between(rng, start, end):
+    return start + (end - start) * rng.random()
+
+
+class Generator:
+    """
+    Writes one seeded data set; see ``generate`` for the options.
+    """
+
+    def __init__(self, users=1000, following=20, exponent=1.0, posts=5, comments=2, likes=5,
+                 notifications=True, timelines=True, days=90, seed=0, batch_size=5000,
+                 prefix='user', now=None, log=None):
+        self.users = users
+        self.following = following
+        self.exponent = exponent
+        self.posts = posts
+        self.comments = comments
+        self.likes = likes
+        self.notifications = notifications
+        self.timelines = timelines
+        self.days = days
+        self.seed = seed
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.now = now or timezone.now()
+        self.log = log or (lambda message: None)
+
+    def rng(self, *parts):
+        return random.Random(':'.join(str(part) for part in (self.seed, *parts)))
+
+    def username(self, index):
+        return f'{self.prefix}{index}'
+
+    def user_id(self, index):
+        return self.first_user_id + index
+
+    def run(self):
+        self.first_user_id = _next_id(User)
+        self.next_post_id = _next_id(Post)
+        self.next_comment_id = _next_id(Comment)
+        self.next_notification_id = _next_id(Notification)
+        posts = Table(Post, [
+            'id', 'author', 'title', 'content', 'created_at', 'updated_at',
+            'likes_count', 'comments_count',
+        ], self.batch_size)
+        self.tables = {
+            'users': Table(User, [
+                'id', 'username', 'email', 'password', 'bio', 'date_joined',
+                'followers_count', 'following_count',
+            ], self.batch_size),
+            'follows': Table(Follow, ['from_customuser', 'to_customuser'], self.batch_size),
+            'posts': posts,
+            'comments': Table(Comment, [
+                'id', 'post', 'author', 'content', 'created_at', 'updated_at',
+            ], self.batch_size, parents=[posts]),
+            'likes': Table(Like, ['post', 'user', 'created_at'], self.batch_size, parents=[posts]),
+        }
+        notifications = self.tables['notifications'] = Table(Notification, [
+            'id', 'recipient', 'actor', 'verb', 'notification_type', 'target_content_type',
+            'target_object_id', 'is_read', 'created_at', 'updated_at', 'actor_count', 'recent_actors',
+        ], self.batch_size)
+        self.tables['notification_actors'] = Table(
+            NotificationActor, ['notification', 'actor'], self.batch_size, parents=[notifications]
+        )
+
+        self.build_popularity()
+        followers_count, following_count, recent_followers = self.count_follows()
+        self.create_users(followers_count, following_count)
+        self.create_follows()
+        if self.notifications:
+            self.create_follow_notifications(followers_count, recent_followers)
+        self.create_posts()
+        for table in self.tables.values():
+            table.flush()
+        self.reset_sequences()
+
+        counts = {name: table.count for name, table in self.tables.items()}
+        counts['timeline_entries'] = self.create_timelines() if self.timelines else 0
+        return counts
+
+    # Follow graph
+
+    def build_popularity(self):
+        """Assign each account a popularity rank and Zipf sampling weights."""
+        self.ranked = list(range(self.users))
+        self.rng('rank').shuffle(self.ranked)
+        self.cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** self.exponent for rank in range(self.users)
+        ))
+
+    def followed_by(self, index):
+        """The accounts ``index`` follows, regenerated identically on every call."""
+        if self.users < 2 or self.following <= 0:
+            return []
+        rng = self.rng('follow', index)
+        wanted = min(self.users - 1, int(rng.expovariate(1 / self.following)))
+        total = self.cum_weights[-1]
+        followed = {}
+        # Popular accounts are drawn repeatedly, so give up after a bounded
+        # number of draws rather than insisting on ``wanted`` accounts.
+        for _ in range(wanted * 3):
+            if len(followed) >= wanted:
+                break
+            target = self.ranked[bisect.bisect_left(self.cum_weights, rng.random() * total)]
+            if target != index:
+                followed[target] = None
+        return list(followed)
+
+    def count_follows(self):
+        followers_count = array('q', bytes(8 * self.users))
+        following_count = array('q', bytes(8 * self.users))
+        recent_followers = {}
+        for index in range(self.users):
+            followed = self.followed_by(index)
+            following_count[index] = len(followed)
+            for target in followed:
+                followers_count[target] += 1
+                recent = recent_followers.setdefault(target, [])
+                recent.insert(0, index)
+                del recent[NOTIFICATION_RECENT_ACTORS:]
+        return followers_count, following_count, recent_followers
+
+    def create_users(self, followers_count, following_count):
+        password = make_password(SEED_PASSWORD)
+        users = self.tables['users']
+        for index in range(self.users):
+            rng = self.rng('user', index)
+            users.add(
+                self.user_id(index), self.username(index), f'{self.username(index)}@example.com',
+                password, _sentence(rng, 0, 12),
+                self.now - timedelta(days=self.days + rng.random() * 365),
+                followers_count[index], following_count[index],
+            )
+        users.flush()
+        self.log(f'{users.count} users')
+
+    def create_follows(self):
+        follows = self.tables['follows']
+        for index in range(self.users):
+            for target in self.followed_by(index):
+                follows.add(self.user_id(target), self.user_id(index))
+        follows.flush()
+        self.log(f'{follows.count} follows')
+
+    def create_follow_notifications(self, followers_count, recent_followers):
+        # Follows have no timestamps, so follow groups start before the
+        # aggregation window and are never merged into; their actors are not
+        # recorded.
+        window = timedelta(seconds=NOTIFICATION_AGGREGATION_WINDOW)
+        for target, recent in recent_followers.items():
+            rng = self.rng('follow-notification', target)
+            created_at = self.now - window - timedelta(days=rng.random() * self.days)
+            self.add_notification(
+                target, recent, followers_count[target], 'follow', 'started following you',
+                created_at, created_at, rng.random(),
+            )
+
+    # Posts, comments and likes
+
+    def create_posts(self):
+        post_type = ContentType.objects.get_for_model(Post)
+        comment_type = ContentType.objects.get_for_model(Comment)
+        search_backend = get_search_backend()
+        posts, comments, likes = self.tables['posts'], self.tables['comments'], self.tables['likes']
+        indexed = []
+
+        for author in range(self.users):
+            rng = self.rng('posts', author)
+            for _ in range(int(rng.expovariate(1 / self.posts)) if self.posts > 0 else 0):
+                post_id = self.next_post_id
+                self.next_post_id += 1
+                created_at = self.now - timedelta(days=rng.random() * self.days)
+                title = _sentence(rng, 3, 8).capitalize()
+                content = _sentence(rng, 15, 80)
+
+                like_count = 0
+                if self.likes > 0:
+                    # Pareto with shape 2 has mean 2, so this averages ``self.likes``.
+                    like_count = min(self.users, int(self.likes / 2 * rng.paretovariate(2)))
+                likers = sorted(
+                    (_between(rng, created_at, self.now), liker)
+                    for liker in rng.sample(range(self.users), like_count)
+                )
+                comment_count = int(rng.expovariate(1 / self.comments)) if self.comments > 0 else 0
+                post_comments = sorted(
+                    (_between(rng, created_at, self.now), rng.randrange(self.users))
+                    for _ in range(comment_count)
+                )
+
+                posts.add(
+                    post_id, self.user_id(author), title, content, created_at, created_at,
+                    len(likers), len(post_comments),
+                )
+                indexed.append(Post(id=post_id, title=title, content=content))
+                for liked_at, liker in likers:
+                    likes.add(post_id, self.user_id(liker), liked_at)
+                for commented_at, commenter in post_comments:
+                    comment_id = self.next_comment_id
+                    self.next_comment_id += 1
+                    comments.add(
+                        comment_id, post_id, self.user_id(commenter), _sentence(rng, 3, 30),
+                        commented_at, commented_at,
+                    )
+                    if self.notifications and commenter != author:
+                        self.add_notification(
+                            author, [commenter], 1, 'comment', f"commented on your post '{title}'",
+                            commented_at, commented_at, rng.random(), comment_type, comment_id,
+                        )
+
+                others = [(liked_at, liker) for liked_at, liker in likers if liker != author]
+                if self.notifications and others:
+                    # Likes are aggregated into one notification per post, as
+                    # the dispatcher does for likes within its window.
+                    actors = [liker for _, liker in others]
+                    self.add_notification(
+                        author, actors[:-NOTIFICATION_RECENT_ACTORS - 1:-1], len(others), 'like',
+                        f"liked your post '{title}'", others[0][0], others[-1][0], rng.random(),
+                        post_type, post_id, all_actors=actors,
+                    )
+
+                if len(indexed) >= self.batch_size:
+                    self.index(search_backend, indexed)
+                    indexed = []
+
+        self.index(search_backend, indexed)
+        search_backend.save()
+        self.log(f'{posts.count} posts, {comments.count} comments, {likes.count} likes')
+
+    def index(self, search_backend, posts):
+        # Posts must exist before they are indexed on PostgreSQL, and on
+        # SQLite one transaction per batch keeps FTS5 from writing a segment
+        # per row.
+        self.tables['posts'].flush()
+        with transaction.atomic():
+            search_backend.index(posts)
+
+    def add_notification(self, recipient, actors, actor_count, notification_type, verb,
+                         created_at, updated_at, roll, target_type=None, target_id=None,
+                         all_actors=()):
+        """
+        Queue a notification from ``actors`` (account indexes, most recent
+        first). ``all_actors`` of a group that can still be merged into are
+        recorded, as the dispatcher does.
+        """
+        notification_id = self.next_notification_id
+        self.next_notification_id += 1
+        # Most notifications older than a day have been read.
+        is_read = updated_at < self.now - timedelta(days=1) and roll < 0.9
+        self.tables['notifications'].add(
+            notification_id, self.user_id(recipient), self.user_id(actors[0]), verb,
+            notification_type, target_type.pk if target_type else None, target_id, is_read,
+            created_at, updated_at, actor_count,
+            [{'id': self.user_id(actor), 'username': self.username(actor)} for actor in actors],
+        )
+        if not is_read and created_at >= self.now - timedelta(seconds=NOTIFICATION_AGGREGATION_WINDOW):
+            for actor in all_actors:
+                self.tables['notification_actors'].add(notification_id, self.user_id(actor))
+
+    def reset_sequences(self):
+        """Move primary key sequences past the explicitly inserted ids."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Post, Comment, Notification])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    # Timelines
+
+    def create_timelines(self):
+        """
+        Materialize the created accounts' home timelines, as
+        ``rebuild_timeline`` would, with one INSERT ... SELECT per batch of
+        followers.
+        """
+        qn = connection.ops.quote_name
+        follower = qn(Follow._meta.get_field('to_customuser').column)
+        followed = qn(Follow._meta.get_field('from_customuser').column)
+        sql = f'''
+            INSERT INTO {qn(TimelineEntry._meta.db_table)}
+                ({qn('user_id')}, {qn('post_id')}, {qn('created_at')})
+            SELECT user_id, post_id, created_at FROM (
+                SELECT f.{follower} AS user_id, p.{qn('id')} AS post_id, p.{qn('created_at')} AS created_at,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY f.{follower}
+                           ORDER BY p.{qn('created_at')} DESC, p.{qn('id')} DESC
+                       ) AS position
+                FROM {qn(Follow._meta.db_table)} f
+                JOIN {qn(User._meta.db_table)} a ON a.{qn('id')} = f.{followed}
+                JOIN {qn(Post._meta.db_table)} p ON p.{qn('author_id')} = f.{followed}
+                WHERE f.{follower} BETWEEN %s AND %s AND a.{qn('followers_count')} <= %s
+            ) ranked
+            WHERE position <= %s
+        '''
+        entries = 0
+        for start in range(0, self.users, TIMELINE_FANOUT_BATCH_SIZE):
+            last = min(start + TIMELINE_FANOUT_BATCH_SIZE, self.users) - 1
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [
+                    self.user_id(start), self.user_id(last),
+                    TIMELINE_FANOUT_MAX_FOLLOWERS, TIMELINE_MAX_LENGTH,
+                ])
+                entries += cursor.rowcount
+        self.log(f'{entries} timeline entries')
+        return entries
+
+
+def generate(**options):
+    """
+    Write a seeded synthetic data set and return the number of rows created
+    per kind.
+
+    Options (all optional):
+        users: Accounts to create, named ``<prefix><n>``
+        following: Mean accounts each account follows
+        exponent: Power-law exponent of follower popularity
+        posts: Mean posts per account
+        comments: Mean comments per post
+        likes: Mean likes per post
+        notifications: Also create like, comment and follow notifications
+        timelines: Materialize the created accounts' home timelines
+        days: Posts are spread over this many days before ``now``
+        seed: Seed of every random choice
+        batch_size: Rows per INSERT batch
+        prefix: Username prefix
+        now: End of the generated time span (default: the current time)
+        log: Callable receiving progress messages
+    """
+    return Generator(**options).run()
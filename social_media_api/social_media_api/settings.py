@@ -133,7 +133,7 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -141,3 +141,39 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+
+# API token settings (see accounts/authentication.py). 'signed' issues
+# stateless signed tokens instead of database tokens.
+AUTH_TOKEN_MODE = 'db'
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+AUTH_SIGNED_TOKEN_MAX_AGE = 30 * 24 * 60 * 60
+
+# Follow graph cache settings (see accounts/graph.py)
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60
+FOLLOW_GRAPH_CACHE_MAX_SIZE = 10000
+FOLLOW_RECOMMENDATIONS_LIMIT = 50
+FOLLOW_RECOMMENDATIONS_CHUNK_SIZE = 1000
+
+# Home timeline settings (see posts/timeline.py)
+TIMELINE_MAX_LENGTH = 800
+TIMELINE_TRIM_SLACK = 100
+TIMELINE_FANOUT_MAX_FOLLOWERS = 5000
+
+# Write-behind like buffer settings (see posts/likes.py)
+LIKE_BUFFER = False
+LIKE_BUFFER_JOURNAL_DIR = None
+LIKE_BUFFER_FLUSH_INTERVAL = 1.0
+
+# Post search settings (see posts/search.py)
+POST_SEARCH_BACKEND = 'auto'
+POST_SEARCH_CONFIG = 'english'
+POST_SEARCH_INDEX_PATH = None
+POST_SEARCH_INDEX_MAX_AGE = 300
+
+# Notification dispatch settings (see notifications/dispatcher.py)
+NOTIFICATIONS_ASYNC = True
+NOTIFICATION_QUEUE_SIZE = 10000
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATION_AGGREGATION = True
+NOTIFICATION_AGGREGATION_WINDOW = 24 * 60 * 60
+UNREAD_COUNT_CACHE_TIMEOUT = 24 * 60 * 60